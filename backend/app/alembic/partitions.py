@@ -0,0 +1,70 @@
+"""
+Helpers for migrations that index partitioned tables online.
+
+An index of a partitioned table cannot be created concurrently. Instead, it is created
+ON ONLY the partitioned table, so that partitions created meanwhile get it, and stays
+invalid until an index built concurrently on every existing partition is attached to it.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+LIST_PARTITIONS_QUERY = """SELECT child.relname
+FROM pg_inherits
+JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+WHERE parent.relname = :table
+ORDER BY child.relname"""
+
+# A valid btree index of a partition on exactly the columns, in order, preferring the one
+# attached to the parent index already
+MATCHING_INDEX_QUERY = """SELECT index_class.relname
+FROM pg_index
+JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+JOIN pg_am ON pg_am.oid = index_class.relam
+LEFT JOIN pg_inherits ON pg_inherits.inhrelid = pg_index.indexrelid
+    AND pg_inherits.inhparent = CAST(:parent_index AS regclass)
+WHERE pg_index.indrelid = CAST(:partition AS regclass)
+    AND pg_index.indisvalid
+    AND pg_index.indisunique = :unique
+    AND pg_index.indpred IS NULL
+    AND pg_index.indexprs IS NULL
+    AND pg_am.amname = 'btree'
+    AND CAST(pg_index.indkey AS int2[]) = ARRAY(
+        SELECT pg_attribute.attnum
+        FROM unnest(CAST(:columns AS text[])) WITH ORDINALITY AS wanted (name, position)
+        JOIN pg_attribute ON pg_attribute.attrelid = CAST(:partition AS regclass)
+            AND pg_attribute.attname = wanted.name
+        ORDER BY wanted.position
+    )
+ORDER BY pg_inherits.inhparent IS NULL, index_class.relname
+LIMIT 1"""
+
+
+def attach_partition_indexes(table: str, parent_index: str, columns: list[str], unique: bool):
+    """
+    Give every partition of a table an index attached to a partitioned index created ON ONLY
+    the table, reusing a matching index of the partition if it has one and building one
+    concurrently otherwise. Runs outside a transaction, see autocommit_block().
+
+    Args:
+        table (str): The partitioned table.
+        parent_index (str): The partitioned index created ON ONLY the table.
+        columns (list[str]): The indexed columns, in order.
+        unique (bool): Whether the index is unique.
+
+    Returns:
+        None
+    """
+    bind = op.get_bind()
+    partitions = bind.execute(sa.text(LIST_PARTITIONS_QUERY), {"table": table}).scalars().all()
+    for partition in partitions:
+        values = {"parent_index": parent_index, "partition": partition, "unique": unique, "columns": columns}
+        index = bind.execute(sa.text(MATCHING_INDEX_QUERY), values).scalar()
+        if index is None:
+            index = f"{partition}_{'_'.join(columns)}_{'key' if unique else 'idx'}"
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+            op.execute(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY {index} ON {partition} ({', '.join(columns)})"
+            )
+        op.execute(f"ALTER INDEX {parent_index} ATTACH PARTITION {index}")
@@ -0,0 +1,45 @@
+"""add assessment content hash
+
+Revision ID: b5d2f08c6e13
+Revises: 7c3e9a41f2d8
+Create Date: 2026-10-17 16:40:08.271934
+
+essay_assessments gets the content_hash of the text assessed (see app.essay.dedupe), so
+that an essay resubmitted unchanged reuses an existing assessment instead of being
+scored again. Existing assessments keep a NULL hash and are never reused.
+
+Adding the nullable column only updates the catalog. The index is built online: it is
+created on the partitioned table only first, so that partitions created meanwhile get it,
+then built concurrently on each partition, or reused if a partition has it already, and
+attached. It becomes valid once every partition is attached.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.alembic.partitions import attach_partition_indexes
+
+# revision identifiers, used by Alembic.
+revision: str = "b5d2f08c6e13"
+down_revision: Union[str, None] = "7c3e9a41f2d8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = "ix_essay_assessments_content_hash"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("essay_assessments", sa.Column("content_hash", sa.String(64), nullable=True))
+
+    op.execute(f"CREATE INDEX {INDEX} ON ONLY essay_assessments (content_hash)")
+    with op.get_context().autocommit_block():
+        attach_partition_indexes("essay_assessments", INDEX, ["content_hash"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(INDEX, table_name="essay_assessments")
+    op.drop_column("essay_assessments", "content_hash")
@@ -0,0 +1,306 @@
+"""partition essay tables by month
+
+Revision ID: 7c3e9a41f2d8
+Revises: 2d01bcb46ead
+Create Date: 2026-10-17 10:12:44.518203
+
+essay_contents becomes partitioned by month of created_at, and essay_assessments by
+month of the essay assessed, stored in the new essay_created_at column. The primary
+keys and the assessment foreign key include the partition keys.
+
+The tables are migrated online:
+1. The partitioned tables are created next to the live ones, with partitions from the
+   month of the oldest essay to three months ahead, and triggers mirror every write to
+   the live tables into them.
+2. The existing rows are copied in batches, each batch committed on its own and locking
+   only its rows, so the live tables keep taking writes. The assessment foreign key is
+   added once every essay is copied, before the assessments are, so that it is
+   validated against the few assessments mirrored so far without holding the live tables.
+3. In a last transaction, the live tables are dropped and the partitioned tables take
+   their names. Writes wait during this step, which only updates the catalog.
+
+The downgrade copies the rows back into unpartitioned tables in one transaction.
+"""
+
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c3e9a41f2d8"
+down_revision: Union[str, None] = "2d01bcb46ead"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5_000
+MONTHS_AHEAD = 3
+
+ESSAY_COLUMNS = ["id", "client_id", "owner_id", "question_id", "content", "created_at", "updated_at", "deleted_at"]
+# The essay columns an update may change, outside the primary key
+ESSAY_UPDATED_COLUMNS = [column for column in ESSAY_COLUMNS if column not in ("id", "created_at")]
+ASSESSMENT_COLUMNS = [
+    "id",
+    "essay_id",
+    "client_id",
+    "owner_id",
+    "overall_score",
+    "overall_score_feedback",
+    "task_achievement",
+    "task_achievement_feedback",
+    "coherence_cohesion",
+    "coherence_cohesion_feedback",
+    "lexical_resource",
+    "lexical_resource_feedback",
+    "grammatical_range",
+    "grammatical_range_feedback",
+    "created_at",
+    "updated_at",
+]
+SCORE_CHECKS = {
+    "check_overall_score_range": "overall_score",
+    "check_task_achievement_range": "task_achievement",
+    "check_coherence_cohesion_range": "coherence_cohesion",
+    "check_lexical_resource_range": "lexical_resource",
+    "check_grammatical_range_range": "grammatical_range",
+}
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_partition(table: str, month: date):
+    # Partition names and bounds as app.essay.partitions creates them
+    op.execute(
+        f"CREATE TABLE {table}_y{month.year}m{month.month:02d} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+
+
+def essay_table_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", sa.UUID(), server_default=sa.text("gen_random_uuid()"), nullable=False),
+        sa.Column("client_id", sa.UUID(), nullable=False),
+        sa.Column("owner_id", sa.UUID(), nullable=False),
+        sa.Column("question_id", sa.UUID(), nullable=True),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("deleted_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["client_id", "owner_id"],
+            ["profiles.client_id", "profiles.user_id"],
+            name="essay_contents_client_id_owner_id_fkey",
+            ondelete="CASCADE",
+        ),
+        sa.ForeignKeyConstraint(
+            ["question_id"], ["essay_questions.id"], name="essay_contents_question_id_fkey", ondelete="SET NULL"
+        ),
+    ]
+
+
+def assessment_table_columns(partitioned: bool) -> list[sa.Column]:
+    return [
+        sa.Column("id", sa.UUID(), server_default=sa.text("gen_random_uuid()"), nullable=False),
+        sa.Column("essay_id", sa.UUID(), nullable=False),
+        *([sa.Column("essay_created_at", sa.TIMESTAMP(timezone=True), nullable=False)] if partitioned else []),
+        sa.Column("client_id", sa.UUID(), nullable=False),
+        sa.Column("owner_id", sa.UUID(), nullable=False),
+        *[
+            column
+            for score in SCORE_CHECKS.values()
+            for column in (
+                sa.Column(score, sa.Numeric(precision=2, scale=1), nullable=False),
+                sa.Column(f"{score}_feedback", sa.Text(), nullable=False),
+            )
+        ],
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        *[sa.CheckConstraint(f"{score} >= 0 AND {score} <= 9", name=name) for name, score in SCORE_CHECKS.items()],
+        sa.ForeignKeyConstraint(
+            ["client_id", "owner_id"],
+            ["profiles.client_id", "profiles.user_id"],
+            name="essay_assessments_client_id_owner_id_fkey",
+            ondelete="CASCADE",
+        ),
+    ]
+
+
+def copy_in_batches(query: str):
+    """
+    Run a batch copy until it copies nothing, resuming after the last id it returned.
+    """
+    bind = op.get_bind()
+    after = None
+    while True:
+        after = bind.execute(sa.text(query), {"after": after, "batch_size": BATCH_SIZE}).scalar()
+        if after is None:
+            return
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "essay_contents_partitioned",
+        *essay_table_columns(),
+        sa.PrimaryKeyConstraint("id", "created_at", name="essay_contents_partitioned_pkey"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index(
+        "ix_essays_client_id_created_at", "essay_contents_partitioned", ["client_id", "created_at"], unique=False
+    )
+    op.create_index(
+        "ix_essays_owner_id_created_at", "essay_contents_partitioned", ["owner_id", "created_at"], unique=False
+    )
+    op.create_table(
+        "essay_assessments_partitioned",
+        *assessment_table_columns(partitioned=True),
+        sa.PrimaryKeyConstraint("id", "essay_created_at", name="essay_assessments_partitioned_pkey"),
+        postgresql_partition_by="RANGE (essay_created_at)",
+    )
+    op.create_index(
+        "ix_essay_assessments_partitioned_essay_id",
+        "essay_assessments_partitioned",
+        ["essay_id", "essay_created_at"],
+        unique=False,
+    )
+
+    oldest = op.get_bind().execute(sa.text("SELECT min(created_at) FROM essay_contents")).scalar()
+    current = datetime.now(timezone.utc).date().replace(day=1)
+    month = min(oldest.astimezone(timezone.utc).date().replace(day=1), current) if oldest else current
+    while month <= add_months(current, MONTHS_AHEAD):
+        create_partition("essay_contents_partitioned", month)
+        create_partition("essay_assessments_partitioned", month)
+        month = add_months(month, 1)
+
+    # Mirror the writes to the live tables until they are swapped
+    essay_columns = ", ".join(ESSAY_COLUMNS)
+    assessment_columns = ", ".join(ASSESSMENT_COLUMNS)
+    op.execute(f"""CREATE FUNCTION essay_contents_mirror() RETURNS trigger AS $$
+BEGIN
+    -- An update is applied in place: deleting the row would cascade to its assessments
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM essay_contents_partitioned WHERE id = OLD.id AND created_at = OLD.created_at;
+    ELSE
+        INSERT INTO essay_contents_partitioned ({essay_columns})
+        VALUES ({", ".join(f"NEW.{column}" for column in ESSAY_COLUMNS)})
+        ON CONFLICT (id, created_at) DO UPDATE
+        SET {", ".join(f"{column} = EXCLUDED.{column}" for column in ESSAY_UPDATED_COLUMNS)};
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql""")
+    op.execute(f"""CREATE FUNCTION essay_assessments_mirror() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM essay_assessments_partitioned WHERE id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO essay_assessments_partitioned ({assessment_columns}, essay_created_at)
+        SELECT {", ".join(f"NEW.{column}" for column in ASSESSMENT_COLUMNS)}, essay_contents.created_at
+        FROM essay_contents WHERE essay_contents.id = NEW.essay_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql""")
+    op.execute(
+        "CREATE TRIGGER essay_contents_mirror AFTER INSERT OR UPDATE OR DELETE ON essay_contents "
+        "FOR EACH ROW EXECUTE FUNCTION essay_contents_mirror()"
+    )
+    op.execute(
+        "CREATE TRIGGER essay_assessments_mirror AFTER INSERT OR UPDATE OR DELETE ON essay_assessments "
+        "FOR EACH ROW EXECUTE FUNCTION essay_assessments_mirror()"
+    )
+
+    # Rows locked by a batch are copied before any write to them is mirrored, and rows
+    # the triggers already mirrored are skipped
+    with op.get_context().autocommit_block():
+        copy_in_batches(f"""WITH batch AS (
+    SELECT {essay_columns} FROM essay_contents
+    WHERE CAST(:after AS uuid) IS NULL OR id > CAST(:after AS uuid)
+    ORDER BY id LIMIT :batch_size
+    FOR SHARE
+), copied AS (
+    INSERT INTO essay_contents_partitioned ({essay_columns})
+    SELECT {essay_columns} FROM batch
+    ON CONFLICT DO NOTHING
+)
+SELECT id FROM batch ORDER BY id DESC LIMIT 1""")
+        # Every essay is in the partitioned table now, and the triggers keep it so
+        op.create_foreign_key(
+            "essay_assessments_essay_id_essay_created_at_fkey",
+            "essay_assessments_partitioned",
+            "essay_contents_partitioned",
+            ["essay_id", "essay_created_at"],
+            ["id", "created_at"],
+            ondelete="CASCADE",
+        )
+        copy_in_batches(f"""WITH batch AS (
+    SELECT {", ".join(f"essay_assessments.{column}" for column in ASSESSMENT_COLUMNS)},
+        essay_contents.created_at AS essay_created_at
+    FROM essay_assessments JOIN essay_contents ON essay_contents.id = essay_assessments.essay_id
+    WHERE CAST(:after AS uuid) IS NULL OR essay_assessments.id > CAST(:after AS uuid)
+    ORDER BY essay_assessments.id LIMIT :batch_size
+    FOR SHARE OF essay_assessments
+), copied AS (
+    INSERT INTO essay_assessments_partitioned ({assessment_columns}, essay_created_at)
+    SELECT {assessment_columns}, essay_created_at FROM batch
+    ON CONFLICT DO NOTHING
+)
+SELECT id FROM batch ORDER BY id DESC LIMIT 1""")
+
+    # Swap, keeping the live tables readable until they are dropped
+    op.execute("LOCK TABLE essay_contents, essay_assessments IN EXCLUSIVE MODE")
+    op.drop_table("essay_assessments")
+    op.drop_table("essay_contents")
+    op.execute("DROP FUNCTION essay_assessments_mirror()")
+    op.execute("DROP FUNCTION essay_contents_mirror()")
+    op.rename_table("essay_contents_partitioned", "essay_contents")
+    op.rename_table("essay_assessments_partitioned", "essay_assessments")
+    op.execute("ALTER TABLE essay_contents RENAME CONSTRAINT essay_contents_partitioned_pkey TO essay_contents_pkey")
+    op.execute(
+        "ALTER TABLE essay_assessments RENAME CONSTRAINT essay_assessments_partitioned_pkey TO essay_assessments_pkey"
+    )
+    op.execute("ALTER INDEX ix_essay_assessments_partitioned_essay_id RENAME TO ix_essay_assessments_essay_id")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table(
+        "essay_contents_unpartitioned",
+        *essay_table_columns(),
+        sa.PrimaryKeyConstraint("id", name="essay_contents_unpartitioned_pkey"),
+    )
+    op.create_table(
+        "essay_assessments_unpartitioned",
+        *assessment_table_columns(partitioned=False),
+        sa.ForeignKeyConstraint(
+            ["essay_id"],
+            ["essay_contents_unpartitioned.id"],
+            name="essay_assessments_essay_id_fkey",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id", name="essay_assessments_unpartitioned_pkey"),
+    )
+    essay_columns = ", ".join(ESSAY_COLUMNS)
+    assessment_columns = ", ".join(ASSESSMENT_COLUMNS)
+    op.execute(f"INSERT INTO essay_contents_unpartitioned ({essay_columns}) SELECT {essay_columns} FROM essay_contents")
+    op.execute(
+        f"INSERT INTO essay_assessments_unpartitioned ({assessment_columns}) "
+        f"SELECT {assessment_columns} FROM essay_assessments"
+    )
+
+    op.drop_table("essay_assessments")
+    op.drop_table("essay_contents")
+    op.rename_table("essay_contents_unpartitioned", "essay_contents")
+    op.rename_table("essay_assessments_unpartitioned", "essay_assessments")
+    op.execute("ALTER TABLE essay_contents RENAME CONSTRAINT essay_contents_unpartitioned_pkey TO essay_contents_pkey")
+    op.execute(
+        "ALTER TABLE essay_assessments RENAME CONSTRAINT essay_assessments_unpartitioned_pkey TO essay_assessments_pkey"
+    )
+    op.create_index("ix_essays_client_id", "essay_contents", ["client_id"], unique=False)
+    op.create_index("ix_essays_owner_id", "essay_contents", ["owner_id"], unique=False)
+    op.create_index(op.f("ix_essay_assessments_essay_id"), "essay_assessments", ["essay_id"], unique=False)
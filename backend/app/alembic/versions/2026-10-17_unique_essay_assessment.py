@@ -0,0 +1,55 @@
+"""unique essay assessment
+
+Revision ID: e1a7c3d95b20
+Revises: b5d2f08c6e13
+Create Date: 2026-10-17 18:05:31.640217
+
+An essay has at most one assessment: the index of essay_assessments on (essay_id,
+essay_created_at) becomes unique, so that two workers running the same job at once
+cannot both insert one. The index includes the partition key, so it can be unique on
+the partitioned table.
+
+Duplicate assessments are deleted first, keeping the oldest of each essay. The unique
+index is then built online like the content hash index: created on the partitioned
+table only, so that partitions created meanwhile get it, then built concurrently on
+each partition, or reused if a partition has it already, and attached. The index it
+replaces is dropped and the new one takes its name. A duplicate written by a worker of
+the previous release while the index is built fails the upgrade; running it again
+deletes that duplicate too.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.alembic.partitions import attach_partition_indexes
+
+# revision identifiers, used by Alembic.
+revision: str = "e1a7c3d95b20"
+down_revision: Union[str, None] = "b5d2f08c6e13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = "ix_essay_assessments_essay_id"
+NEW_INDEX = "ix_essay_assessments_essay_id_unique"
+COLUMNS = ["essay_id", "essay_created_at"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(f"CREATE UNIQUE INDEX {NEW_INDEX} ON ONLY essay_assessments ({', '.join(COLUMNS)})")
+    with op.get_context().autocommit_block():
+        op.execute("""DELETE FROM essay_assessments duplicate
+USING essay_assessments kept
+WHERE duplicate.essay_id = kept.essay_id
+    AND duplicate.essay_created_at = kept.essay_created_at
+    AND (duplicate.created_at, duplicate.id) > (kept.created_at, kept.id)""")
+        attach_partition_indexes("essay_assessments", NEW_INDEX, COLUMNS, unique=True)
+    op.drop_index(INDEX, table_name="essay_assessments")
+    op.execute(f"ALTER INDEX {NEW_INDEX} RENAME TO {INDEX}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(INDEX, table_name="essay_assessments")
+    op.create_index(INDEX, "essay_assessments", COLUMNS, unique=False)
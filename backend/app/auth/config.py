@@ -1,3 +1,5 @@
+from typing import Literal
+
 from app.config import BaseSettings
 
 
@@ -7,6 +9,25 @@ class AuthConfig(BaseSettings):
     REFRESH_SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15  # 15 mins
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 2  # 2 days
+    ACCESS_TOKEN_CACHE_SIZE: int = 10_000
+    REFRESH_LOCK_TIMEOUT_MS: int = 2000  # 2 secs
+    REFRESH_RESULT_TTL_MS: int = 5000  # 5 secs
+
+    # Login throttling settings
+    LOGIN_THROTTLE_WINDOW_SECONDS: int = 60
+    LOGIN_THROTTLE_MAX_ATTEMPTS_PER_USERNAME: int = 5
+    # Per peer address: run behind a proxy with its headers trusted (uvicorn --proxy-headers
+    # --forwarded-allow-ips), and raise or set to 0 (off) for clients sharing a NAT
+    LOGIN_THROTTLE_MAX_ATTEMPTS_PER_IP: int = 20
+
+    # Password hashing settings
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_MAX_WORKERS: int = 4
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 4
+    PASSWORD_HASH_ROUNDS: int | None = None  # None calibrates the cost at startup
+    PASSWORD_HASH_BUDGET_MS: int = 250
+    PASSWORD_HASH_MIN_ROUNDS: int = 10
+    PASSWORD_HASH_MAX_ROUNDS: int = 14
 
 
 auth_settings = AuthConfig()
@@ -1,16 +1,16 @@
-import json
 from typing import Annotated, Any, cast
 
-from fastapi import Cookie, Depends
+from fastapi import Cookie, Depends, Request
 from fastapi.openapi.models import OAuthFlows
 from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2
 
-from app.auth.config import auth_settings
 from app.auth.exceptions import NotAuthenticated
-from app.auth.utils import generate_token, get_refresh_token, set_token_cookies
+from app.auth.throttle import login_throttle
+from app.auth.utils import refresh_access_token, set_token_cookies
 from app.config import settings
 from app.db.deps import RedisDep
+from app.user.schemas import UserLogin
 
 
 class CookieJWTAuth(OAuth2):
@@ -49,8 +49,8 @@ class CookieJWTAuth(OAuth2):
         Verify the access token cookie and return the token value.
 
         If the access token cookie is not provided, verify the refresh token cookie
-        and generate a new access token. Set the new access token in the response
-        cookies.
+        and generate a new access token. Concurrent refreshes of the same refresh token
+        are coalesced into one. Set the new access token in the response cookies.
 
         Args:
             response (ORJSONResponse): The response object used to set cookies.
@@ -70,28 +70,20 @@ class CookieJWTAuth(OAuth2):
                 raise NotAuthenticated
             else:
                 try:
-                    refresh_token = await get_refresh_token(redis, refresh_token)
-                    refresh_token = json.loads(refresh_token)
-                    # Generate new access token
-                    client_id = str(refresh_token.get("client_id"))
-                    user_id = str(refresh_token.get("user_id"))
-                    access_token, access_expires_at = await generate_token(
-                        "access_token",
-                        auth_settings.ACCESS_SECRET_KEY,
-                        auth_settings.ALGORITHM,
-                        auth_settings.ACCESS_TOKEN_EXPIRE_MINUTES,
-                        client_id,
-                        user_id,
-                    )
-                    set_token_cookies(
-                        response,
-                        access_token,
-                        access_expires_at,
-                        None,
-                        None,
-                    )
+                    refreshed = await refresh_access_token(redis, refresh_token)
                 except Exception:
                     raise NotAuthenticated
+                if refreshed is None:
+                    raise NotAuthenticated
+
+                access_token, access_expires_at = refreshed
+                set_token_cookies(
+                    response,
+                    access_token,
+                    access_expires_at,
+                    None,
+                    None,
+                )
 
         return {"access_token": access_token}
 
@@ -99,3 +91,28 @@ class CookieJWTAuth(OAuth2):
 oauth2_scheme = CookieJWTAuth(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 AccessDep = Annotated[str, Depends(oauth2_scheme)]
+
+
+async def throttle_login(request: Request, redis: RedisDep, form_data: UserLogin) -> UserLogin:
+    """
+    Record a login attempt for the username and the client IP, or reject it.
+
+    Declared before the database dependency of the login route, so that a rejected
+    attempt is answered before a pooled connection is taken and a transaction begun.
+
+    Args:
+        request (Request): The incoming request, whose peer address is the client IP.
+        redis (RedisDep): The Redis connection holding the attempt windows.
+        form_data (UserLogin): The login data, including the username.
+
+    Returns:
+        UserLogin: The login data.
+
+    Raises:
+        TooManyLoginAttempts: If the username or the client IP has used up its attempts.
+    """
+    await login_throttle.hit(redis, form_data.username, request.client.host if request.client else "unknown")
+    return form_data
+
+
+ThrottledLoginDep = Annotated[UserLogin, Depends(throttle_login)]
@@ -18,3 +18,8 @@ class AuthHTTPException(HTTPException):
 class NotAuthenticated(AuthHTTPException):
     STATUS_CODE = status.HTTP_401_UNAUTHORIZED
     DETAIL = "Not authenticated"
+
+
+class TooManyLoginAttempts(AuthHTTPException):
+    STATUS_CODE = status.HTTP_429_TOO_MANY_REQUESTS
+    DETAIL = "Too many login attempts, please try again later"
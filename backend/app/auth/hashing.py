@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Literal
+
+from redis.asyncio import Redis
+
+from app.auth.config import auth_settings
+from app.auth.utils import get_password_hash, get_password_hash_rounds, verify_password
+
+logger = logging.getLogger(__name__)
+
+# The calibrated work factor is shared so that every worker hashes at the same cost
+PASSWORD_HASH_ROUNDS_KEY = "auth:password_hash_rounds"
+PASSWORD_HASH_ROUNDS_TTL = 60 * 60  # 1 hour
+
+
+def measure_password_hash(rounds: int) -> float:
+    """
+    Measure how long hashing a password takes at a given bcrypt work factor.
+
+    Args:
+        rounds (int): The bcrypt work factor.
+
+    Returns:
+        float: The duration of one hash in seconds.
+    """
+    started_at = time.perf_counter()
+    get_password_hash("calibration-password", rounds)
+    return time.perf_counter() - started_at
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        executor_type: Literal["thread", "process"],
+        max_workers: int,
+        max_concurrency: int,
+        rounds: int | None = None,
+        budget_ms: int = 250,
+        min_rounds: int = 10,
+        max_rounds: int = 14,
+    ):
+        """
+        Initialize a PasswordHasher instance.
+
+        Args/Attributes:
+            executor_type (Literal["thread", "process"]): The kind of worker pool bcrypt runs in.
+            max_workers (int): The number of workers in the pool.
+            max_concurrency (int): The maximum number of hashing jobs submitted to the pool at once.
+                Callers above this limit wait on the event loop and are counted as queued.
+            rounds (int | None): The bcrypt work factor new hashes are created with.
+                If None, calibrate() picks it and bcrypt's default is used until then.
+            budget_ms (int): The time one hash may take, used by calibrate().
+            min_rounds (int): The lowest work factor calibrate() may pick.
+            max_rounds (int): The highest work factor calibrate() may pick.
+            executor (Executor | None): The worker pool. This is initially set to None,
+                and is created when the start() method is called.
+        """
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.fixed_rounds = rounds is not None
+        self.rounds = rounds
+        self.budget_ms = budget_ms
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.executor: Executor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.queue_wait_seconds = 0.0
+        self.rehashed = 0
+
+    def start(self):
+        """
+        Create the worker pool used for hashing.
+
+        Calling this method more than once has no effect until shutdown() is called.
+
+        Returns:
+            None
+        """
+        if self.executor is not None:
+            return
+        if self.executor_type == "process":
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hasher")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Shut down the worker pool.
+
+        Waiting blocks the calling thread, so the event loop should call this in a thread.
+
+        Args:
+            wait (bool): Whether to wait for running jobs to finish.
+
+        Returns:
+            None
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+            self.executor = None
+            self._semaphore = None
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking function in the worker pool, respecting the concurrency cap.
+
+        Args:
+            func (Callable[..., Any]): The blocking function to run.
+            *args (Any): The arguments passed to the function.
+
+        Returns:
+            Any: The value returned by the function.
+        """
+        if self.executor is None:
+            self.start()
+
+        loop = asyncio.get_running_loop()
+        executor, semaphore = self.executor, self._semaphore
+
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        queued_at = loop.time()
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queued -= 1
+            self.queue_wait_seconds += loop.time() - queued_at
+
+        self.in_flight += 1
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a plain text password without blocking the event loop.
+
+        Args:
+            password (str): The plain text password to hash.
+
+        Returns:
+            str: The hashed password.
+        """
+        return await self._run(get_password_hash, password, self.rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify a plain text password against a hashed password without blocking the event loop.
+
+        Args:
+            plain_password (str): The plain text password to verify.
+            hashed_password (str): The hashed password to compare against.
+
+        Returns:
+            bool: True if the plain password matches the hashed password, False otherwise.
+        """
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """
+        Check whether a stored hash was created with a lower work factor than the current one.
+
+        Hashes with a higher work factor are kept, so that a worker calibrated to a lower
+        cost never weakens a stored hash.
+
+        Args:
+            hashed_password (str): The stored hashed password.
+
+        Returns:
+            bool: True if the password should be hashed again at the current work factor.
+        """
+        if self.rounds is None:
+            return False
+        return get_password_hash_rounds(hashed_password) < self.rounds
+
+    async def calibrate(self, redis: Redis | None = None) -> int | None:
+        """
+        Pick the highest work factor whose hash fits in the latency budget.
+
+        Each work factor from min_rounds up is timed in the worker pool until one takes
+        longer than the budget. When a Redis connection is given, the first worker to
+        calibrate shares its result and the other workers adopt it, so hashes do not
+        flip between costs from one worker to the next. A shared work factor below
+        min_rounds is raised to min_rounds. Does nothing if the work factor is fixed by
+        configuration.
+
+        Args:
+            redis (Redis | None): The Redis database connection used to share the result.
+
+        Returns:
+            int | None: The work factor in use.
+        """
+        if self.fixed_rounds:
+            return self.rounds
+
+        if redis is not None:
+            shared = await redis.get(PASSWORD_HASH_ROUNDS_KEY)
+            if shared is not None:
+                self.rounds = max(self.min_rounds, int(shared))
+                return self.rounds
+
+        rounds = self.min_rounds
+        for candidate in range(self.min_rounds, self.max_rounds + 1):
+            elapsed = await self._run(measure_password_hash, candidate)
+            if elapsed * 1000 > self.budget_ms:
+                break
+            rounds = candidate
+
+        if redis is not None:
+            await redis.set(PASSWORD_HASH_ROUNDS_KEY, rounds, nx=True, ex=PASSWORD_HASH_ROUNDS_TTL)
+            rounds = max(self.min_rounds, int(await redis.get(PASSWORD_HASH_ROUNDS_KEY) or rounds))
+
+        self.rounds = rounds
+        logger.info(f"Password hashing calibrated to {rounds} bcrypt rounds for a {self.budget_ms} ms budget")
+        return rounds
+
+    def stats(self) -> dict:
+        """
+        Return the current pool usage and queue-depth counters.
+
+        Returns:
+            dict: The hasher counters.
+        """
+        return {
+            "executor": self.executor_type,
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "queue_wait_seconds": self.queue_wait_seconds,
+            "rounds": self.rounds,
+            "rehashed": self.rehashed,
+        }
+
+
+password_hasher = PasswordHasher(
+    executor_type=auth_settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=auth_settings.PASSWORD_HASH_MAX_WORKERS,
+    max_concurrency=auth_settings.PASSWORD_HASH_MAX_CONCURRENCY,
+    rounds=auth_settings.PASSWORD_HASH_ROUNDS,
+    budget_ms=auth_settings.PASSWORD_HASH_BUDGET_MS,
+    min_rounds=auth_settings.PASSWORD_HASH_MIN_ROUNDS,
+    max_rounds=auth_settings.PASSWORD_HASH_MAX_ROUNDS,
+)
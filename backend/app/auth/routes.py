@@ -1,11 +1,12 @@
 from fastapi import APIRouter, status
 from fastapi.responses import ORJSONResponse
 
+from app.auth.deps import ThrottledLoginDep
 from app.auth.services import AuthService
 from app.auth.swagger import login_responses, register_responses
 from app.db.deps import RedisDep, WriteDbDep
 from app.schemas import CustomResponse
-from app.user.schemas import ProfileOut, UserCreate, UserLogin
+from app.user.schemas import ProfileOut, UserCreate
 
 auth_router = APIRouter(tags=["Auth"])
 
@@ -68,23 +69,25 @@ async def register(
     responses=login_responses,
 )
 async def login(
+    form_data: ThrottledLoginDep,
     db: WriteDbDep,
     redis: RedisDep,
     response: ORJSONResponse,
-    form_data: UserLogin,
 ) -> CustomResponse[ProfileOut]:
     """
     Logs in a user and returns the user's profile information.
 
     This endpoint is responsible for authenticating a user and returning the user's
-    profile information upon successful login.
+    profile information upon successful login. Attempts are throttled per username
+    and per client IP before any password is verified, and before a database
+    connection is taken: form_data is resolved before db.
 
     Args:
+        form_data (ThrottledLoginDep): Data required to login a user, including
+            username and password, once the attempt is allowed by the throttle.
         db (WriteDbDep): Database dependency for executing database operations.
         redis (RedisDep): Redis dependency for caching and session management.
         response (ORJSONResponse): FastAPI response object for setting response data.
-        form_data (UserLogin): Data required to login a user, including
-            username and password.
 
     Returns:
         CustomResponse[ProfileOut]: A custom response containing the logged in
@@ -93,6 +96,7 @@ async def login(
     Responses:
         200: User logged in successfully with profile details.
         422: Validation errors if the input data does not meet specified criteria.
+        429: Too many login attempts for the username or the client IP.
     """
     auth_service = AuthService(db, redis, response)
 
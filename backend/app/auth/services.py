@@ -1,13 +1,12 @@
 from uuid import UUID
 
 from databases import Database
-from databases.backends.postgres import Record
 from fastapi.responses import ORJSONResponse
 from pydantic import EmailStr
 from redis.asyncio import Redis
 
 from app.auth.utils import generate_token_cookie
-from app.client.services import ClientService
+from app.db.consistency import mark_written
 from app.user.services import UserService
 from app.user.utils import authenticate_user
 
@@ -33,13 +32,12 @@ class AuthService:
         password: str,
         client_name: str | None,
         client_id: UUID | None,
-    ) -> Record:
+    ) -> dict:
         """
         Registers a new user, potentially creating a new client if no client ID is provided.
 
-        This method handles the registration process by creating a new user and, if necessary,
-        a new client. It updates the user's current client ID, creates a user profile, and
-        generates a token to set in cookies.
+        This method creates the user, the client if necessary, and the user profile with
+        a single database statement, then generates a token to set in cookies.
 
         Args:
             username (str): The username for the new user.
@@ -49,55 +47,42 @@ class AuthService:
             client_id (UUID | None): The client ID to associate with the user, if available.
 
         Returns:
-            Record: The newly created user profile record.
+            dict: The newly created user profile.
         """
         user_service = UserService(self.db)
 
-        # Create user
-        user = await user_service.create_user(
+        # Create user, client and profile
+        profile = await user_service.create_user_with_profile(
             username=username,
             email=email,
             password=password,
-        )
-
-        client_service = ClientService(self.db)
-
-        if client_id is None:
-            # Create client
-            client = await client_service.create_client(name=client_name)
-            client_id = client.id
-
-        # Set client id to user current_client_id
-        await user_service.update_user_current_client(user.id, client_id)
-
-        # Create profile
-        profile = await user_service.create_profile(
+            client_name=client_name,
             client_id=client_id,
-            user_id=user.id,
-            full_name=user.username,
-            is_client_owner=True,
         )
 
         # Generate token and set cookies
         await generate_token_cookie(
             self.response,
             self.redis,
-            str(client_id),
-            str(user.id),
+            str(profile["client_id"]),
+            str(profile["user_id"]),
         )
 
+        # The new user's next reads must find the profile even if the replicas lag
+        await mark_written(self.redis, str(profile["user_id"]))
+
         return profile
 
-    async def login(self, username: str, password: str) -> Record:
+    async def login(self, username: str, password: str) -> dict:
         """
-        Login a user and return the updated profile record.
+        Login a user and return the updated profile.
 
         Args:
             username (str): The username of the user.
             password (str): The password of the user.
 
         Returns:
-            Record: The updated user profile record.
+            dict: The user profile with its updated last login time.
         """
         user_service = UserService(self.db)
 
@@ -55,4 +55,10 @@ login_responses = {
         ],
         None,
     ),
+    status.HTTP_429_TOO_MANY_REQUESTS: response_model(
+        "Too Many Requests",
+        status.HTTP_429_TOO_MANY_REQUESTS,
+        "Too many login attempts, please try again later",
+        None,
+    ),
 }
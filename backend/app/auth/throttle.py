@@ -0,0 +1,120 @@
+import math
+from uuid import uuid4
+
+from redis.asyncio import Redis
+
+from app.auth.config import auth_settings
+from app.auth.exceptions import TooManyLoginAttempts
+
+LOGIN_THROTTLE_USERNAME_PREFIX = "throttle:login:user:"
+LOGIN_THROTTLE_IP_PREFIX = "throttle:login:ip:"
+
+# Sliding-window limiter over one sorted set of attempt timestamps per key.
+# KEYS: the throttled keys. ARGV: window in ms, a unique attempt id, then one limit per key.
+# Returns {0, 0} and records the attempt under every key if all keys are under their limit.
+# Otherwise returns the 1-based index of the first key over its limit and the milliseconds
+# until its oldest attempt leaves the window, and records nothing.
+SLIDING_WINDOW_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = tonumber(ARGV[1])
+
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= tonumber(ARGV[i + 2]) then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        return {i, tonumber(oldest[2]) + window - now}
+    end
+end
+
+for _, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[2])
+    redis.call('PEXPIRE', key, window)
+end
+return {0, 0}
+"""
+
+
+class LoginThrottle:
+    def __init__(self, window_seconds: int, max_attempts_per_username: int, max_attempts_per_ip: int):
+        """
+        Initialize a LoginThrottle instance.
+
+        Login attempts are counted in a sliding window per username and per client IP,
+        checked and recorded atomically by a Lua script, so password verification work
+        is capped per unit of time whatever the request rate.
+
+        The client IP is the peer address of the request. Behind a reverse proxy or load
+        balancer, the server must be run with its proxy headers trusted, e.g. uvicorn
+        --proxy-headers --forwarded-allow-ips=<proxy>, or every client shares the proxy's
+        address and its limit. Clients behind a shared NAT share a limit too; set
+        max_attempts_per_ip accordingly, or to 0 to throttle per username only.
+
+        Args/Attributes:
+            window_seconds (int): The length of the sliding window in seconds.
+            max_attempts_per_username (int): The attempts allowed per username within the window.
+            max_attempts_per_ip (int): The attempts allowed per client IP within the window,
+                or 0 for no limit per IP.
+        """
+        self.window_seconds = window_seconds
+        self.max_attempts_per_username = max_attempts_per_username
+        self.max_attempts_per_ip = max_attempts_per_ip
+        self._script = None
+
+        self.allowed = 0
+        self.rejected_username = 0
+        self.rejected_ip = 0
+
+    async def hit(self, redis: Redis, username: str, ip: str):
+        """
+        Record a login attempt, or reject it if a limit is reached.
+
+        Args:
+            redis (Redis): The Redis database connection.
+            username (str): The username or email the attempt is made for.
+            ip (str): The IP address of the client making the attempt.
+
+        Raises:
+            TooManyLoginAttempts: If the username or the IP has used up its attempts, with
+                a Retry-After header of the seconds until its oldest attempt leaves the window.
+        """
+        if self._script is None or self._script.registered_client is not redis:
+            self._script = redis.register_script(SLIDING_WINDOW_SCRIPT)
+
+        keys = [LOGIN_THROTTLE_USERNAME_PREFIX + username.lower()]
+        limits = [self.max_attempts_per_username]
+        if self.max_attempts_per_ip:
+            keys.append(LOGIN_THROTTLE_IP_PREFIX + ip)
+            limits.append(self.max_attempts_per_ip)
+        exceeded, retry_after_ms = await self._script(
+            keys=keys, args=[self.window_seconds * 1000, uuid4().hex, *limits]
+        )
+
+        if exceeded == 0:
+            self.allowed += 1
+            return
+        if exceeded == 1:
+            self.rejected_username += 1
+        else:
+            self.rejected_ip += 1
+        raise TooManyLoginAttempts(headers={"Retry-After": str(max(1, math.ceil(retry_after_ms / 1000)))})
+
+    def stats(self) -> dict:
+        """
+        Return the throttle counters.
+
+        Returns:
+            dict: The number of allowed attempts and of attempts rejected per limit.
+        """
+        return {
+            "allowed": self.allowed,
+            "rejected_username": self.rejected_username,
+            "rejected_ip": self.rejected_ip,
+        }
+
+
+login_throttle = LoginThrottle(
+    window_seconds=auth_settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+    max_attempts_per_username=auth_settings.LOGIN_THROTTLE_MAX_ATTEMPTS_PER_USERNAME,
+    max_attempts_per_ip=auth_settings.LOGIN_THROTTLE_MAX_ATTEMPTS_PER_IP,
+)
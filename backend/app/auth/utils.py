@@ -1,12 +1,38 @@
-import json
+import asyncio
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
+from uuid import uuid4
 
 import bcrypt
 import jwt
+import orjson
 from fastapi.responses import ORJSONResponse
 from redis.asyncio import Redis
 
 from app.auth.config import auth_settings
+from app.cache import LRUCache
+from app.db.redis import client_cache
+from app.singleflight import SingleFlight
+
+# Verified access token payloads, each evicted at the token's own exp
+access_token_cache = LRUCache(max_size=auth_settings.ACCESS_TOKEN_CACHE_SIZE)
+
+# Refresh sessions are stored as rt:<session_id> -> {c: client_id, u: user_id},
+# with rt:user:<user_id> holding the set of the user's active session ids
+REFRESH_SESSION_PREFIX = "rt:"
+REFRESH_USER_SESSIONS_PREFIX = "rt:user:"
+
+# Sessions stored before then are keyed by the refresh token itself with a JSON value
+# {client_id, user_id}; they are moved to rt:<session_id> on first use, see
+# migrate_legacy_refresh_token(). The fallback can go once REFRESH_TOKEN_EXPIRE_MINUTES
+# have passed since the last legacy session was written.
+
+# A refresh in progress holds rt:lock:<session_id>, and its result is shared
+# with the other workers through rt:access:<session_id> for a few seconds
+REFRESH_LOCK_PREFIX = "rt:lock:"
+REFRESH_RESULT_PREFIX = "rt:access:"
+refresh_single_flight = SingleFlight()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -23,7 +49,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
 
-def get_password_hash(password: str) -> str:
+def get_password_hash(password: str, rounds: int | None = None) -> str:
     """
     Get the hashed password of a plain text password.
 
@@ -32,16 +58,30 @@ def get_password_hash(password: str) -> str:
 
     Args:
         password (str): The plain text password to hash.
+        rounds (int | None): The bcrypt work factor. Defaults to bcrypt's default.
 
     Returns:
         str: The hashed password.
     """
     pwd_bytes = password.encode("utf-8")
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds) if rounds is not None else bcrypt.gensalt()
     hashed_password = bcrypt.hashpw(password=pwd_bytes, salt=salt)
     return hashed_password.decode("utf-8")
 
 
+def get_password_hash_rounds(hashed_password: str) -> int:
+    """
+    Get the bcrypt work factor a hashed password was created with.
+
+    Args:
+        hashed_password (str): The hashed password, e.g. "$2b$12$...".
+
+    Returns:
+        int: The work factor.
+    """
+    return int(hashed_password.split("$")[2])
+
+
 async def generate_token(
     token_type: str,
     secret_key: str,
@@ -73,6 +113,7 @@ async def generate_token(
         "iat": created_at,
         "exp": expires_at,
         "type": token_type,
+        "jti": uuid4().hex,
     }
 
     token = jwt.encode(
@@ -84,6 +125,35 @@ async def generate_token(
     return token, expires_at
 
 
+def decode_access_token(access_token: str) -> dict:
+    """
+    Verify an access token and return its payload.
+
+    Payloads of verified tokens are kept in an in-process LRU until the token's
+    exp, so repeat requests carrying the same cookie skip signature verification
+    and claim parsing.
+
+    Args:
+        access_token (str): The encoded access token.
+
+    Returns:
+        dict: The decoded token payload.
+
+    Raises:
+        InvalidTokenError: If the token is invalid or expired.
+    """
+    payload = access_token_cache.get(access_token)
+    if payload is None:
+        payload = jwt.decode(
+            access_token,
+            auth_settings.ACCESS_SECRET_KEY,
+            algorithms=[auth_settings.ALGORITHM],
+        )
+        if "exp" in payload:
+            access_token_cache.set(access_token, payload, expires_at=payload["exp"])
+    return payload
+
+
 def set_token_cookies(
     response: ORJSONResponse,
     access_token: str,
@@ -130,6 +200,23 @@ def set_token_cookies(
         )
 
 
+def refresh_session_id(refresh_token: str) -> str:
+    """
+    Derive the short session id under which a refresh token is stored.
+
+    The session id is a 96-bit digest of the signed token, so lookups need neither
+    the full token as a key nor a JWT decode. Every token carries a random jti,
+    which keeps the digests of tokens minted in the same second distinct.
+
+    Args:
+        refresh_token (str): The refresh token.
+
+    Returns:
+        str: The session id.
+    """
+    return hashlib.blake2b(refresh_token.encode("utf-8"), digest_size=12).hexdigest()
+
+
 async def save_refresh_token(
     redis: Redis,
     refresh_token: str,
@@ -148,27 +235,74 @@ async def save_refresh_token(
         client_id (str): The client_id associated with the refresh token.
         user_id (str): The user_id associated with the refresh token.
 
-    This function stores a refresh token in redis with its associated client_id and user_id.
-    The refresh token is set to expire after the given time.
+    This function stores the session as a small hash under its session id and adds the
+    session id to the user's session set, in a single MULTI round trip. Both keys are
+    set to expire after the given time.
     """
     if isinstance(expires_in, datetime):
         expires_in = expires_in - datetime.now(timezone.utc)
-    value = json.dumps({"client_id": client_id, "user_id": user_id})
-    await redis.setex(refresh_token, expires_in, value)
+    session_id = refresh_session_id(refresh_token)
+    session_key = REFRESH_SESSION_PREFIX + session_id
+    user_key = REFRESH_USER_SESSIONS_PREFIX + user_id
+
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hset(session_key, mapping={"c": client_id, "u": user_id})
+        pipe.expire(session_key, expires_in)
+        pipe.sadd(user_key, session_id)
+        pipe.expire(user_key, expires_in)
+        await pipe.execute()
+
+
+async def migrate_legacy_refresh_token(redis: Redis, refresh_token: str) -> dict | None:
+    """
+    Move a refresh session stored under the legacy layout to the current one.
+
+    The session keeps the time it had left. Workers migrating the same session at once
+    write the same keys, so the migration needs no lock.
+
+    Args:
+        redis (Redis): The Redis database connection.
+        refresh_token (str): The refresh token.
+
+    Returns:
+        dict | None: The migrated session as stored, {c: client_id, u: user_id}, or None
+        if the token has no legacy session.
+    """
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.pttl(refresh_token)
+        pipe.get(refresh_token)
+        ttl_ms, value = await pipe.execute()
+    if value is None or ttl_ms <= 0:
+        return None
+
+    legacy = orjson.loads(value)
+    expires_at = datetime.now(timezone.utc) + timedelta(milliseconds=ttl_ms)
+    await save_refresh_token(redis, refresh_token, expires_at, legacy["client_id"], legacy["user_id"])
+    await redis.delete(refresh_token)
+    return {"c": legacy["client_id"], "u": legacy["user_id"]}
 
 
-async def get_refresh_token(redis: Redis, refresh_token: str) -> str | None:
+async def get_refresh_token(redis: Redis, refresh_token: str) -> dict | None:
     """
-    Retrieve a refresh token from Redis.
+    Retrieve the session of a refresh token from Redis.
+
+    The session is served from the client-side cache when Redis client-side caching is on.
+    A session stored under the legacy layout is migrated.
 
     Args:
         redis (Redis): The Redis database connection.
         refresh_token (str): The refresh token to be retrieved.
 
     Returns:
-        str | None: The refresh token value if found, None otherwise.
+        dict | None: The client_id and user_id of the session if found, None otherwise.
     """
-    return await redis.get(refresh_token)
+    session_key = REFRESH_SESSION_PREFIX + refresh_session_id(refresh_token)
+    session = await client_cache.fetch(session_key, lambda: redis.hgetall(session_key))
+    if not session:
+        session = await migrate_legacy_refresh_token(redis, refresh_token)
+    if not session:
+        return None
+    return {"client_id": session["c"], "user_id": session["u"]}
 
 
 async def delete_refresh_token(redis: Redis, refresh_token: str):
@@ -179,9 +313,175 @@ async def delete_refresh_token(redis: Redis, refresh_token: str):
         redis (Redis): The Redis database connection.
         refresh_token (str): The refresh token to be deleted.
 
-    This function deletes a refresh token from redis.
+    This function deletes the session of the refresh token, under either layout, and
+    removes it from the user's session set.
     """
-    await redis.delete(refresh_token)
+    session_id = refresh_session_id(refresh_token)
+    session_key = REFRESH_SESSION_PREFIX + session_id
+    user_id = await redis.hget(session_key, "u")
+
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.delete(session_key, REFRESH_RESULT_PREFIX + session_id, refresh_token)
+        if user_id is not None:
+            pipe.srem(REFRESH_USER_SESSIONS_PREFIX + user_id, session_id)
+        await pipe.execute()
+
+
+async def list_refresh_sessions(redis: Redis, user_id: str) -> set[str]:
+    """
+    List the refresh session ids of a user.
+
+    The set may still contain ids of sessions that expired on their own; their
+    hashes no longer exist.
+
+    Args:
+        redis (Redis): The Redis database connection.
+        user_id (str): The user_id whose sessions are listed.
+
+    Returns:
+        set[str]: The session ids.
+    """
+    return await redis.smembers(REFRESH_USER_SESSIONS_PREFIX + user_id)
+
+
+async def revoke_refresh_sessions(redis: Redis, user_id: str) -> int:
+    """
+    Revoke every refresh session of a user, logging them out everywhere.
+
+    Args:
+        redis (Redis): The Redis database connection.
+        user_id (str): The user_id whose sessions are revoked.
+
+    Returns:
+        int: The number of sessions that were still active.
+    """
+    user_key = REFRESH_USER_SESSIONS_PREFIX + user_id
+    session_ids = await redis.smembers(user_key)
+    if not session_ids:
+        return 0
+
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.delete(*(REFRESH_SESSION_PREFIX + session_id for session_id in session_ids))
+        pipe.delete(user_key, *(REFRESH_RESULT_PREFIX + session_id for session_id in session_ids))
+        deleted, _ = await pipe.execute()
+    return deleted
+
+
+def _load_refreshed_access_token(value: str) -> tuple[str, datetime]:
+    """
+    Parse an access token shared through Redis by another refresh.
+
+    Args:
+        value (str): The stored "<access_token> <expires_at timestamp>" value.
+
+    Returns:
+        tuple[str, datetime]: The access token and its expiration datetime.
+    """
+    access_token, expires_at = value.split(" ")
+    return access_token, datetime.fromtimestamp(float(expires_at), tz=timezone.utc)
+
+
+async def _refresh_access_token(redis: Redis, refresh_token: str, session_id: str) -> tuple[str, datetime] | None:
+    """
+    Mint a new access token for a refresh session, coordinating with other workers.
+
+    The first round trip reads a result shared by another worker, tries to take the
+    refresh lock and reads the session. The lock holder mints the token and shares it
+    in a second round trip. A worker that loses the lock race polls for the shared
+    result, and mints a token itself if none appears before the lock times out.
+
+    With Redis client-side caching on, a shared result read earlier by this worker is
+    returned without a round trip, and a cached session is not read again. A session
+    stored under the legacy layout is migrated.
+
+    Args:
+        redis (Redis): The Redis database connection.
+        refresh_token (str): The refresh token.
+        session_id (str): The session id of the refresh token.
+
+    Returns:
+        tuple[str, datetime] | None: The access token and its expiration datetime,
+        or None if the refresh session does not exist.
+    """
+    result_key = REFRESH_RESULT_PREFIX + session_id
+    lock_key = REFRESH_LOCK_PREFIX + session_id
+    session_key = REFRESH_SESSION_PREFIX + session_id
+
+    shared = client_cache.get(result_key)
+    if shared:
+        return _load_refreshed_access_token(shared)
+    session = client_cache.get(session_key)
+
+    result_marker = client_cache.watch(result_key)
+    session_marker = client_cache.watch(session_key) if session is None else None
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.get(result_key)
+        pipe.set(lock_key, "1", nx=True, px=auth_settings.REFRESH_LOCK_TIMEOUT_MS)
+        if session is None:
+            pipe.hgetall(session_key)
+        shared, locked, *fetched = await pipe.execute()
+    if session is None:
+        session = fetched[0]
+        client_cache.store(session_key, session_marker, session)
+
+    if shared:
+        # Shared results live REFRESH_RESULT_TTL_MS in Redis, so do not outlive that locally
+        expires_at = time.time() + auth_settings.REFRESH_RESULT_TTL_MS / 1000
+        client_cache.store(result_key, result_marker, shared, expires_at)
+        return _load_refreshed_access_token(shared)
+    if not session:
+        session = await migrate_legacy_refresh_token(redis, refresh_token)
+    if not session:
+        if locked:
+            await redis.delete(lock_key)
+        return None
+
+    if not locked:
+        deadline = asyncio.get_running_loop().time() + auth_settings.REFRESH_LOCK_TIMEOUT_MS / 1000
+        while asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.01)
+            shared = await redis.get(result_key)
+            if shared:
+                return _load_refreshed_access_token(shared)
+
+    access_token, access_expires_at = await generate_token(
+        "access_token",
+        auth_settings.ACCESS_SECRET_KEY,
+        auth_settings.ALGORITHM,
+        auth_settings.ACCESS_TOKEN_EXPIRE_MINUTES,
+        session["c"],
+        session["u"],
+    )
+
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.set(result_key, f"{access_token} {access_expires_at.timestamp()}", px=auth_settings.REFRESH_RESULT_TTL_MS)
+        if locked:
+            pipe.delete(lock_key)
+        await pipe.execute()
+
+    return access_token, access_expires_at
+
+
+async def refresh_access_token(redis: Redis, refresh_token: str) -> tuple[str, datetime] | None:
+    """
+    Mint a new access token from a refresh token, once per burst of concurrent refreshes.
+
+    Concurrent refreshes of the same session share one in-flight call within a worker,
+    and one lock holder across workers, so they all receive the same access token.
+
+    Args:
+        redis (Redis): The Redis database connection.
+        refresh_token (str): The refresh token.
+
+    Returns:
+        tuple[str, datetime] | None: The access token and its expiration datetime,
+        or None if the refresh session does not exist.
+    """
+    session_id = refresh_session_id(refresh_token)
+    return await refresh_single_flight.do(
+        session_id,
+        lambda: _refresh_access_token(redis, refresh_token, session_id),
+    )
 
 
 async def generate_token_cookie(response: ORJSONResponse, redis: Redis, client_id: str, user_id: str):
@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    def __init__(self, max_size: int, ttl: float | None = None):
+        """
+        Initialize a bounded in-process LRU cache.
+
+        Entries expire at their own absolute deadline (seconds since the epoch) when
+        one is given to set(), otherwise after the default ttl, otherwise never.
+
+        Args/Attributes:
+            max_size (int): The maximum number of entries kept before the least recently
+                used one is evicted.
+            ttl (float | None): The default time to live of an entry in seconds.
+            hits (int): The number of lookups that returned a live entry.
+            misses (int): The number of lookups that found no entry or an expired one.
+            evictions (int): The number of entries dropped to respect max_size.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Return the cached value for a key, or None if it is missing or expired.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            Any | None: The cached value.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: float | None = None):
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to store.
+            expires_at (float | None): The absolute expiry time in seconds since the epoch.
+                Defaults to now + ttl when the cache has a default ttl.
+
+        Returns:
+            None
+        """
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable):
+        """
+        Remove a key from the cache if present.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            None
+        """
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every entry from the cache. Counters are kept.
+
+        Returns:
+            None
+        """
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the cache size and hit/miss counters.
+
+        Returns:
+            dict: The cache counters.
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
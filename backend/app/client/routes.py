@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
+from app.essay.routes import essay_router
 from app.user.routes import user_router
 
 client_router = APIRouter()
 
 
 client_router.include_router(user_router, prefix="/user")
+client_router.include_router(essay_router, prefix="/essay")
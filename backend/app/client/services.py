@@ -1,14 +1,25 @@
 from databases import Database
-from databases.backends.postgres import Record
+from sqlalchemy import bindparam, insert
 
 from app.client.exceptions import ClientBadRequest
+from app.client.models import Client
+from app.db.queries import columns, compile_query, row_class
+from app.db.statements import Row, statements
+
+ClientRow = row_class("ClientRow", Client, ("id", "name", "created_at", "updated_at"))
+
+statements.register(
+    "create_client",
+    compile_query(insert(Client).values(name=bindparam("name")).returning(*columns(Client, ClientRow.fields))),
+    ClientRow,
+)
 
 
 class ClientService:
     def __init__(self, db: Database):
         self.db = db
 
-    async def create_client(self, name: str) -> Record:
+    async def create_client(self, name: str) -> Row:
         """
         Creates a new client in the database with the specified name.
 
@@ -19,20 +30,14 @@ class ClientService:
             name (str): The name of the client to be created.
 
         Returns:
-            Record: The newly created client record.
+            Row: The newly created client record.
 
         Raises:
             ClientBadRequest: If the client creation fails due to a database error.
         """
 
-        query = """INSERT INTO clients (name) VALUES (:name) RETURNING *"""
         try:
-            created_user = await self.db.fetch_one(
-                query=query,
-                values={
-                    "name": name,
-                },
-            )
+            created_user = await statements.fetch_one(self.db, "create_client", {"name": name})
             return created_user
         except Exception as e:
             raise ClientBadRequest(detail=f"Failed to create user: {str(e)}")
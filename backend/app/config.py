@@ -12,6 +12,14 @@ class Config(BaseSettings):
     API_V1_STR: str = "/api/v1"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
     PROJECT_NAME: str
+    SHUTDOWN_TIMEOUT: float = 10.0  # 10 secs to close the database connections
+
+    # Per-request budgets above which the query profiler logs a request
+    PROFILER_ENABLED: bool = True
+    PROFILER_MAX_QUERIES: int = 20
+    PROFILER_MAX_DB_MS: float = 200
+    PROFILER_SLOW_QUERY_MS: float = 100
+    PROFILER_REPEATED_QUERY_THRESHOLD: int = 2
 
 
 settings = Config()
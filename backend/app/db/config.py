@@ -1,3 +1,5 @@
+from typing import Literal
+
 from databases import DatabaseURL
 
 from app.config import BaseSettings
@@ -11,10 +13,32 @@ class DbConfig(BaseSettings):
     DATABASE_MAX_CONNECTIONS: int = 20
     DATABASE_TIMEOUT: int = 30
     DATABASE_MAX_INACTIVE_CONNECTION_LIFETIME: int = 180
+    # "transaction" when connecting through PgBouncer in transaction pooling mode
+    DATABASE_POOL_MODE: Literal["session", "transaction"] = "session"
+
+    # PostgreSQL read replica settings
+    DATABASE_REPLICA_URLS: list[str] = []  # JSON list, e.g. '["postgresql://...", ...]'
+    DATABASE_REPLICA_SELECTION: Literal["round_robin", "least_busy"] = "round_robin"
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = 1.0
+    DATABASE_REPLICA_LAG_CHECK_INTERVAL: float = 1.0  # 1 sec
+    DATABASE_REPLICA_MAX_BACKOFF: float = 60.0  # 1 min between checks of an unreachable replica
+    DATABASE_READ_YOUR_WRITES_SECONDS: int = 5  # 5 secs
 
     # Redis settings
     REDIS_HOST: str
     REDIS_PORT: int
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0  # 5 secs waiting for a free connection
+    REDIS_SOCKET_TIMEOUT: float = 2.0  # 2 secs
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2.0  # 2 secs
+    REDIS_SOCKET_KEEPALIVE: bool = True
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # 30 secs
+
+    # Redis client-side caching settings (RESP3 tracking with server-assisted invalidation)
+    REDIS_CLIENT_CACHE_ENABLED: bool = False
+    REDIS_CLIENT_CACHE_PREFIXES: list[str] = ["rt:"]  # JSON list
+    REDIS_CLIENT_CACHE_SIZE: int = 10_000
+    REDIS_CLIENT_CACHE_TTL: int = 60  # 1 min
 
 
 db_settings = DbConfig()
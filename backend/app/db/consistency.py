@@ -0,0 +1,105 @@
+import logging
+
+from fastapi import Request
+from jwt.exceptions import InvalidTokenError
+from redis.asyncio import Redis
+
+from app.auth.utils import decode_access_token
+from app.db.config import db_settings
+from app.db.postgresql import postgresql_config
+
+logger = logging.getLogger(__name__)
+
+# A user who wrote to the primary holds ryw:<user_id> for a few seconds,
+# during which their reads skip the replicas
+READ_YOUR_WRITES_PREFIX = "ryw:"
+
+
+def request_user_id(request: Request) -> str | None:
+    """
+    Get the user a request is made by from its access token cookie.
+
+    Verified tokens are served from the access token cache, so this is cheap on
+    repeat requests.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        str | None: The user_id of the access token, or None if there is no valid one.
+    """
+    access_token = request.cookies.get("access_token")
+    if access_token is None:
+        return None
+    try:
+        return decode_access_token(access_token).get("user_id")
+    except InvalidTokenError:
+        return None
+
+
+async def mark_written(redis: Redis, user_id: str | None):
+    """
+    Record that a user wrote to the primary, so their next reads see the write.
+
+    Nothing is recorded when there are no replicas to route reads to.
+
+    Args:
+        redis (Redis): The Redis database connection.
+        user_id (str | None): The user who wrote, if known.
+
+    Returns:
+        None
+    """
+    if user_id is None or not postgresql_config.replicas:
+        return
+    try:
+        await redis.set(READ_YOUR_WRITES_PREFIX + user_id, "1", ex=db_settings.DATABASE_READ_YOUR_WRITES_SECONDS)
+    except Exception as e:
+        logger.warning(f"Failed to mark a write of user {user_id}: {e}")
+
+
+async def mark_written_many(redis: Redis, user_ids: list[str]):
+    """
+    Record that several users wrote to the primary, in one round trip.
+
+    Used by background writes, e.g. the last login flush, which are not made by a
+    request of the user.
+
+    Args:
+        redis (Redis): The Redis database connection.
+        user_ids (list[str]): The users whose rows were written.
+
+    Returns:
+        None
+    """
+    if not user_ids or not postgresql_config.replicas:
+        return
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.set(READ_YOUR_WRITES_PREFIX + user_id, "1", ex=db_settings.DATABASE_READ_YOUR_WRITES_SECONDS)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to mark writes of {len(user_ids)} users: {e}")
+
+
+async def wrote_recently(redis: Redis, user_id: str | None) -> bool:
+    """
+    Check whether a user's reads must go to the primary to see their own writes.
+
+    When Redis cannot answer, the read goes to the primary.
+
+    Args:
+        redis (Redis): The Redis database connection.
+        user_id (str | None): The user making the read, if known.
+
+    Returns:
+        bool: True if the user wrote within the read-your-writes window.
+    """
+    if user_id is None:
+        return False
+    try:
+        return bool(await redis.exists(READ_YOUR_WRITES_PREFIX + user_id))
+    except Exception as e:
+        logger.warning(f"Failed to check recent writes of user {user_id}: {e}")
+        return True
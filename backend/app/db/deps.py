@@ -1,72 +1,137 @@
-from typing import Annotated, AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncGenerator, AsyncIterator
 
 from databases import Database
-from fastapi import Depends
+from fastapi import Depends, Request
 from redis.asyncio import Redis
 
+from app.db.consistency import mark_written, request_user_id, wrote_recently
 from app.db.postgresql import postgresql_config
 from app.db.redis import redis_config
 
 
-async def write_db_transaction() -> AsyncGenerator[Database, None]:
+async def get_redis() -> AsyncGenerator[Redis, None]:
+    """
+    Acquire the Redis client as a dependency.
+
+    This function is a FastAPI dependency that yields the Redis client
+    for performing Redis operations.
+
+    Yields:
+        Redis: a Redis client instance
+    """
+
+    yield redis_config.redis_client
+
+
+RedisDep = Annotated[Redis, Depends(get_redis)]
+
+
+@asynccontextmanager
+async def read_pool(request: Request, redis: Redis) -> AsyncIterator[Database]:
+    """
+    Acquire the pool the reads of a request should use.
+
+    Reads go to a replica when replicas are configured, unless the user of the
+    request wrote recently and must read their own writes from the primary.
+
+    Args:
+        request (Request): The incoming request.
+        redis (Redis): The Redis client holding the read-your-writes markers.
+
+    Yields:
+        Database: The pool of a replica or of the primary.
+    """
+    primary = bool(postgresql_config.replicas) and await wrote_recently(redis, request_user_id(request))
+    async with postgresql_config.read_pool(primary=primary) as db:
+        yield db
+
+
+async def write_db_transaction(request: Request, redis: RedisDep) -> AsyncGenerator[Database, None]:
     """
     Acquire a transaction for write operations as db dependency.
 
     This function is a fastapi dependency that yields a transaction
     for write operations. This transaction is configured with
     isolation level 'read committed', readonly=False, and deferrable=False.
+    Before it commits, the user of the request is marked as having written,
+    so that their next reads go to the primary.
 
     Yields:
         Database: a database instance with a transaction
     """
-    async with postgresql_config.db_pool.transaction(isolation="read_committed", readonly=False, deferrable=False):
-        yield postgresql_config.db_pool
+    db = postgresql_config.db_pool
+    async with postgresql_config.connection(db):
+        async with db.transaction(isolation="read_committed", readonly=False, deferrable=False):
+            yield db
+            await mark_written(redis, request_user_id(request))
 
 
-async def read_db_transaction() -> AsyncGenerator[Database, None]:
+async def read_db_transaction(request: Request, redis: RedisDep) -> AsyncGenerator[Database, None]:
     """
-    Acquire a transaction for read operations as db dependency.
+    Acquire a snapshot transaction for read operations as db dependency.
 
     This function is a FastAPI dependency that yields a transaction
     for read operations. This transaction is configured with
-    isolation level 'repeatable read', readonly=True, and deferrable=True.
+    isolation level 'repeatable read', readonly=True, and deferrable=True,
+    so that every statement of the request reads the same snapshot. It costs
+    a BEGIN and a COMMIT round trip and holds one connection for the whole
+    request, so it is meant for reads of several statements that must agree,
+    e.g. reports. It runs on a replica when one is available, see read_pool().
 
     Yields:
         Database: a database instance with a transaction
     """
 
-    async with postgresql_config.db_pool.transaction(isolation="repeatable_read", readonly=True, deferrable=True):
-        yield postgresql_config.db_pool
+    async with read_pool(request, redis) as db, postgresql_config.connection(db):
+        async with db.transaction(isolation="repeatable_read", readonly=True, deferrable=True):
+            yield db
 
 
-async def get_db() -> AsyncGenerator[Database, None]:
+async def get_db(request: Request, redis: RedisDep) -> AsyncGenerator[Database, None]:
     """
     Acquire the databases pool as db dependency.
 
     This function is a FastAPI dependency that yields the databases pool
-    for single query operations.
+    for single query operations. Each query runs in autocommit on a pooled
+    connection, acquired for that query only, and sees its own snapshot.
+    This costs no BEGIN or COMMIT round trip, so it is the read mode of
+    single-statement endpoints. The queries are reads and run on a replica
+    when one is available, see read_pool().
 
     Yields:
         Database: a database instance
     """
-    yield postgresql_config.db_pool
+    async with read_pool(request, redis) as db:
+        yield db
 
 
-async def get_redis() -> AsyncGenerator[Redis, None]:
+async def get_write_db(request: Request, redis: RedisDep) -> AsyncGenerator[Database, None]:
     """
-    Acquire the Redis client as a dependency.
+    Acquire the primary pool for single-statement writes as db dependency.
 
-    This function is a FastAPI dependency that yields the Redis client
-    for performing Redis operations.
+    This function is a FastAPI dependency that yields the pool of the primary.
+    Each statement runs in autocommit, so a write is committed as soon as it
+    returns, e.g. before work depending on it is handed to another process.
+    The user of the request is marked as having written up front, so that
+    their next reads go to the primary whenever the response reaches them.
 
     Yields:
-        Redis: a Redis client instance
+        Database: a database instance
     """
-
-    yield redis_config.redis_client
+    await mark_written(redis, request_user_id(request))
+    yield postgresql_config.db_pool
 
 
+# Routes declare the consistency their reads need by the dependency they use:
+# StatementReadDbDep when each statement may see its own snapshot, SnapshotReadDbDep
+# when all statements of the request must see the same one
 WriteDbDep = Annotated[Database, Depends(write_db_transaction)]
-ReadDbDep = Annotated[Database, Depends(read_db_transaction)]
-SimpleDbDep = Annotated[Database, Depends(get_db)]
-RedisDep = Annotated[Redis, Depends(get_redis)]
+StatementWriteDbDep = Annotated[Database, Depends(get_write_db)]
+SnapshotReadDbDep = Annotated[Database, Depends(read_db_transaction)]
+StatementReadDbDep = Annotated[Database, Depends(get_db)]
+
+# Deprecated: the names these dependencies had before routes declared their read
+# consistency. Kept for existing imports, use SnapshotReadDbDep and StatementReadDbDep.
+ReadDbDep = SnapshotReadDbDep
+SimpleDbDep = StatementReadDbDep
@@ -1,6 +1,115 @@
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Literal
+
+import asyncpg
+from asyncpg.pool import PoolConnectionProxy
 from databases import Database, DatabaseURL
+from databases.core import Connection
+from prometheus_client.core import GaugeMetricFamily
 
+from app.config import settings
 from app.db.config import db_settings
+from app.metrics import current_route, db_pool_acquire_seconds
+from app.metrics import registry as metrics_registry
+from app.profiler import attach_query_logger
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary, 0 when it has replayed everything it received
+REPLICATION_LAG_QUERY = """SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END"""
+
+
+class Replica:
+    def __init__(self, db_pool: Database, check_interval: float = 1.0, max_backoff: float = 60.0):
+        """
+        Initialize a Replica instance.
+
+        A replica that cannot be reached is marked unhealthy once, with a warning, and is
+        then checked less and less often, from every check_interval up to every max_backoff,
+        until it answers again. A replica that could not connect at startup is connected
+        by these checks.
+
+        Args/Attributes:
+            db_pool (Database): The connection pool of the replica.
+            check_interval (float): The time between two lag measurements in seconds.
+            max_backoff (float): The maximum time between two checks of an unreachable
+                replica in seconds.
+            in_flight (int): The number of reads currently using the replica.
+            lag (float | None): The last measured replication lag in seconds, or None if
+                it has not been measured yet or the replica is unhealthy.
+            failures (int): The number of checks failed in a row.
+        """
+        self.db_pool = db_pool
+        self.check_interval = check_interval
+        self.max_backoff = max_backoff
+        self.in_flight = 0
+        self.lag: float | None = None
+        self.failures = 0
+        self._next_check = 0.0
+
+    async def connect(self) -> bool:
+        """
+        Connect the pool of the replica.
+
+        Returns:
+            bool: Whether the replica is connected. If not, it is marked unhealthy.
+        """
+        try:
+            await self.db_pool.connect()
+        except Exception as e:
+            self.mark_unhealthy(f"Failed to connect to replica {self.db_pool.url.hostname}: {e}")
+            return False
+        return True
+
+    def mark_unhealthy(self, reason: str):
+        """
+        Leave the replica out of read routing and back off its checks.
+
+        Only the first failure in a row is logged.
+
+        Args:
+            reason (str): What failed.
+
+        Returns:
+            None
+        """
+        if self.failures == 0:
+            logger.warning(f"{reason}. Marked unhealthy until it answers again.")
+        self.failures += 1
+        self.lag = None
+        backoff = min(self.check_interval * 2 ** (self.failures - 1), self.max_backoff)
+        self._next_check = time.monotonic() + backoff
+
+    async def measure_lag(self) -> float | None:
+        """
+        Measure the replication lag of the replica.
+
+        An unhealthy replica is only checked again once its backoff has elapsed, and
+        connected first if it is not.
+
+        Returns:
+            float | None: The lag in seconds, or None if the replica is unhealthy.
+        """
+        if time.monotonic() < self._next_check:
+            return self.lag
+        if not self.db_pool.is_connected and not await self.connect():
+            return self.lag
+        try:
+            self.lag = float(await self.db_pool.fetch_val(REPLICATION_LAG_QUERY))
+        except Exception as e:
+            self.mark_unhealthy(f"Failed to measure replication lag of {self.db_pool.url.hostname}: {e}")
+            return self.lag
+        if self.failures:
+            logger.info(f"Replica {self.db_pool.url.hostname} is healthy again after {self.failures} failed checks")
+            self.failures = 0
+        return self.lag
 
 
 class PostgresqlConfig:
@@ -11,6 +120,13 @@ class PostgresqlConfig:
         max_size: int,
         timeout: float,
         max_inactive_connection_lifetime: float,
+        replica_urls: list[DatabaseURL | str] | None = None,
+        replica_selection: Literal["round_robin", "least_busy"] = "round_robin",
+        replica_max_lag: float = 1.0,
+        lag_check_interval: float = 1.0,
+        replica_max_backoff: float = 60.0,
+        init: Callable[[Any], Awaitable[None]] | None = None,
+        pool_mode: Literal["session", "transaction"] = "session",
     ):
         """
         Initialize a PostgresqlConfig instance.
@@ -22,14 +138,56 @@ class PostgresqlConfig:
             timeout (float): The timeout in seconds for acquiring a connection from the pool.
             max_inactive_connection_lifetime (float): The maximum lifetime of an inactive connection
             in the connection pool.
+            replica_urls (list[DatabaseURL | str] | None): The URLs of the read replicas. Each gets
+            a pool with the same settings as the primary.
+            replica_selection (Literal["round_robin", "least_busy"]): How a read picks among the
+            replicas that are within the lag threshold.
+            replica_max_lag (float): The replication lag in seconds above which a replica is
+            skipped and reads go to another replica or to the primary.
+            lag_check_interval (float): The time between two replication lag measurements in seconds.
+            replica_max_backoff (float): The maximum time between two checks of an unreachable
+            replica in seconds.
+            init (Callable[[Any], Awaitable[None]] | None): A coroutine function called with every
+            new asyncpg connection of the pools, e.g. to attach a query logger.
+            pool_mode (Literal["session", "transaction"]): "session" when every pooled connection
+            is a server connection of its own. "transaction" when the URLs point at PgBouncer in
+            transaction pooling mode, which hands each transaction, or each statement outside one,
+            whichever server connection is free. No named prepared statement is then kept, since
+            the next statement may run where it was never prepared: asyncpg's statement cache is
+            disabled, so it parses every query as an unnamed statement, and the statement registry
+            runs its compiled SQL the same way. PgBouncer 1.21+ with max_prepared_statements set
+            tracks prepared statements itself and can keep "session".
         """
-        self.db_pool = Database(
-            url,
-            min_size=min_size,
-            max_size=max_size,
-            timeout=timeout,
-            max_inactive_connection_lifetime=max_inactive_connection_lifetime,
-        )
+        pool_options = {
+            "min_size": min_size,
+            "max_size": max_size,
+            "timeout": timeout,
+            "max_inactive_connection_lifetime": max_inactive_connection_lifetime,
+        }
+        if init is not None:
+            pool_options["init"] = init
+        if pool_mode == "transaction":
+            pool_options["statement_cache_size"] = 0
+        self.db_pool = Database(url, **pool_options)
+        self.replicas = [
+            Replica(Database(replica_url, **pool_options), lag_check_interval, replica_max_backoff)
+            for replica_url in replica_urls or []
+        ]
+        self.replica_selection = replica_selection
+        self.replica_max_lag = replica_max_lag
+        self.lag_check_interval = lag_check_interval
+        self.pool_mode = pool_mode
+        self._round_robin = itertools.count()
+
+        self.primary_reads = 0
+        self.replica_reads = 0
+
+    @property
+    def prepares_statements(self) -> bool:
+        """
+        Whether named prepared statements may be kept on the pooled connections.
+        """
+        return self.pool_mode == "session"
 
     async def connect(self):
         """
@@ -38,11 +196,17 @@ class PostgresqlConfig:
         This function is a coroutine that connects to the PostgreSQL
         database asynchronously. It is a part of the Database class
         and is used to create a connection pool to the database.
+        Replicas are connected too. A replica that cannot be reached is
+        marked unhealthy and left out of read routing instead of failing
+        startup, and is connected later by the replication lag checks.
 
         Returns:
             None
         """
         await self.db_pool.connect()
+        for replica in self.replicas:
+            if await replica.connect():
+                await replica.measure_lag()
 
     async def disconnect(self):
         """
@@ -56,6 +220,199 @@ class PostgresqlConfig:
             None
         """
         await self.db_pool.disconnect()
+        for replica in self.replicas:
+            if replica.db_pool.is_connected:
+                await replica.db_pool.disconnect()
+
+    def choose_replica(self) -> Replica | None:
+        """
+        Pick the replica a read should use.
+
+        Returns:
+            Replica | None: A replica within the lag threshold, or None if there is none
+            and the read should use the primary.
+        """
+        candidates = [
+            replica for replica in self.replicas if replica.lag is not None and replica.lag <= self.replica_max_lag
+        ]
+        if not candidates:
+            return None
+        if self.replica_selection == "least_busy":
+            return min(candidates, key=lambda replica: replica.in_flight)
+        return candidates[next(self._round_robin) % len(candidates)]
+
+    @asynccontextmanager
+    async def read_pool(self, primary: bool = False) -> AsyncIterator[Database]:
+        """
+        Acquire the connection pool a read should use for its duration.
+
+        Args:
+            primary (bool): Whether the read must see the primary, e.g. to read its own writes.
+
+        Yields:
+            Database: The pool of a replica, or of the primary.
+        """
+        replica = None if primary else self.choose_replica()
+        if replica is None:
+            self.primary_reads += 1
+            yield self.db_pool
+            return
+
+        self.replica_reads += 1
+        replica.in_flight += 1
+        try:
+            yield replica.db_pool
+        finally:
+            replica.in_flight -= 1
+
+    def pool_name(self, db_pool: Database) -> str:
+        """
+        Get the name a pool is labeled with in metrics.
+
+        Args:
+            db_pool (Database): The pool of the primary or of a replica.
+
+        Returns:
+            str: "primary", the host of the replica, or "other" for a pool of neither.
+        """
+        if db_pool is self.db_pool:
+            return "primary"
+        for replica in self.replicas:
+            if db_pool is replica.db_pool:
+                return replica.db_pool.url.hostname
+        return "other"
+
+    @asynccontextmanager
+    async def connection(self, db_pool: Database) -> AsyncIterator[Connection]:
+        """
+        Hold a connection of a pool for the current task, timing the wait to acquire it.
+
+        databases shares one connection per task, so the wait is only recorded when
+        the task did not hold a connection of the pool yet.
+
+        Args:
+            db_pool (Database): The pool to acquire the connection from.
+
+        Yields:
+            Connection: The connection of the current task.
+        """
+        connection = db_pool.connection()
+        acquiring = getattr(connection, "_connection_counter", None) == 0
+        started_at = time.perf_counter()
+        async with connection as held:
+            if acquiring:
+                db_pool_acquire_seconds.labels(pool=self.pool_name(db_pool), route=current_route()).observe(
+                    time.perf_counter() - started_at
+                )
+            yield held
+
+    @staticmethod
+    def asyncpg_pool(db_pool: Database) -> asyncpg.Pool:
+        """
+        Get the asyncpg pool behind a connected pool of databases.
+
+        databases keeps it private, so its absence is an error rather than a fallback,
+        for an upgrade of databases to fail visibly.
+
+        Args:
+            db_pool (Database): The connected pool.
+
+        Returns:
+            asyncpg.Pool: The asyncpg pool.
+
+        Raises:
+            RuntimeError: If the pool is not connected, or databases no longer keeps the
+                asyncpg pool as _backend._pool.
+        """
+        pool = getattr(getattr(db_pool, "_backend", None), "_pool", None)
+        if pool is None:
+            raise RuntimeError(f"No asyncpg pool behind {db_pool.url.hostname}: not connected, or databases changed")
+        return pool
+
+    @staticmethod
+    def asyncpg_connection(raw_connection: Any) -> Any:
+        """
+        Get the asyncpg connection behind the raw connection of databases.
+
+        The raw connection is a pool proxy that changes on every acquire, while the
+        connection behind it, which statements are prepared on, does not.
+
+        Args:
+            raw_connection (Any): The raw connection, a pool proxy or an asyncpg connection.
+
+        Returns:
+            Any: The asyncpg connection.
+
+        Raises:
+            RuntimeError: If asyncpg no longer keeps the connection of a proxy as _con.
+        """
+        if not isinstance(raw_connection, PoolConnectionProxy):
+            return raw_connection
+        connection = getattr(raw_connection, "_con", None)
+        if connection is None:
+            raise RuntimeError("No connection behind the asyncpg pool proxy: released, or asyncpg changed")
+        return connection
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        """
+        Collect the pool size metrics of the primary and the replicas on every scrape.
+
+        The config is registered as a Prometheus collector, since the sizes are state
+        owned by asyncpg rather than events the application records.
+
+        Yields:
+            GaugeMetricFamily: The open, maximum, in-use and idle connections of every connected pool.
+        """
+        size_family = GaugeMetricFamily("db_pool_size", "Open connections of a PostgreSQL pool.", labels=["pool"])
+        max_size_family = GaugeMetricFamily(
+            "db_pool_max_size", "Maximum connections of a PostgreSQL pool.", labels=["pool"]
+        )
+        connections_family = GaugeMetricFamily(
+            "db_pool_connections",
+            "Open connections of a PostgreSQL pool by state, in_use or idle.",
+            labels=["pool", "state"],
+        )
+        for db_pool in [self.db_pool, *(replica.db_pool for replica in self.replicas)]:
+            if not db_pool.is_connected:
+                continue
+            pool = self.asyncpg_pool(db_pool)
+            name = self.pool_name(db_pool)
+            size, idle = pool.get_size(), pool.get_idle_size()
+            size_family.add_metric([name], size)
+            max_size_family.add_metric([name], pool.get_max_size())
+            connections_family.add_metric([name, "in_use"], size - idle)
+            connections_family.add_metric([name, "idle"], idle)
+        yield from (size_family, max_size_family, connections_family)
+
+    async def monitor_replication_lag(self):
+        """
+        Measure the replication lag of every replica every interval.
+
+        This coroutine runs until cancelled.
+
+        Returns:
+            None
+        """
+        while True:
+            await asyncio.sleep(self.lag_check_interval)
+            await asyncio.gather(*(replica.measure_lag() for replica in self.replicas))
+
+    def stats(self) -> dict:
+        """
+        Return the read routing counters and the state of every replica.
+
+        Returns:
+            dict: The number of reads routed to the primary and to replicas, and the
+            lag and in-flight reads of each replica.
+        """
+        return {
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+            "replicas": [
+                {"host": replica.db_pool.url.hostname, "lag": replica.lag, "in_flight": replica.in_flight}
+                for replica in self.replicas
+            ],
+        }
 
 
 postgresql_config = PostgresqlConfig(
@@ -64,4 +421,12 @@ postgresql_config = PostgresqlConfig(
     max_size=db_settings.DATABASE_MAX_CONNECTIONS,
     timeout=db_settings.DATABASE_TIMEOUT,
     max_inactive_connection_lifetime=db_settings.DATABASE_MAX_INACTIVE_CONNECTION_LIFETIME,
+    replica_urls=db_settings.DATABASE_REPLICA_URLS,
+    replica_selection=db_settings.DATABASE_REPLICA_SELECTION,
+    replica_max_lag=db_settings.DATABASE_REPLICA_MAX_LAG_SECONDS,
+    lag_check_interval=db_settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL,
+    replica_max_backoff=db_settings.DATABASE_REPLICA_MAX_BACKOFF,
+    init=attach_query_logger if settings.PROFILER_ENABLED else None,
+    pool_mode=db_settings.DATABASE_POOL_MODE,
 )
+metrics_registry.register(postgresql_config)
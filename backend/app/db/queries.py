@@ -0,0 +1,87 @@
+from typing import Iterable
+
+from pydantic import BaseModel
+from sqlalchemy import Column, Table
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import ClauseElement
+
+from app.db.statements import Row
+
+# Renders bind parameters as ":name", the form the statement registry compiles
+DIALECT = postgresql.dialect(paramstyle="named")
+
+
+def columns(table: Table, fields: type[BaseModel] | Iterable[str]) -> list[Column]:
+    """
+    Get the columns of a table that a schema or a list of names asks for.
+
+    Args:
+        table (Table): The table.
+        fields (type[BaseModel] | Iterable[str]): An output schema, whose fields are all
+            columns of the table, or the column names.
+
+    Returns:
+        list[Column]: The columns, in the order of the fields.
+
+    Raises:
+        ValueError: If a field is not a column of the table.
+    """
+    names = list(fields.model_fields) if isinstance(fields, type) else list(fields)
+    missing = [name for name in names if name not in table.c]
+    if missing:
+        raise ValueError(f"Table {table.name} has no columns {missing}")
+    return [table.c[name] for name in names]
+
+
+def column_list(table: Table, fields: type[BaseModel] | Iterable[str]) -> str:
+    """
+    Render the columns a schema or a list of names asks for, for use in handwritten SQL.
+
+    Args:
+        table (Table): The table.
+        fields (type[BaseModel] | Iterable[str]): An output schema or the column names.
+
+    Returns:
+        str: The comma separated column names, e.g. "client_id, user_id".
+    """
+    return ", ".join(str(column.name) for column in columns(table, fields))
+
+
+def compile_query(query: ClauseElement) -> str:
+    """
+    Compile a SQLAlchemy Core statement into SQL for the statement registry.
+
+    Args:
+        query (ClauseElement): The statement, its values given as bindparam()s.
+
+    Returns:
+        str: The SQL with named parameters.
+    """
+    return str(query.compile(dialect=DIALECT))
+
+
+def row_class(name: str, table: Table, fields: type[BaseModel] | Iterable[str]) -> type[Row]:
+    """
+    Create the row class of a statement selecting some columns of a table.
+
+    The class adds no storage to asyncpg's records, so rows are built straight from
+    the wire without a per-row dict, and documents the columns and their types.
+
+    Args:
+        name (str): The class name, e.g. "ProfileRow".
+        table (Table): The table the columns belong to.
+        fields (type[BaseModel] | Iterable[str]): An output schema or the column names.
+
+    Returns:
+        type[Row]: The row class, whose fields attribute lists the column names.
+    """
+    selected = columns(table, fields)
+    annotations = {
+        str(column.name): column.type.python_type | None if column.nullable else column.type.python_type
+        for column in selected
+    }
+    return type(
+        name,
+        (Row,),
+        {"__slots__": (), "__annotations__": annotations, "fields": tuple(str(column.name) for column in selected)},
+    )
@@ -1,10 +1,252 @@
-from redis.asyncio import Redis
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Callable
 
+from redis.asyncio import BlockingConnectionPool, ConnectionPool, Redis
+from redis.asyncio.client import Pipeline, PubSub
+from redis.asyncio.connection import Connection
+
+from app.cache import LRUCache
 from app.db.config import db_settings
+from app.metrics import current_route, redis_command_duration_seconds
+from app.profiler import record_command
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        """
+        Execute the buffered commands, timing the round trip as one MULTI or PIPELINE command.
+        """
+        started_at = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            command = "MULTI" if self.is_transaction else "PIPELINE"
+            redis_command_duration_seconds.labels(command=command, route=current_route()).observe(elapsed)
+            record_command(command, elapsed)
+
+
+class InstrumentedRedis(Redis):
+    """
+    A Redis client recording the latency of every command, labeled by command name and route,
+    and in the profile of the current request.
+    """
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        started_at = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            command = str(args[0]).upper()
+            redis_command_duration_seconds.labels(command=command, route=current_route()).observe(elapsed)
+            record_command(command, elapsed)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class ClientSideCache:
+    def __init__(self, prefixes: list[str], max_size: int, ttl: int):
+        """
+        Initialize an in-process cache of read-mostly Redis keys.
+
+        Values are only served while a tracking connection is subscribed to invalidations
+        of the key prefixes (CLIENT TRACKING in broadcast mode over RESP3). Redis then
+        pushes the keys that change, and they are dropped from the cache.
+
+        A read registers a marker for its key before going to Redis, and its result is
+        only stored if no invalidation of the key arrived in the meantime. A read that
+        fails leaves its marker until the key is next invalidated.
+
+        Args/Attributes:
+            prefixes (list[str]): The key prefixes that are tracked and may be cached.
+            max_size (int): The maximum number of keys kept in the cache.
+            ttl (int): The time to live of an entry in seconds. This bounds staleness
+                if Redis expires a key without the invalidation reaching the cache.
+            local (LRUCache): The cached values.
+            tracking (bool): Whether invalidations are being received, so that cached
+                values may be served.
+            invalidations (int): The number of invalidated keys, a flush counting as one.
+        """
+        self.prefixes = prefixes
+        self.local = LRUCache(max_size=max_size, ttl=ttl)
+        self.tracking = False
+        self.invalidations = 0
+        self._pending: dict[str, object] = {}
+
+    def get(self, key: str) -> Any | None:
+        """
+        Return the cached value of a key.
+
+        Args:
+            key (str): The Redis key.
+
+        Returns:
+            Any | None: The cached value, or None on a miss or while not tracking.
+        """
+        if not self.tracking:
+            return None
+        return self.local.get(key)
+
+    def watch(self, key: str) -> object | None:
+        """
+        Register a read of a key that is about to go to Redis.
+
+        Args:
+            key (str): The Redis key.
+
+        Returns:
+            object | None: The marker to pass to store(), or None if the key cannot be cached.
+        """
+        if not self.tracking or not key.startswith(tuple(self.prefixes)):
+            return None
+        marker = self._pending[key] = object()
+        return marker
+
+    def store(self, key: str, marker: object | None, value: Any, expires_at: float | None = None):
+        """
+        Cache the value a read returned, unless the key was invalidated since watch().
+
+        Empty values, e.g. a missing hash, are not cached.
+
+        Args:
+            key (str): The Redis key.
+            marker (object | None): The marker watch() returned for the read.
+            value (Any): The value read from Redis.
+            expires_at (float | None): The absolute expiry time in seconds since the epoch.
+                Defaults to now + ttl.
+
+        Returns:
+            None
+        """
+        if marker is None or self._pending.get(key) is not marker:
+            return
+        del self._pending[key]
+        if self.tracking and value:
+            self.local.set(key, value, expires_at)
+
+    async def fetch(self, key: str, read: Callable[[], Any]) -> Any:
+        """
+        Return the cached value of a key, reading and caching it on a miss.
+
+        Args:
+            key (str): The Redis key.
+            read (Callable[[], Any]): Returns the awaitable reading the key from Redis.
+
+        Returns:
+            Any: The value of the key.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        marker = self.watch(key)
+        value = await read()
+        self.store(key, marker, value)
+        return value
+
+    async def invalidate(self, message: list):
+        """
+        Apply an invalidation pushed by Redis.
+
+        Args:
+            message (list): ["invalidate", keys], keys being None when Redis flushed
+                its tracking table or the database, which drops every entry.
+
+        Returns:
+            None
+        """
+        keys = message[1]
+        if keys is None:
+            self.clear()
+            self.invalidations += 1
+            return
+        for key in keys:
+            self.local.delete(key)
+            self._pending.pop(key, None)
+        self.invalidations += len(keys)
+
+    def clear(self):
+        """
+        Drop every entry and fail every read in flight.
+
+        Returns:
+            None
+        """
+        self.local.clear()
+        self._pending.clear()
+
+    async def track(self, connect: Callable[[], Connection]):
+        """
+        Receive the invalidations of the tracked prefixes on a dedicated connection.
+
+        This coroutine runs until cancelled. Cached values are only served while the
+        connection is up; if it drops, the cache is cleared and tracking is retried.
+        If the redis-py version in use cannot receive invalidations, it returns at once
+        and the cache is never used.
+
+        Args:
+            connect (Callable[[], Connection]): Returns a new RESP3 connection.
+
+        Returns:
+            None
+        """
+        while True:
+            connection = connect()
+            try:
+                await connection.connect()
+                # The push handler is set on redis-py's private parser, which the pinned
+                # redis-py versions have; without it, the cache stays bypassed
+                parser = getattr(connection, "_parser", None)
+                if not hasattr(parser, "set_invalidation_push_handler"):
+                    logger.warning("Redis client-side caching is not supported by this redis-py version, disabling it")
+                    return
+                parser.set_invalidation_push_handler(self.invalidate)
+                prefixes = [arg for prefix in self.prefixes for arg in ("PREFIX", prefix)]
+                await connection.send_command("CLIENT", "TRACKING", "ON", "BCAST", *prefixes)
+                await connection.read_response()
+                self.tracking = True
+                logger.info(f"Tracking Redis keys with prefixes {self.prefixes}")
+                while True:
+                    await connection.read_response(timeout=math.inf, push_request=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Redis client-side cache tracking error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                self.tracking = False
+                self.clear()
+                await connection.disconnect()
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: Whether tracking is on, the hit/miss counters and the invalidations.
+        """
+        return {"tracking": self.tracking, **self.local.stats(), "invalidations": self.invalidations}
 
 
 class RedisConfig:
-    def __init__(self, host: str, port: int, decode_responses: bool):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        decode_responses: bool,
+        max_connections: int = 50,
+        pool_timeout: float | None = 5.0,
+        socket_timeout: float | None = None,
+        socket_connect_timeout: float | None = None,
+        socket_keepalive: bool = False,
+        health_check_interval: int = 0,
+    ):
         """
         Initialize a RedisConfig object.
 
@@ -13,50 +255,137 @@ class RedisConfig:
             port (int): The port number to connect to Redis on.
             decode_responses (bool): If set to True, all responses from Redis will be
                 decoded to strings with the utf-8 encoding.
+            max_connections (int): The maximum number of connections of the pool.
+            pool_timeout (float | None): The time in seconds a command waits for a free
+                connection when all of them are in use, or None to wait forever.
+            socket_timeout (float | None): The timeout in seconds of a command's reply.
+                Subscriptions from pubsub() are not affected, since they wait for messages.
+            socket_connect_timeout (float | None): The timeout in seconds of opening a connection.
+            socket_keepalive (bool): Whether to enable TCP keepalive on the connections.
+            health_check_interval (int): The idle time in seconds after which a connection
+                is checked with a PING before use, or 0 to never check.
             redis_client (Redis): The Redis client object. This is initially set to None,
                 and is set to the Redis client object when the connect() method is
-                called.
+                called. It records the latency of every command in the metrics.
+            pubsub_client (Redis): The client of the subscriptions, set by connect(), over a
+                pool of its own without a read timeout.
         """
         self.host = host
         self.port = port
         self.decode_responses = decode_responses
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.socket_timeout = socket_timeout
+        self.socket_connect_timeout = socket_connect_timeout
+        self.socket_keepalive = socket_keepalive
+        self.health_check_interval = health_check_interval
         self.redis_client = None
+        self.pubsub_client = None
 
     async def connect(self):
         """
         Connect to Redis asynchronously.
 
-        This method sets the Redis client object to a connected Redis client.
-        The Redis client is set up with the host, port, and decode_responses
-        values specified in the RedisConfig object.
+        This method sets the Redis client object to a Redis client over a blocking
+        connection pool built from the settings of the RedisConfig object, and checks
+        that Redis answers a PING. Subscriptions get a pool of their own, without the
+        read timeout of commands.
 
         Returns:
             None
+
+        Raises:
+            redis.exceptions.ConnectionError: If Redis cannot be reached.
+        """
+        connection_pool = BlockingConnectionPool(
+            max_connections=self.max_connections,
+            timeout=self.pool_timeout,
+            host=self.host,
+            port=self.port,
+            decode_responses=self.decode_responses,
+            socket_timeout=self.socket_timeout,
+            socket_connect_timeout=self.socket_connect_timeout,
+            socket_keepalive=self.socket_keepalive,
+            health_check_interval=self.health_check_interval,
+        )
+        self.redis_client = InstrumentedRedis.from_pool(connection_pool)
+        self.pubsub_client = Redis.from_pool(
+            ConnectionPool(
+                host=self.host,
+                port=self.port,
+                decode_responses=self.decode_responses,
+                socket_timeout=None,
+                socket_connect_timeout=self.socket_connect_timeout,
+                socket_keepalive=self.socket_keepalive,
+            )
+        )
+        await self.redis_client.ping()
+        logger.info(f"Connected to Redis at {self.host}:{self.port}")
+
+    def pubsub(self) -> PubSub:
         """
-        self.redis_client = Redis(
+        Create a pub/sub object for a subscription.
+
+        Its connection has no read timeout, so that a subscriber waiting for messages on
+        an idle channel is not interrupted, as it would be by the socket_timeout of the
+        command pool.
+
+        Returns:
+            PubSub: The pub/sub object.
+        """
+        return self.pubsub_client.pubsub()
+
+    def tracking_connection(self) -> Connection:
+        """
+        Create a RESP3 connection for receiving client-side cache invalidations.
+
+        The connection is outside the pool, since it is held for the lifetime of the
+        process, and has no read timeout, since it waits for pushes.
+
+        Returns:
+            Connection: The unconnected connection.
+        """
+        return Connection(
             host=self.host,
             port=self.port,
             decode_responses=self.decode_responses,
+            socket_connect_timeout=self.socket_connect_timeout,
+            socket_keepalive=self.socket_keepalive,
+            protocol=3,
         )
-        print("Connected to Redis")
 
     async def disconnect(self):
         """
         Disconnect from Redis asynchronously.
 
         This method disconnects from Redis if the Redis client object is not None.
-        If the Redis client object is not None, it is closed and set to None.
+        If the Redis client object is not None, it is closed along with its
+        connection pool and set to None.
 
         Returns:
             None
         """
         if self.redis_client:
-            await self.redis_client.close()
+            await self.redis_client.aclose()
             self.redis_client = None
+        if self.pubsub_client:
+            await self.pubsub_client.aclose()
+            self.pubsub_client = None
 
 
 redis_config = RedisConfig(
     host=db_settings.REDIS_HOST,
     port=db_settings.REDIS_PORT,
     decode_responses=True,
+    max_connections=db_settings.REDIS_MAX_CONNECTIONS,
+    pool_timeout=db_settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=db_settings.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=db_settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+    socket_keepalive=db_settings.REDIS_SOCKET_KEEPALIVE,
+    health_check_interval=db_settings.REDIS_HEALTH_CHECK_INTERVAL,
+)
+client_cache = ClientSideCache(
+    prefixes=db_settings.REDIS_CLIENT_CACHE_PREFIXES,
+    max_size=db_settings.REDIS_CLIENT_CACHE_SIZE,
+    ttl=db_settings.REDIS_CLIENT_CACHE_TTL,
 )
@@ -0,0 +1,343 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Iterator
+from weakref import WeakKeyDictionary
+
+import asyncpg
+from asyncpg.exceptions import InvalidCachedStatementError, OutdatedSchemaCacheError
+from asyncpg.prepared_stmt import PreparedStatement
+from databases import Database
+
+from app.db.postgresql import postgresql_config
+from app.metrics import current_route, db_query_duration_seconds
+from app.profiler import record_query, recording_statement
+
+logger = logging.getLogger(__name__)
+
+# Named parameters as written for databases (":name"), leaving "::type" casts alone
+NAMED_PARAMETER = re.compile(r"(?<![:\w]):(\w+)")
+
+
+class Row(asyncpg.Record):
+    """
+    A row returned by a registered statement.
+
+    Like the records of databases, its columns can be read both by key and by attribute.
+    Rows have no instance dict, so they cost no more than asyncpg's own records.
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class Statement:
+    def __init__(self, name: str, query: str, row: type[Row] = Row):
+        """
+        Initialize a Statement instance.
+
+        The query is compiled once into asyncpg's positional form, so executing it only
+        orders the values instead of rendering the SQL.
+
+        Args/Attributes:
+            name (str): The name the statement is executed by.
+            query (str): The SQL with named parameters, e.g. "WHERE id = :user_id".
+            row (type[Row]): The class of the rows the statement returns.
+            sql (str): The SQL with positional parameters, e.g. "WHERE id = $1".
+            params (list[str]): The parameter names, in positional order.
+            calls (int): The number of executions.
+            errors (int): The number of executions that raised.
+            prepares (int): The number of connections the statement was prepared on.
+            seconds (float): The summed duration of the executions.
+        """
+        self.name = name
+        self.query = query
+        self.row = row
+        self.params: list[str] = []
+
+        def to_positional(match: re.Match) -> str:
+            param = match.group(1)
+            if param not in self.params:
+                self.params.append(param)
+            return f"${self.params.index(param) + 1}"
+
+        self.sql = NAMED_PARAMETER.sub(to_positional, query)
+
+        self.calls = 0
+        self.errors = 0
+        self.prepares = 0
+        self.seconds = 0.0
+
+    def args(self, values: dict | None) -> list:
+        """
+        Order the values of an execution by parameter position.
+
+        Args:
+            values (dict | None): The values by parameter name.
+
+        Returns:
+            list: The positional arguments.
+
+        Raises:
+            KeyError: If a parameter has no value.
+        """
+        values = values or {}
+        return [values[param] for param in self.params]
+
+
+class StatementRegistry:
+    def __init__(self):
+        """
+        Initialize a registry of named statements.
+
+        Statements are registered once at import time and executed by name. Each is
+        prepared the first time it runs on a pooled asyncpg connection, and the prepared
+        statement is kept for as long as that connection lives, so later executions skip
+        both SQL rendering and server-side parsing and planning.
+
+        Behind PgBouncer in transaction pooling mode, statements are not prepared: their
+        compiled SQL is run as an unnamed statement, which PostgreSQL parses every time
+        but which cannot be missing from the server connection PgBouncer picks.
+        """
+        self._statements: dict[str, Statement] = {}
+        self._prepared: WeakKeyDictionary[asyncpg.Connection, dict[str, PreparedStatement]] = WeakKeyDictionary()
+
+    def __iter__(self) -> Iterator[Statement]:
+        return iter(self._statements.values())
+
+    def register(self, name: str, query: str, row: type[Row] = Row) -> Statement:
+        """
+        Register a statement under a name.
+
+        Args:
+            name (str): The name the statement is executed by.
+            query (str): The SQL with named parameters.
+            row (type[Row]): The class of the rows the statement returns.
+
+        Returns:
+            Statement: The registered statement.
+
+        Raises:
+            ValueError: If another query is already registered under the name.
+        """
+        registered = self._statements.get(name)
+        if registered is not None:
+            if registered.query != query:
+                raise ValueError(f"Statement {name} is already registered with another query")
+            return registered
+
+        statement = self._statements[name] = Statement(name, query, row)
+        return statement
+
+    def get(self, name: str) -> Statement:
+        """
+        Return the statement registered under a name.
+
+        Args:
+            name (str): The statement name.
+
+        Returns:
+            Statement: The registered statement.
+
+        Raises:
+            KeyError: If no statement is registered under the name.
+        """
+        return self._statements[name]
+
+    async def _prepare(self, raw_connection: Any, statement: Statement) -> PreparedStatement:
+        """
+        Return the statement prepared on a connection, preparing it on first use.
+
+        Args:
+            raw_connection (Any): The asyncpg connection, or the pool proxy wrapping it.
+            statement (Statement): The statement.
+
+        Returns:
+            PreparedStatement: The prepared statement.
+        """
+        connection = postgresql_config.asyncpg_connection(raw_connection)
+        prepared = self._prepared.setdefault(connection, {})
+        if statement.name not in prepared:
+            prepared[statement.name] = await connection.prepare(statement.sql, record_class=statement.row)
+            statement.prepares += 1
+        return prepared[statement.name]
+
+    def _forget(self, name: str):
+        """
+        Drop a statement prepared on every connection, for it to be prepared again on next use.
+
+        Args:
+            name (str): The statement name.
+
+        Returns:
+            None
+        """
+        for prepared in list(self._prepared.values()):
+            prepared.pop(name, None)
+
+    @staticmethod
+    async def _execute(prepared: PreparedStatement, method: str, args: list) -> Any:
+        if method == "execute":
+            await prepared.fetch(*args)
+            return prepared.get_statusmsg()
+        return await getattr(prepared, method)(*args)
+
+    async def _run(self, db: Database, name: str, values: dict | None, method: str) -> Any:
+        """
+        Execute a statement on the connection of the current task.
+
+        The connection is the one databases holds for the current task, so statements
+        take part in an open transaction. The duration includes acquiring a connection
+        when the task holds none.
+
+        A schema change, e.g. a migration altering a table, invalidates the statements
+        prepared before it. They are then dropped from every connection and prepared again
+        on next use. A statement PostgreSQL rejected as prepared against the old schema did
+        not run, so it is prepared and run once more, unless a transaction is open, which the
+        error has aborted. A statement whose rows no longer match asyncpg's type cache did
+        run, so the error is raised rather than running it twice.
+
+        Args:
+            db (Database): The database to run the statement on.
+            name (str): The statement name.
+            values (dict | None): The values by parameter name.
+            method (str): The method to call, e.g. "fetchrow", or "execute" to run the
+                statement and return its status.
+
+        Returns:
+            Any: The result of the method.
+        """
+        statement = self._statements[name]
+        args = statement.args(values)
+        started_at = time.perf_counter()
+        try:
+            async with postgresql_config.connection(db) as connection:
+                if not postgresql_config.prepares_statements:
+                    with recording_statement():
+                        if method == "execute":
+                            return await connection.raw_connection.execute(statement.sql, *args)
+                        return await getattr(connection.raw_connection, method)(
+                            statement.sql, *args, record_class=statement.row
+                        )
+                prepared = await self._prepare(connection.raw_connection, statement)
+                try:
+                    return await self._execute(prepared, method, args)
+                except (InvalidCachedStatementError, OutdatedSchemaCacheError) as e:
+                    self._forget(name)
+                    if isinstance(e, OutdatedSchemaCacheError) or connection.raw_connection.is_in_transaction():
+                        raise
+                    logger.info(f"Statement {name} was prepared against an older schema, preparing it again")
+                    prepared = await self._prepare(connection.raw_connection, statement)
+                    return await self._execute(prepared, method, args)
+        except Exception:
+            statement.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            statement.calls += 1
+            statement.seconds += elapsed
+            db_query_duration_seconds.labels(statement=name, route=current_route()).observe(elapsed)
+            record_query(name, elapsed)
+
+    async def fetch_one(self, db: Database, name: str, values: dict | None = None) -> Row | None:
+        """
+        Execute a statement and return its first row.
+
+        Args:
+            db (Database): The database to run the statement on.
+            name (str): The statement name.
+            values (dict | None): The values by parameter name.
+
+        Returns:
+            Row | None: The first row, or None if there is none.
+        """
+        return await self._run(db, name, values, "fetchrow")
+
+    async def fetch_all(self, db: Database, name: str, values: dict | None = None) -> list[Row]:
+        """
+        Execute a statement and return all its rows.
+
+        Args:
+            db (Database): The database to run the statement on.
+            name (str): The statement name.
+            values (dict | None): The values by parameter name.
+
+        Returns:
+            list[Row]: The rows.
+        """
+        return await self._run(db, name, values, "fetch")
+
+    async def execute(self, db: Database, name: str, values: dict | None = None) -> str:
+        """
+        Execute a statement without fetching rows.
+
+        Args:
+            db (Database): The database to run the statement on.
+            name (str): The statement name.
+            values (dict | None): The values by parameter name.
+
+        Returns:
+            str: The status of the last command, e.g. "UPDATE 3".
+        """
+        return await self._run(db, name, values, "execute")
+
+    async def warm(self, db: Database, connections: int) -> int:
+        """
+        Open connections of a pool and prepare every registered statement on them.
+
+        The connections are held together while preparing, so that each one is a
+        different pooled connection, and are released once all of them are warm.
+        A connection that cannot be opened or a statement that fails to prepare is
+        logged and left to be prepared on first use. When statements are not prepared,
+        the connections are only opened.
+
+        Args:
+            db (Database): The connected database whose pool is warmed.
+            connections (int): The number of connections to warm, e.g. the pool's minimum size.
+
+        Returns:
+            int: The number of statements prepared.
+        """
+        pool = postgresql_config.asyncpg_pool(db)
+        acquired = await asyncio.gather(*(pool.acquire() for _ in range(connections)), return_exceptions=True)
+        held = [raw_connection for raw_connection in acquired if not isinstance(raw_connection, BaseException)]
+        if len(held) < connections:
+            logger.warning(f"Warmed {len(held)} of {connections} connections of {db.url.hostname}")
+        prepares = sum(statement.prepares for statement in self)
+        try:
+            for raw_connection in held if postgresql_config.prepares_statements else []:
+                for statement in self:
+                    try:
+                        await self._prepare(raw_connection, statement)
+                    except Exception as e:
+                        logger.warning(f"Failed to prepare statement {statement.name}: {e}")
+        finally:
+            await asyncio.gather(*(pool.release(raw_connection) for raw_connection in held))
+        return sum(statement.prepares for statement in self) - prepares
+
+    def stats(self) -> dict:
+        """
+        Return the call counters and latency of every statement.
+
+        Returns:
+            dict: For each statement name, its calls, errors, prepares and latency.
+        """
+        return {
+            statement.name: {
+                "calls": statement.calls,
+                "errors": statement.errors,
+                "prepares": statement.prepares,
+                "total_ms": round(statement.seconds * 1000, 3),
+                "mean_ms": round(statement.seconds * 1000 / statement.calls, 3) if statement.calls else 0.0,
+            }
+            for statement in self
+        }
+
+
+statements = StatementRegistry()
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from app.config import BaseSettings
+
+
+class EssayConfig(BaseSettings):
+    # Monthly partitions of essay_contents and essay_assessments
+    ESSAY_PARTITION_MONTHS_AHEAD: int = 3
+    ESSAY_RETENTION_MONTHS: int = 0  # 0 keeps every month
+    ESSAY_PARTITION_CHECK_INTERVAL: int = 60 * 60 * 6  # 6 hours
+
+    # Scoring job queue settings (Redis Stream consumed by a consumer group)
+    ESSAY_SCORING_STREAM: str = "essay:scoring"
+    ESSAY_SCORING_GROUP: str = "scorers"
+    ESSAY_SCORING_STREAM_MAX_LEN: int = 100_000  # approximate, oldest entries are trimmed
+    ESSAY_JOB_TTL: int = 60 * 60 * 24  # 1 day to read a job status
+    ESSAY_JOB_MAX_ATTEMPTS: int = 5
+
+    # Submission settings
+    ESSAY_MAX_CONTENT_LENGTH: int = 20_000  # characters, about 3,500 words
+
+    # Batch submission settings (one essay per line of the request body)
+    ESSAY_BATCH_MAX_ESSAYS: int = 5000
+    ESSAY_BATCH_MAX_LINE_BYTES: int = 128 * 1024  # 128 KB per essay, its JSON escapes included
+    ESSAY_BATCH_MAX_BYTES: int = 32 * 1024 * 1024  # 32 MB per batch
+
+    # Band model artifact of the scorer, loaded once per worker process
+    ESSAY_SCORING_MODEL_PATH: Path = Path(__file__).parent / "band_model.json"
+
+    # Assessment reuse by content hash, with a single-flight lock per hash while it is scored
+    ESSAY_DEDUPE_TTL: int = 60 * 60 * 24 * 7  # 7 days in Redis, found in PostgreSQL after
+    ESSAY_DEDUPE_LOCK_TTL_MS: int = 30_000  # 30 secs, well above the time a batch takes to score
+    ESSAY_DEDUPE_LOCK_WAIT: float = 5  # 5 secs a worker waits for another scoring the same text
+    ESSAY_DEDUPE_POLL_INTERVAL: float = 0.05  # 50 ms
+
+    # Scoring worker settings
+    ESSAY_WORKER_BATCH_SIZE: int = 32
+    ESSAY_WORKER_BLOCK_MS: int = 1000  # 1 sec, below REDIS_SOCKET_TIMEOUT
+    ESSAY_WORKER_CLAIM_IDLE_MS: int = 60_000  # 1 min before a job of a stalled worker is reclaimed
+    ESSAY_WORKER_CLAIM_INTERVAL: int = 15  # 15 secs
+
+
+essay_settings = EssayConfig()
@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import re
+import time
+from uuid import UUID
+
+import orjson
+from databases import Database
+from redis.asyncio import Redis
+
+from app.db.queries import column_list, row_class
+from app.db.statements import statements
+from app.essay.config import essay_settings
+from app.essay.models import Assessment
+from app.essay.scoring import SCORE_COLUMNS
+
+ASSESSMENT_KEY_PREFIX = "essay:assessment:"
+SCORING_LOCK_PREFIX = "essay:scoring:lock:"
+
+# A line break, with any blank lines after it, separates two paragraphs
+PARAGRAPH_BREAK = re.compile(r"\n\s*")
+
+# Releases the single-flight locks still held by a token, leaving those that expired and
+# were taken by another worker. KEYS: the lock keys. ARGV: the token.
+# Returns the number of locks released.
+RELEASE_SCRIPT = """
+local released = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[1] then
+        released = released + redis.call('DEL', key)
+    end
+end
+return released
+"""
+
+ReusableAssessmentRow = row_class("ReusableAssessmentRow", Assessment, ("id", "content_hash", *SCORE_COLUMNS))
+
+# Assessments of the same content hash are identical, so any one of them is reused
+statements.register(
+    "get_assessments_by_content_hash",
+    f"""SELECT DISTINCT ON (content_hash) {column_list(Assessment, ReusableAssessmentRow.fields)}
+    FROM essay_assessments
+    WHERE content_hash = ANY(CAST(:content_hashes AS varchar[]))
+    ORDER BY content_hash""",
+    ReusableAssessmentRow,
+)
+
+
+def normalize_content(content: str) -> str:
+    """
+    Normalize the whitespace of an essay, keeping its paragraphs.
+
+    Whitespace within a paragraph becomes single spaces, paragraphs are separated by one
+    blank line, and leading and trailing whitespace is dropped. Essays that only differ by
+    their whitespace normalize to the same text, which is the text the worker scores.
+
+    Args:
+        content (str): The essay text.
+
+    Returns:
+        str: The normalized text.
+    """
+    paragraphs = (" ".join(paragraph.split()) for paragraph in PARAGRAPH_BREAK.split(content))
+    return "\n\n".join(paragraph for paragraph in paragraphs if paragraph)
+
+
+def content_hash(version: str, question_id: UUID | str | None, content: str) -> str:
+    """
+    Hash an essay for assessment reuse.
+
+    The hash covers the scorer version, so that a new band model never reuses the
+    assessments of the previous one, the question answered and the normalized text.
+
+    Args:
+        version (str): The version of the scorer's band model.
+        question_id (UUID | str | None): The question the essay answers, if any.
+        content (str): The essay text.
+
+    Returns:
+        str: The SHA-256 hex digest.
+    """
+    key = f"{version}\n{question_id or ''}\n{normalize_content(content)}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class AssessmentCache:
+    def __init__(self, ttl: int, lock_ttl_ms: int, lock_wait: float, poll_interval: float):
+        """
+        Initialize the cache of assessments by content hash.
+
+        An essay resubmitted unchanged, or with only whitespace changes, against the same
+        question reuses the scores of an existing assessment instead of being scored again.
+        The scores are looked up in Redis, then in PostgreSQL by the content_hash column of
+        the assessments. A hash is scored by one worker at a time: a worker takes the
+        single-flight lock of a hash before scoring it, and the others wait for the scores
+        it publishes rather than scoring the same text.
+
+        Args/Attributes:
+            ttl (int): The time to live of a Redis entry in seconds.
+            lock_ttl_ms (int): The time to live of a lock in milliseconds. This bounds the
+                wait of other workers if the worker holding the lock dies.
+            lock_wait (float): The time a worker waits for a hash locked by another worker
+                in seconds, before scoring it itself.
+            poll_interval (float): The time between two lookups of a locked hash in seconds.
+            redis_hits (int): The number of hashes found in Redis.
+            db_hits (int): The number of hashes found in PostgreSQL only.
+            misses (int): The number of hashes found in neither.
+        """
+        self.ttl = ttl
+        self.lock_ttl_ms = lock_ttl_ms
+        self.lock_wait = lock_wait
+        self.poll_interval = poll_interval
+        self._script = None
+
+        self.redis_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(content_hash: str) -> str:
+        return ASSESSMENT_KEY_PREFIX + content_hash
+
+    @staticmethod
+    def lock_key(content_hash: str) -> str:
+        return SCORING_LOCK_PREFIX + content_hash
+
+    async def get_many(self, redis: Redis, db: Database, content_hashes: list[str]) -> dict[str, dict]:
+        """
+        Look up the assessments of content hashes in Redis, then in PostgreSQL.
+
+        Assessments found in PostgreSQL only are copied to Redis.
+
+        Args:
+            redis (Redis): The Redis client.
+            db (Database): The database holding the assessments.
+            content_hashes (list[str]): The content hashes.
+
+        Returns:
+            dict[str, dict]: The assessment_id and scores by content hash, for the hashes found.
+        """
+        if not content_hashes:
+            return {}
+
+        cached = await redis.mget([self.key(content_hash) for content_hash in content_hashes])
+        found = {
+            content_hash: orjson.loads(value)
+            for content_hash, value in zip(content_hashes, cached)
+            if value is not None
+        }
+        self.redis_hits += len(found)
+        missing = [content_hash for content_hash in content_hashes if content_hash not in found]
+        if not missing:
+            return found
+
+        rows = await statements.fetch_all(db, "get_assessments_by_content_hash", {"content_hashes": missing})
+        stored = {
+            row["content_hash"]: {
+                "assessment_id": str(row["id"]),
+                **{
+                    column: row[column] if column.endswith("_feedback") else float(row[column])
+                    for column in SCORE_COLUMNS
+                },
+            }
+            for row in rows
+        }
+        self.db_hits += len(stored)
+        self.misses += len(missing) - len(stored)
+        await self.set_many(redis, stored)
+        return found | stored
+
+    async def set_many(self, redis: Redis, assessments: dict[str, dict]):
+        """
+        Store the assessments of content hashes in Redis, in one round trip.
+
+        Args:
+            redis (Redis): The Redis client.
+            assessments (dict[str, dict]): The assessment_id and scores by content hash.
+
+        Returns:
+            None
+        """
+        if not assessments:
+            return
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for content_hash, assessment in assessments.items():
+                pipe.set(self.key(content_hash), orjson.dumps(assessment), ex=self.ttl)
+            await pipe.execute()
+
+    async def acquire(self, redis: Redis, content_hashes: list[str], token: str) -> list[str]:
+        """
+        Take the single-flight locks of content hashes that no other worker holds, in one
+        round trip.
+
+        Args:
+            redis (Redis): The Redis client.
+            content_hashes (list[str]): The content hashes to score.
+            token (str): The token identifying this holder, e.g. the worker and batch.
+
+        Returns:
+            list[str]: The content hashes locked, in order.
+        """
+        if not content_hashes:
+            return []
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for content_hash in content_hashes:
+                pipe.set(self.lock_key(content_hash), token, nx=True, px=self.lock_ttl_ms)
+            results = await pipe.execute()
+        return [content_hash for content_hash, locked in zip(content_hashes, results) if locked]
+
+    async def release(self, redis: Redis, content_hashes: list[str], token: str):
+        """
+        Release the locks of content hashes still held with a token.
+
+        Args:
+            redis (Redis): The Redis client.
+            content_hashes (list[str]): The content hashes locked.
+            token (str): The token the locks were taken with.
+
+        Returns:
+            None
+        """
+        if not content_hashes:
+            return
+
+        if self._script is None or self._script.registered_client is not redis:
+            self._script = redis.register_script(RELEASE_SCRIPT)
+        await self._script(keys=[self.lock_key(content_hash) for content_hash in content_hashes], args=[token])
+
+    async def wait(self, redis: Redis, content_hashes: list[str]) -> dict[str, dict]:
+        """
+        Wait for other workers to publish the assessments of content hashes they are scoring,
+        for up to lock_wait.
+
+        Args:
+            redis (Redis): The Redis client.
+            content_hashes (list[str]): The content hashes locked by other workers.
+
+        Returns:
+            dict[str, dict]: The assessment_id and scores by content hash, for the hashes
+            published in time.
+        """
+        found: dict[str, dict] = {}
+        deadline = time.monotonic() + self.lock_wait
+        missing = content_hashes
+        while missing and time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            cached = await redis.mget([self.key(content_hash) for content_hash in missing])
+            found |= {content_hash: orjson.loads(value) for content_hash, value in zip(missing, cached) if value}
+            missing = [content_hash for content_hash in missing if content_hash not in found]
+        self.redis_hits += len(found)
+        return found
+
+    def stats(self) -> dict:
+        """
+        Return the lookup counters.
+
+        Returns:
+            dict: The number of hashes found in Redis, in PostgreSQL only, and in neither.
+        """
+        return {"redis_hits": self.redis_hits, "db_hits": self.db_hits, "misses": self.misses}
+
+
+assessment_cache = AssessmentCache(
+    ttl=essay_settings.ESSAY_DEDUPE_TTL,
+    lock_ttl_ms=essay_settings.ESSAY_DEDUPE_LOCK_TTL_MS,
+    lock_wait=essay_settings.ESSAY_DEDUPE_LOCK_WAIT,
+    poll_interval=essay_settings.ESSAY_DEDUPE_POLL_INTERVAL,
+)
@@ -0,0 +1,30 @@
+from typing import Any
+
+from fastapi import HTTPException, status
+
+
+class EssayHTTPException(HTTPException):
+    STATUS_CODE = status.HTTP_500_INTERNAL_SERVER_ERROR
+    DETAIL = "Server error"
+
+    def __init__(self, status_code: int = None, detail: str = None, **kwargs: dict[str, Any]) -> None:
+        super().__init__(
+            status_code=status_code or self.STATUS_CODE,
+            detail=detail or self.DETAIL,
+            **kwargs,
+        )
+
+
+class EssayBadRequest(EssayHTTPException):
+    STATUS_CODE = status.HTTP_400_BAD_REQUEST
+    DETAIL = "Bad request"
+
+
+class EssayNotFound(EssayHTTPException):
+    STATUS_CODE = status.HTTP_404_NOT_FOUND
+    DETAIL = "Not found"
+
+
+class EssayPayloadTooLarge(EssayHTTPException):
+    STATUS_CODE = status.HTTP_413_CONTENT_TOO_LARGE
+    DETAIL = "Payload too large"
@@ -0,0 +1,145 @@
+import numpy as np
+
+from app.essay.features.tokens import FUNCTION_WORDS, PARAGRAPH_BREAK, WORD, TokenBatch, tokenize
+
+# The upper bounds of the sentence length bins, in words: under 8, 8-14, 15-24, 25-39, 40 and more
+SENTENCE_LENGTH_BINS = np.array([8, 15, 25, 40])
+
+
+def _function_word_slots() -> tuple[np.ndarray, np.uint64]:
+    """
+    Build a table holding the hash of every function word in the slot its low bits point to,
+    with as few bits as leave every function word a slot of its own.
+
+    Returns:
+        tuple[np.ndarray, np.uint64]: The table and the mask of the low bits.
+    """
+    hashes = tokenize([" ".join(FUNCTION_WORDS)]).hashes
+    bits = 8
+    while len(np.unique(hashes & np.uint64(2**bits - 1))) < len(hashes):
+        bits += 1
+    mask = np.uint64(2**bits - 1)
+    slots = np.zeros(2**bits, dtype=np.uint64)
+    slots[hashes & mask] = hashes
+    return slots, mask
+
+
+FUNCTION_WORD_SLOTS, FUNCTION_WORD_MASK = _function_word_slots()
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """
+    Divide element-wise, with 0.0 where the denominator is 0.
+    """
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+def _runs(segments: np.ndarray, essays: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find the runs of words sharing a segment number, e.g. the words of a sentence.
+
+    Args:
+        segments (np.ndarray): The non-decreasing segment number of every word.
+        essays (np.ndarray): The essay of every word.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The number of words and the essay of every run.
+    """
+    starts = np.flatnonzero(np.diff(segments, prepend=-1))
+    return np.diff(starts, append=len(segments)), essays[starts]
+
+
+def _function_words(hashes: np.ndarray) -> np.ndarray:
+    """
+    Mark the words that are function words, by looking their hashes up in FUNCTION_WORD_SLOTS.
+    """
+    return FUNCTION_WORD_SLOTS[hashes & FUNCTION_WORD_MASK] == hashes
+
+
+def _distribution(lengths: np.ndarray, essays: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the mean and standard deviation of the run lengths of every essay.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The mean and the standard deviation of every essay.
+    """
+    n = len(counts)
+    mean = _ratio(np.bincount(essays, weights=lengths, minlength=n), counts)
+    variance = _ratio(np.bincount(essays, weights=lengths.astype(np.float64) ** 2, minlength=n), counts) - mean**2
+    return mean, np.sqrt(np.maximum(variance, 0.0))
+
+
+def extract_features(essays: list[str] | TokenBatch) -> dict[str, np.ndarray]:
+    """
+    Compute the text features of a batch of essays.
+
+    Every feature is computed for the whole batch with array operations over its tokens.
+    A sentence is a run of words ended by sentence-ending punctuation, a paragraph break
+    or the end of the essay; a paragraph is a run of words between line breaks. Essays
+    without words get 0 for every feature.
+
+    Args:
+        essays (list[str] | TokenBatch): The essay texts, or the essays already tokenized.
+
+    Returns:
+        dict[str, np.ndarray]: One array per feature, with one entry per essay:
+            word_count, sentence_count, paragraph_count: The number of words, sentences and paragraphs.
+            sentence_length_mean, sentence_length_std, sentence_length_max: The sentence lengths in words.
+            sentence_length_histogram: The share of sentences in each SENTENCE_LENGTH_BINS bin, one row per essay.
+            type_token_ratio: The share of words that are distinct.
+            lexical_density: The share of words that are content words rather than function words.
+            word_length_mean: The mean word length in characters.
+            paragraph_length_mean, paragraph_length_std: The paragraph lengths in words.
+            sentences_per_paragraph: The mean number of sentences per paragraph.
+    """
+    batch = essays if isinstance(essays, TokenBatch) else tokenize(essays)
+    n = len(batch)
+    kinds = batch.kinds
+    is_word = kinds == WORD
+    word_hashes = batch.hashes[is_word]
+    word_essays = batch.essays[is_word]
+
+    # The first token of an essay starts a sentence and a paragraph, so none spans two essays
+    essay_starts = np.zeros(len(kinds), dtype=bool)
+    essay_starts[batch.offsets[:-1][np.diff(batch.offsets) > 0]] = True
+    sentence_lengths, sentence_essays = _runs(np.cumsum(essay_starts | ~is_word)[is_word], word_essays)
+    paragraph_lengths, paragraph_essays = _runs(
+        np.cumsum(essay_starts | (kinds == PARAGRAPH_BREAK))[is_word], word_essays
+    )
+
+    words = np.bincount(word_essays, minlength=n)
+    sentences = np.bincount(sentence_essays, minlength=n)
+    paragraphs = np.bincount(paragraph_essays, minlength=n)
+
+    sentence_length_mean, sentence_length_std = _distribution(sentence_lengths, sentence_essays, sentences)
+    sentence_length_max = np.zeros(n, dtype=np.int64)
+    np.maximum.at(sentence_length_max, sentence_essays, sentence_lengths)
+    bins = len(SENTENCE_LENGTH_BINS) + 1
+    binned = sentence_essays * bins + np.searchsorted(SENTENCE_LENGTH_BINS, sentence_lengths, side="right")
+    sentence_length_histogram = np.bincount(binned, minlength=n * bins).reshape(n, bins)
+    sentence_length_histogram = sentence_length_histogram / np.maximum(sentences, 1)[:, None]
+    paragraph_length_mean, paragraph_length_std = _distribution(paragraph_lengths, paragraph_essays, paragraphs)
+
+    # A word type is a distinct word of an essay. The essay and the top 48 bits of the word
+    # hash are packed into one key, which sorts faster than the pair; for an essay's few
+    # hundred words, two words sharing 48 bits is vanishingly unlikely.
+    keys = np.sort((word_essays.astype(np.uint64) << np.uint64(48)) | (word_hashes >> np.uint64(16)))
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    types = np.bincount((keys[first] >> np.uint64(48)).astype(np.int64), minlength=n)
+
+    return {
+        "word_count": words,
+        "sentence_count": sentences,
+        "paragraph_count": paragraphs,
+        "sentence_length_mean": sentence_length_mean,
+        "sentence_length_std": sentence_length_std,
+        "sentence_length_max": sentence_length_max,
+        "sentence_length_histogram": sentence_length_histogram,
+        "type_token_ratio": _ratio(types, words),
+        "lexical_density": _ratio(np.bincount(word_essays, weights=~_function_words(word_hashes), minlength=n), words),
+        "word_length_mean": _ratio(np.bincount(word_essays, weights=batch.lengths[is_word], minlength=n), words),
+        "paragraph_length_mean": paragraph_length_mean,
+        "paragraph_length_std": paragraph_length_std,
+        "sentences_per_paragraph": _ratio(sentences, paragraphs),
+    }
@@ -0,0 +1,187 @@
+import numpy as np
+
+# The kinds of token an essay is split into
+WORD = 0
+SENTENCE_END = 1
+PARAGRAPH_BREAK = 2
+
+# Character classes
+OTHER = 0
+LETTER = 1  # part of a word
+JOINER = 2  # part of a word when letters surround it, e.g. "don't" or "well-known"
+SENTENCE_END_MARK = 3  # a period is a joiner too, e.g. "3.5" or "u.s.a"
+SPACE = 4
+
+
+def _character_classes() -> np.ndarray:
+    """
+    Build the class of every code point of the Basic Multilingual Plane, for lowercased
+    text. Letters are ASCII letters and digits, and the letters of other scripts, approximated
+    as the code points from U+00C0 outside the punctuation and symbol blocks.
+    """
+    codes = np.arange(0x10000)
+    classes = np.full(0x10000, OTHER, dtype=np.uint8)
+    classes[(codes >= 0xC0) & ~((codes >= 0x2000) & (codes <= 0x2BFF)) & ~((codes >= 0x3000) & (codes <= 0x303F))] = (
+        LETTER
+    )
+    classes[ord("a") : ord("z") + 1] = LETTER
+    classes[ord("0") : ord("9") + 1] = LETTER
+    classes[[ord("'"), ord("’"), ord("-")]] = JOINER
+    classes[[ord("."), ord("!"), ord("?")]] = SENTENCE_END_MARK
+    classes[[ord(" "), ord("\t"), ord("\n"), ord("\r"), ord("\v"), ord("\f")]] = SPACE
+    return classes
+
+
+CHARACTER_CLASSES = _character_classes()
+
+# Put between the essays of a batch, so that no word or paragraph break spans two essays
+SEPARATOR = "\x00"
+
+# Words are identified by a polynomial hash of their characters, wrapping around 2**64
+HASH_BASE = 1_099_511_628_211
+_powers = np.ones(1, dtype=np.uint64)
+
+# Closed-class words, which carry grammar rather than content, for lexical density
+FUNCTION_WORDS = frozenset(
+    """
+    a about above across after against all along although am among an and another any anybody anyone
+    anything are around as at be because been before behind being below beneath beside besides between
+    beyond both but by can cannot could did do does doing down during each either enough every everybody
+    everyone everything few for from had has have having he her hers herself him himself his how however
+    i if in inside into is it its itself least less many may me might mine more most much must my myself
+    near neither no nobody none nor not nothing of off on once one onto or other others ought our ours
+    ourselves out outside over own per quite rather several shall she should since so some somebody
+    someone something such than that the their theirs them themselves then there therefore these they
+    this those though through throughout thus till to too toward towards under underneath unless unlike
+    until up upon us very via was we were what whatever when whenever where whereas wherever whether
+    which while who whoever whom whose why will with within without would yet you your yours yourself
+    yourselves
+    """.split()
+)
+
+
+def _mix(hashes: np.ndarray) -> np.ndarray:
+    """
+    Spread every bit of the hashes over all 64 bits (the MurmurHash3 finalizer), so that words
+    differing in one character differ in the top bits too.
+    """
+    hashes = hashes ^ (hashes >> np.uint64(33))
+    hashes = hashes * np.uint64(0xFF51AFD7ED558CCD)
+    hashes = hashes ^ (hashes >> np.uint64(33))
+    hashes = hashes * np.uint64(0xC4CEB9FE1A85EC53)
+    return hashes ^ (hashes >> np.uint64(33))
+
+
+def _hash_powers(length: int) -> np.ndarray:
+    """
+    Return the powers of HASH_BASE from 0 to at least length - 1, extending the cached ones.
+    """
+    global _powers
+    if len(_powers) < length:
+        _powers = np.cumprod(np.full(max(length, 2 * len(_powers)), HASH_BASE, dtype=np.uint64))
+        _powers = np.append(np.uint64(1), _powers[:-1])
+    return _powers
+
+
+def _starts(mask: np.ndarray) -> np.ndarray:
+    """
+    Mark the first position of every run of a mask.
+    """
+    starts = mask.copy()
+    starts[1:] &= ~mask[:-1]
+    return starts
+
+
+class TokenBatch:
+    def __init__(self, kinds: np.ndarray, hashes: np.ndarray, lengths: np.ndarray, offsets: np.ndarray):
+        """
+        Initialize a batch of tokenized essays.
+
+        The tokens of every essay are stored end to end in flat integer arrays, so that
+        features are computed over the whole batch at once instead of essay by essay and
+        word by word. A token is a word, a run of sentence-ending punctuation, or a line
+        break between paragraphs, with any blank lines after it; words are told apart by
+        the hash of their text.
+
+        Args/Attributes:
+            kinds (np.ndarray): The kind of every token, WORD, SENTENCE_END or PARAGRAPH_BREAK (int8).
+            hashes (np.ndarray): The hash of every word, 0 for other tokens (uint64).
+            lengths (np.ndarray): The number of characters of every word, 0 for other tokens (int32).
+            offsets (np.ndarray): The tokens of essay i are at offsets[i]:offsets[i + 1] (int64).
+            essays (np.ndarray): The essay of every token (int64).
+        """
+        self.kinds = kinds
+        self.hashes = hashes
+        self.lengths = lengths
+        self.offsets = offsets
+        self.essays = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+def tokenize(texts: list[str]) -> TokenBatch:
+    """
+    Tokenize a batch of essays into integer arrays.
+
+    The essays are lowercased and joined into one array of code points, and every token
+    is found with array operations over it, without a Python loop over words.
+
+    Args:
+        texts (list[str]): The essay texts.
+
+    Returns:
+        TokenBatch: The tokens of the essays.
+    """
+    lowered = [text.lower() for text in texts]
+    text = SEPARATOR.join(lowered)
+    codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    essay_starts = np.zeros(len(lowered), dtype=np.int64)
+    np.cumsum([len(essay) + 1 for essay in lowered[:-1]], out=essay_starts[1:])
+
+    # Code points outside the Basic Multilingual Plane are taken for letters
+    if len(codes) and codes.max() > 0xFFFF:
+        classes = CHARACTER_CLASSES[np.minimum(codes, 0xFFFF)]
+        classes[codes > 0xFFFF] = LETTER
+    else:
+        classes = CHARACTER_CLASSES[codes]
+
+    in_word = classes == LETTER
+    periods = codes == ord(".")
+    joiners = np.flatnonzero((classes[1:-1] == JOINER) | periods[1:-1]) + 1
+    in_word[joiners[in_word[joiners - 1] & in_word[joiners + 1]]] = True
+    word_starts = _starts(in_word)
+    # The period closing an abbreviation of single letters, e.g. "u.s.a." or "e.g.", does not
+    # end a sentence, unlike the one after a number, e.g. "3.5."
+    sentence_ends = (classes == SENTENCE_END_MARK) & ~in_word
+    letters = in_word & ~((codes >= ord("0")) & (codes <= ord("9")))
+    closing = np.flatnonzero(periods[2:] & letters[1:-1] & periods[:-2] & in_word[:-2]) + 2
+    after = np.minimum(closing + 1, len(codes) - 1)
+    sentence_ends[closing[(closing + 1 == len(codes)) | ~sentence_ends[after]]] = False
+    # A paragraph break is a newline with text since the previous newline, so that a single
+    # newline separates paragraphs and the blank lines after it add no break of their own
+    newlines = np.flatnonzero(codes == ord("\n"))
+    last_text = np.maximum.accumulate(np.where(classes != SPACE, np.arange(len(codes)), -1))
+    paragraph_breaks = newlines[last_text[newlines] > np.append(-1, newlines[:-1])]
+
+    kind_at = np.full(len(codes), -1, dtype=np.int8)
+    kind_at[word_starts] = WORD
+    kind_at[_starts(sentence_ends)] = SENTENCE_END
+    kind_at[paragraph_breaks] = PARAGRAPH_BREAK
+    positions = np.flatnonzero(kind_at >= 0)
+    kinds = kind_at[positions]
+
+    # The characters of each word are contiguous, so a word's hash is a sum over its run
+    word_chars = np.flatnonzero(in_word)
+    word_lengths = np.diff(np.flatnonzero(word_starts[word_chars]), append=len(word_chars))
+    word_offsets = np.cumsum(word_lengths) - word_lengths
+    places = np.arange(len(word_chars)) - np.repeat(word_offsets, word_lengths)
+    weighted = codes[word_chars].astype(np.uint64) * _hash_powers(word_lengths.max(initial=0))[places]
+    hashes = np.zeros(len(positions), dtype=np.uint64)
+    lengths = np.zeros(len(positions), dtype=np.int32)
+    if len(word_chars):
+        hashes[kinds == WORD] = _mix(np.add.reduceat(weighted, word_offsets))
+        lengths[kinds == WORD] = word_lengths
+
+    offsets = np.append(np.searchsorted(positions, essay_starts), len(positions))
+    return TokenBatch(kinds, hashes, lengths, offsets)
@@ -79,6 +79,9 @@ Question = Table(
 )
 
 
+# Partitioned by month of created_at (see app.essay.partitions). The partition key is part
+# of the primary key, and listings by client or owner read each month through an index
+# ordered by created_at, stopping at the months they need.
 Essay = Table(
     "essay_contents",
     metadata,
@@ -99,6 +102,7 @@ Essay = Table(
     Column(
         "created_at",
         TIMESTAMP(timezone=True),
+        primary_key=True,
         nullable=False,
         server_default=func.now(),
     ),
@@ -110,15 +114,18 @@ Essay = Table(
         onupdate=func.now(),
     ),
     Column("deleted_at", TIMESTAMP(timezone=True), nullable=True),
-    Index("ix_essays_client_id", "client_id"),
-    Index("ix_essays_owner_id", "owner_id"),
+    Index("ix_essays_client_id_created_at", "client_id", "created_at"),
+    Index("ix_essays_owner_id_created_at", "owner_id", "created_at"),
     ForeignKeyConstraint(
         ["client_id", "owner_id"],
         ["profiles.client_id", "profiles.user_id"],
         ondelete="CASCADE",
     ),
+    postgresql_partition_by="RANGE (created_at)",
 )
 
+# Partitioned by month of the essay assessed, so that a month of essays and its assessments
+# are created and dropped together
 Assessment = Table(
     "essay_assessments",
     metadata,
@@ -128,12 +135,8 @@ Assessment = Table(
         primary_key=True,
         server_default=text("gen_random_uuid()"),
     ),
-    Column(
-        "essay_id",
-        ForeignKey("essay_contents.id", ondelete="CASCADE"),
-        nullable=False,
-        index=True,
-    ),
+    Column("essay_id", UUID(as_uuid=True), nullable=False),
+    Column("essay_created_at", TIMESTAMP(timezone=True), primary_key=True, nullable=False),
     Column("client_id", UUID(as_uuid=True), nullable=False),
     Column("owner_id", UUID(as_uuid=True), nullable=False),
     Column("overall_score", Numeric(precision=2, scale=1), nullable=False),
@@ -146,6 +149,9 @@ Assessment = Table(
     Column("lexical_resource_feedback", Text, nullable=False),
     Column("grammatical_range", Numeric(precision=2, scale=1), nullable=False),
     Column("grammatical_range_feedback", Text, nullable=False),
+    # The hash of the text assessed, by which an unchanged resubmission reuses the
+    # assessment (see app.essay.dedupe)
+    Column("content_hash", String(64), nullable=True),
     Column(
         "created_at",
         TIMESTAMP(timezone=True),
@@ -176,9 +182,17 @@ Assessment = Table(
         "grammatical_range >= 0 AND grammatical_range <= 9",
         name="check_grammatical_range_range",
     ),
+    Index("ix_essay_assessments_essay_id", "essay_id", "essay_created_at", unique=True),
+    Index("ix_essay_assessments_content_hash", "content_hash"),
+    ForeignKeyConstraint(
+        ["essay_id", "essay_created_at"],
+        ["essay_contents.id", "essay_contents.created_at"],
+        ondelete="CASCADE",
+    ),
     ForeignKeyConstraint(
         ["client_id", "owner_id"],
         ["profiles.client_id", "profiles.user_id"],
         ondelete="CASCADE",
     ),
+    postgresql_partition_by="RANGE (essay_created_at)",
 )
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timezone
+
+from databases import Database
+
+from app.db.postgresql import postgresql_config
+from app.essay.config import essay_settings
+
+logger = logging.getLogger(__name__)
+
+# The monthly partitioned tables and their partition keys, referencing tables first so
+# that a month is dropped from them before it is dropped from the tables they reference
+PARTITIONED_TABLES = {"essay_assessments": "essay_created_at", "essay_contents": "created_at"}
+
+PARTITION_MONTH = re.compile(r"_y(\d{4})m(\d{2})$")
+
+LIST_PARTITIONS_QUERY = """SELECT child.relname AS name
+FROM pg_inherits
+JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+WHERE parent.relname = :table"""
+
+# Serializes partition maintenance across the workers of every instance
+LOCK_QUERY = "SELECT pg_advisory_xact_lock(hashtext('essay_partitions'))"
+
+
+def month_start(moment: datetime) -> date:
+    """
+    Get the first day of the UTC month of a moment.
+
+    Args:
+        moment (datetime): An aware datetime.
+
+    Returns:
+        date: The first day of its month.
+    """
+    return moment.astimezone(timezone.utc).date().replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    """
+    Move the first day of a month by a number of months.
+
+    Args:
+        month (date): The first day of a month.
+        months (int): The number of months, negative to go back.
+
+    Returns:
+        date: The first day of the resulting month.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """
+    Get the name of the partition of a table holding a month, e.g. essay_contents_y2025m04.
+
+    Args:
+        table (str): The partitioned table.
+        month (date): The first day of the month.
+
+    Returns:
+        str: The name of the partition.
+    """
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def partition_month(name: str) -> date | None:
+    """
+    Get the month a partition holds from its name.
+
+    Args:
+        name (str): The name of a partition, e.g. essay_contents_y2025m04.
+
+    Returns:
+        date | None: The first day of the month, or None if the name is not one of a monthly partition.
+    """
+    match = PARTITION_MONTH.search(name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def create_partition_query(table: str, month: date) -> str:
+    """
+    Build the statement creating the partition of a table holding a month, bounded in UTC.
+
+    Args:
+        table (str): The partitioned table.
+        month (date): The first day of the month.
+
+    Returns:
+        str: The CREATE TABLE ... PARTITION OF statement, doing nothing if the partition exists.
+    """
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+
+
+class PartitionMaintenance:
+    def __init__(self, months_ahead: int, retention_months: int, check_interval: int):
+        """
+        Initialize the maintenance of the monthly partitions of the essay tables.
+
+        A background task creates the partitions of the current month and of the months
+        ahead, so that inserts always have a partition to go to, and drops the months that
+        are past retention whole, instead of deleting their rows. Every worker runs it;
+        an advisory lock makes one of them do the work at a time.
+
+        Args/Attributes:
+            months_ahead (int): The number of months after the current one to keep partitions for.
+            retention_months (int): The number of months kept before the current one, older
+                partitions being dropped, or 0 to keep every month.
+            check_interval (int): The time between two maintenance runs in seconds.
+        """
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.check_interval = check_interval
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    async def _partitions(db: Database, table: str) -> set[str]:
+        """
+        List the partitions of a table.
+
+        Args:
+            db (Database): The primary database.
+            table (str): The partitioned table.
+
+        Returns:
+            set[str]: The names of the partitions.
+        """
+        rows = await db.fetch_all(LIST_PARTITIONS_QUERY, {"table": table})
+        return {row["name"] for row in rows}
+
+    async def create_partitions(self, db: Database, now: datetime | None = None) -> list[str]:
+        """
+        Create the missing partitions from the current month to months_ahead months later.
+
+        Args:
+            db (Database): The primary database.
+            now (datetime | None): The current time. Defaults to now.
+
+        Returns:
+            list[str]: The names of the created partitions.
+        """
+        current = month_start(now or datetime.now(timezone.utc))
+        created = []
+        async with db.transaction():
+            await db.execute(LOCK_QUERY)
+            for table in PARTITIONED_TABLES:
+                existing = await self._partitions(db, table)
+                for offset in range(self.months_ahead + 1):
+                    month = add_months(current, offset)
+                    if partition_name(table, month) not in existing:
+                        await db.execute(create_partition_query(table, month))
+                        created.append(partition_name(table, month))
+        return created
+
+    async def drop_expired_partitions(self, db: Database, now: datetime | None = None) -> list[str]:
+        """
+        Drop the partitions of the months before the retention_months months preceding the current one.
+
+        Partitions are detached before being dropped, which checks that no row of another
+        partitioned table still references theirs.
+
+        Args:
+            db (Database): The primary database.
+            now (datetime | None): The current time. Defaults to now.
+
+        Returns:
+            list[str]: The names of the dropped partitions.
+        """
+        if self.retention_months <= 0:
+            return []
+        cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -self.retention_months)
+        dropped = []
+        async with db.transaction():
+            await db.execute(LOCK_QUERY)
+            for table in PARTITIONED_TABLES:
+                for name in sorted(await self._partitions(db, table)):
+                    month = partition_month(name)
+                    if month is not None and month < cutoff:
+                        await db.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                        await db.execute(f"DROP TABLE {name}")
+                        dropped.append(name)
+        return dropped
+
+    async def maintain(self, db: Database):
+        """
+        Create the partitions ahead and drop the expired ones, logging what changed.
+
+        Returns:
+            None
+        """
+        try:
+            created = await self.create_partitions(db)
+            dropped = await self.drop_expired_partitions(db)
+        except Exception as e:
+            logger.error(f"Failed to maintain essay partitions: {e}")
+            return
+        if created:
+            logger.info(f"Created essay partitions {created}")
+        if dropped:
+            logger.info(f"Dropped expired essay partitions {dropped}")
+
+    async def _run(self):
+        """
+        Maintain the partitions of the primary now and then every interval until cancelled.
+
+        Returns:
+            None
+        """
+        while True:
+            await self.maintain(postgresql_config.db_pool)
+            await asyncio.sleep(self.check_interval)
+
+    def start(self):
+        """
+        Start the background maintenance task.
+
+        Returns:
+            None
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the background maintenance task.
+
+        Returns:
+            None
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+partition_maintenance = PartitionMaintenance(
+    months_ahead=essay_settings.ESSAY_PARTITION_MONTHS_AHEAD,
+    retention_months=essay_settings.ESSAY_RETENTION_MONTHS,
+    check_interval=essay_settings.ESSAY_PARTITION_CHECK_INTERVAL,
+)
@@ -0,0 +1,197 @@
+from uuid import uuid4
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from app.essay.config import essay_settings
+
+
+class ScoringQueue:
+    def __init__(self, stream: str, group: str, max_len: int, job_ttl: int, max_attempts: int):
+        """
+        Initialize the queue of essay scoring jobs.
+
+        Jobs are entries of a Redis Stream read by a consumer group, so that each job is
+        delivered to one worker, stays pending until that worker acknowledges it, and can
+        be claimed by another worker if it is not acknowledged in time. The status of
+        every job is kept in a hash next to the stream, for clients to poll.
+
+        Args/Attributes:
+            stream (str): The stream key.
+            group (str): The consumer group of the scoring workers.
+            max_len (int): The approximate number of entries the stream is trimmed to.
+            job_ttl (int): The time to live of a job status in seconds.
+            max_attempts (int): The number of times a job is started before it is failed.
+        """
+        self.stream = stream
+        self.group = group
+        self.max_len = max_len
+        self.job_ttl = job_ttl
+        self.max_attempts = max_attempts
+
+    @staticmethod
+    def job_key(job_id: str) -> str:
+        return f"essay:job:{job_id}"
+
+    async def enqueue(self, redis: Redis, essay: dict) -> str:
+        """
+        Queue the scoring of an essay, in one round trip.
+
+        Args:
+            redis (Redis): The Redis client.
+            essay (dict): The id, created_at, client_id and owner_id of the essay.
+
+        Returns:
+            str: The job id.
+        """
+        (job_id,) = await self.enqueue_many(redis, [essay])
+        return job_id
+
+    async def enqueue_many(self, redis: Redis, essays: list[dict]) -> list[str]:
+        """
+        Queue the scoring of a batch of essays, in one round trip.
+
+        Args:
+            redis (Redis): The Redis client.
+            essays (list[dict]): The id, created_at, client_id and owner_id of each essay.
+
+        Returns:
+            list[str]: The job id of each essay, in order.
+        """
+        job_ids = []
+        async with redis.pipeline(transaction=False) as pipe:
+            for essay in essays:
+                job_id = str(uuid4())
+                job = {
+                    "job_id": job_id,
+                    "essay_id": str(essay["id"]),
+                    "essay_created_at": essay["created_at"].isoformat(),
+                    "client_id": str(essay["client_id"]),
+                    "owner_id": str(essay["owner_id"]),
+                }
+                pipe.hset(
+                    self.job_key(job_id),
+                    mapping={"status": "queued", "essay_id": job["essay_id"], "owner_id": job["owner_id"]},
+                )
+                pipe.expire(self.job_key(job_id), self.job_ttl)
+                pipe.xadd(self.stream, job, maxlen=self.max_len, approximate=True)
+                job_ids.append(job_id)
+            await pipe.execute()
+        return job_ids
+
+    async def complete(self, redis: Redis, essay: dict, assessment_id: str) -> str:
+        """
+        Record the job of an essay assessed without queueing it, e.g. by reusing an existing
+        assessment, so that it is polled like any other job.
+
+        Args:
+            redis (Redis): The Redis client.
+            essay (dict): The id and owner_id of the essay.
+            assessment_id (str): The assessment of the essay.
+
+        Returns:
+            str: The job id.
+        """
+        job_id = str(uuid4())
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hset(
+                self.job_key(job_id),
+                mapping={
+                    "status": "done",
+                    "essay_id": str(essay["id"]),
+                    "owner_id": str(essay["owner_id"]),
+                    "attempts": 0,
+                    "assessment_id": assessment_id,
+                },
+            )
+            pipe.expire(self.job_key(job_id), self.job_ttl)
+            await pipe.execute()
+        return job_id
+
+    async def get_status(self, redis: Redis, job_id: str) -> dict | None:
+        """
+        Get the status of a job.
+
+        Returns:
+            dict | None: The status, the essay_id and owner_id, the number of attempts, and the
+            assessment_id or error once done or failed, or None if the job is unknown or expired.
+        """
+        return await redis.hgetall(self.job_key(job_id)) or None
+
+    async def create_group(self, redis: Redis):
+        """
+        Create the consumer group, and the stream, unless they exist.
+
+        Returns:
+            None
+        """
+        try:
+            await redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read(self, redis: Redis, consumer: str, count: int, block_ms: int) -> list[tuple[str, dict]]:
+        """
+        Read new jobs for a consumer, waiting up to block_ms for one.
+
+        Returns:
+            list[tuple[str, dict]]: The message ids and jobs.
+        """
+        response = await redis.xreadgroup(self.group, consumer, {self.stream: ">"}, count=count, block=block_ms)
+        return [(message_id, job) for _, messages in response or [] for message_id, job in messages if job]
+
+    async def claim_stalled(self, redis: Redis, consumer: str, count: int, min_idle_ms: int) -> list[tuple[str, dict]]:
+        """
+        Take over the jobs other consumers left unacknowledged for at least min_idle_ms,
+        e.g. because their worker died.
+
+        Returns:
+            list[tuple[str, dict]]: The message ids and jobs. Jobs trimmed from the stream are
+            dropped from the pending entries by Redis and not returned.
+        """
+        _, messages, *_ = await redis.xautoclaim(self.stream, self.group, consumer, min_idle_ms, count=count)
+        return [(message_id, job) for message_id, job in messages if job]
+
+    async def start(self, redis: Redis, jobs: list[dict]) -> list[int]:
+        """
+        Count an attempt of each job and mark it as processing, in one round trip.
+
+        Returns:
+            list[int]: The attempt number of each job, 1 for its first delivery.
+        """
+        async with redis.pipeline(transaction=False) as pipe:
+            for job in jobs:
+                pipe.hincrby(self.job_key(job["job_id"]), "attempts", 1)
+                pipe.hset(self.job_key(job["job_id"]), "status", "processing")
+            results = await pipe.execute()
+        return results[::2]
+
+    async def finish(self, redis: Redis, message_ids: list[str], statuses: dict[str, dict]):
+        """
+        Record the outcome of jobs and acknowledge their messages, in one round trip.
+
+        Args:
+            redis (Redis): The Redis client.
+            message_ids (list[str]): The messages to acknowledge.
+            statuses (dict[str, dict]): The fields to set by job id, e.g. {"status": "done", ...}.
+
+        Returns:
+            None
+        """
+        async with redis.pipeline(transaction=False) as pipe:
+            for job_id, status in statuses.items():
+                pipe.hset(self.job_key(job_id), mapping=status)
+                pipe.expire(self.job_key(job_id), self.job_ttl)
+            if message_ids:
+                pipe.xack(self.stream, self.group, *message_ids)
+            await pipe.execute()
+
+
+scoring_queue = ScoringQueue(
+    stream=essay_settings.ESSAY_SCORING_STREAM,
+    group=essay_settings.ESSAY_SCORING_GROUP,
+    max_len=essay_settings.ESSAY_SCORING_STREAM_MAX_LEN,
+    job_ttl=essay_settings.ESSAY_JOB_TTL,
+    max_attempts=essay_settings.ESSAY_JOB_MAX_ATTEMPTS,
+)
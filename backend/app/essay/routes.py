@@ -0,0 +1,143 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Request, status
+
+from app.db.deps import RedisDep, StatementWriteDbDep
+from app.essay.config import essay_settings
+from app.essay.schemas import EssayBatchSubmitted, EssaySubmit, EssaySubmitted, ScoringJobOut
+from app.essay.services import EssayService, read_essays
+from app.schemas import CustomResponse
+from app.user.deps import ProfileDep
+
+essay_router = APIRouter(tags=["Essay"])
+
+
+@essay_router.post("", status_code=status.HTTP_202_ACCEPTED, response_model=CustomResponse[EssaySubmitted])
+async def submit_essay(
+    db: StatementWriteDbDep,
+    redis: RedisDep,
+    profile: ProfileDep,
+    form_data: EssaySubmit,
+) -> CustomResponse[EssaySubmitted]:
+    """
+    Submits an essay of the current user for scoring.
+
+    The essay is stored and its scoring is queued for the scoring workers, so the
+    response does not wait for the assessment. An essay resubmitted unchanged against the
+    same question reuses its earlier assessment, and its job is done at once.
+
+    Args:
+        db (StatementWriteDbDep): Database dependency for writing the essay.
+        redis (RedisDep): Redis dependency for queueing the scoring job.
+        profile (ProfileDep): The current user's profile.
+        form_data (EssaySubmit): The essay text and the question it answers.
+
+    Returns:
+        CustomResponse[EssaySubmitted]: The essay_id and the job_id to poll.
+
+    Responses:
+        202: Essay stored and scoring queued, or assessed by reuse.
+        400: The question does not exist.
+    """
+    essay_service = EssayService(db, redis)
+    submitted = await essay_service.submit_essay(
+        client_id=profile["client_id"],
+        owner_id=profile["user_id"],
+        question_id=form_data.question_id,
+        content=form_data.content,
+    )
+    return CustomResponse(
+        code=status.HTTP_202_ACCEPTED,
+        message="Essay submitted for scoring",
+        data=submitted,
+    )
+
+
+@essay_router.post(
+    "/batch",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=CustomResponse[EssayBatchSubmitted],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+            "description": 'One essay per line, e.g. {"question_id": null, "content": "..."}',
+        }
+    },
+)
+async def submit_essays(
+    request: Request,
+    db: StatementWriteDbDep,
+    redis: RedisDep,
+    profile: ProfileDep,
+) -> CustomResponse[EssayBatchSubmitted]:
+    """
+    Submits a batch of essays of the current user for scoring, e.g. a class set.
+
+    The body is newline-delimited JSON, one essay per line, and is validated as it
+    streams in. The essays are stored with one COPY and their scoring jobs are queued
+    in one round trip.
+
+    Args:
+        request (Request): The request whose body holds the essays.
+        db (StatementWriteDbDep): Database dependency for writing the essays.
+        redis (RedisDep): Redis dependency for queueing the scoring jobs.
+        profile (ProfileDep): The current user's profile.
+
+    Returns:
+        CustomResponse[EssayBatchSubmitted]: The essay_id and job_id of each essay, in order.
+
+    Responses:
+        202: Essays stored and scoring queued.
+        400: An essay is invalid, a question does not exist, or the batch is empty.
+        413: The batch has too many essays, or an essay or the batch is too large.
+    """
+    essays = await read_essays(
+        request.stream(),
+        max_essays=essay_settings.ESSAY_BATCH_MAX_ESSAYS,
+        max_line_bytes=essay_settings.ESSAY_BATCH_MAX_LINE_BYTES,
+        max_bytes=essay_settings.ESSAY_BATCH_MAX_BYTES,
+    )
+    essay_service = EssayService(db, redis)
+    submitted = await essay_service.submit_essays(
+        client_id=profile["client_id"],
+        owner_id=profile["user_id"],
+        essays=essays,
+    )
+    return CustomResponse(
+        code=status.HTTP_202_ACCEPTED,
+        message=f"{len(essays)} essays submitted for scoring",
+        data=submitted,
+    )
+
+
+@essay_router.get("/jobs/{job_id}", response_model=CustomResponse[ScoringJobOut])
+async def get_scoring_job(
+    redis: RedisDep,
+    profile: ProfileDep,
+    job_id: UUID,
+) -> CustomResponse[ScoringJobOut]:
+    """
+    Retrieves the status of a scoring job of the current user.
+
+    Args:
+        redis (RedisDep): Redis dependency holding the job statuses.
+        profile (ProfileDep): The current user's profile.
+        job_id (UUID): The job_id returned on submission.
+
+    Returns:
+        CustomResponse[ScoringJobOut]: The job status, the assessment_id once scored, and
+        the band model version, marked provisional while its weights are not fitted.
+
+    Responses:
+        200: The job status.
+        404: The job does not exist, has expired, or is another user's.
+    """
+    # Job statuses live in Redis only, so no database connection is needed
+    essay_service = EssayService(None, redis)
+    job = await essay_service.get_scoring_job(str(job_id), profile["user_id"])
+    return CustomResponse(
+        code=status.HTTP_200_OK,
+        message="Success",
+        data=job,
+    )
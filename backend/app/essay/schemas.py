@@ -0,0 +1,41 @@
+from uuid import UUID
+
+from pydantic import field_validator
+
+from app.essay.config import essay_settings
+from app.schemas import BaseModel
+
+
+class EssaySubmit(BaseModel):
+    question_id: UUID | None
+    content: str
+
+    @field_validator("content")
+    def validate_content(cls, v):
+        if not v.strip():
+            raise ValueError("Essay must not be empty")
+        if len(v) > essay_settings.ESSAY_MAX_CONTENT_LENGTH:
+            raise ValueError(f"Essay must be at most {essay_settings.ESSAY_MAX_CONTENT_LENGTH} characters")
+        return v
+
+
+# Output Schemas
+class EssaySubmitted(BaseModel):
+    essay_id: UUID
+    job_id: UUID
+    status: str
+
+
+class EssayBatchSubmitted(BaseModel):
+    essays: list[EssaySubmitted]
+
+
+class ScoringJobOut(BaseModel):
+    job_id: UUID
+    essay_id: UUID
+    status: str
+    attempts: int
+    assessment_id: UUID | None
+    error: str | None
+    model_version: str
+    provisional: bool  # the band model's weights are placeholders, not fitted on marked essays
@@ -0,0 +1,284 @@
+from pathlib import Path
+
+import numpy as np
+import orjson
+
+from app.essay.config import essay_settings
+from app.essay.features.extract import extract_features
+
+# The criteria of an assessment, each with a band and a feedback column
+CRITERIA = ("task_achievement", "coherence_cohesion", "lexical_resource", "grammatical_range")
+
+# The scored columns of an assessment, each band followed by its feedback
+SCORE_COLUMNS = [column for score in ("overall_score", *CRITERIA) for column in (score, f"{score}_feedback")]
+
+# The word count an IELTS Task 2 answer is expected to reach
+MIN_WORDS = 250
+
+# The sentence length in words that reads most naturally in an essay
+TARGET_SENTENCE_LENGTH = 18
+
+
+def round_criterion(bands: np.ndarray) -> np.ndarray:
+    """
+    Round criterion bands to whole bands within 0-9, halves rounding up.
+    """
+    return np.clip(np.floor(bands + 0.5), 0.0, 9.0)
+
+
+def round_overall(bands: np.ndarray) -> np.ndarray:
+    """
+    Round overall bands to the nearest half band within 0-9, the way IELTS rounds an overall
+    score: a mean ending in .25 rounds up to the half band, and one ending in .75 up to the
+    next whole band.
+    """
+    return np.clip(np.floor(bands * 2 + 0.5) / 2, 0.0, 9.0)
+
+
+def model_inputs(features: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """
+    Derive the inputs of a band model from the text features of a batch of essays.
+
+    The inputs are capped where more stops meaning better, e.g. length past the required
+    word count, and the type-token ratio is scaled by the square root of the word count
+    (Guiraud's index), so that it does not favour short essays.
+
+    Args:
+        features (dict[str, np.ndarray]): The features, as returned by extract_features.
+
+    Returns:
+        dict[str, np.ndarray]: One array per input, with one entry per essay.
+    """
+    words = features["word_count"]
+    histogram = features["sentence_length_histogram"]
+    return {
+        "length_ratio": np.minimum(words / MIN_WORDS, 1.2),
+        "paragraphs": np.minimum(features["paragraph_count"], 6),
+        "sentences_per_paragraph": np.minimum(features["sentences_per_paragraph"], 8),
+        "sentence_length_std": np.minimum(features["sentence_length_std"], 25),
+        "sentence_length_deviation": np.minimum(np.abs(features["sentence_length_mean"] - TARGET_SENTENCE_LENGTH), 20),
+        "short_sentences": histogram[:, 0],
+        "long_sentences": histogram[:, 3:].sum(axis=1),
+        "guiraud_index": np.minimum(features["type_token_ratio"] * np.sqrt(words), 15),
+        "lexical_density": features["lexical_density"],
+        "word_length_mean": np.minimum(features["word_length_mean"], 9),
+    }
+
+
+INPUTS = tuple(model_inputs(extract_features([])))
+
+
+class BandModel:
+    def __init__(
+        self, version: str, inputs: list[str], weights: np.ndarray, intercepts: np.ndarray, provisional: bool = False
+    ):
+        """
+        Initialize a linear band model.
+
+        Args/Attributes:
+            version (str): The version of the model artifact.
+            inputs (list[str]): The inputs the model weighs, from INPUTS.
+            weights (np.ndarray): The weight of every input for every criterion, (inputs, CRITERIA).
+            intercepts (np.ndarray): The intercept of every criterion, (CRITERIA,).
+            provisional (bool): Whether the weights are placeholders rather than fitted on
+                examiner-marked essays.
+        """
+        self.version = version
+        self.inputs = inputs
+        self.weights = weights
+        self.intercepts = intercepts
+        self.provisional = provisional
+
+    def predict(self, inputs: dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Predict the unrounded criterion bands of a batch of essays, with one matrix product.
+
+        Args:
+            inputs (dict[str, np.ndarray]): The model inputs, as returned by model_inputs.
+
+        Returns:
+            np.ndarray: The bands of every essay, one row per essay and one column per criterion.
+        """
+        return np.column_stack([inputs[name] for name in self.inputs]) @ self.weights + self.intercepts
+
+
+def load_band_model(path: Path) -> BandModel:
+    """
+    Load a band model artifact.
+
+    The artifact is a JSON file with the model version, whether it is provisional, and,
+    for every criterion, an intercept and a weight by input name.
+
+    Args:
+        path (Path): The artifact file.
+
+    Returns:
+        BandModel: The model.
+
+    Raises:
+        ValueError: If a criterion is missing, or an input is unknown or there are none.
+    """
+    artifact = orjson.loads(path.read_bytes())
+    criteria = artifact["criteria"]
+    if set(criteria) != set(CRITERIA):
+        raise ValueError(f"Band model {path} must define exactly the criteria {', '.join(CRITERIA)}")
+    inputs = sorted({name for criterion in criteria.values() for name in criterion["weights"]})
+    unknown = set(inputs) - set(INPUTS)
+    if not inputs:
+        raise ValueError(f"Band model {path} uses no inputs")
+    if unknown:
+        raise ValueError(f"Band model {path} uses unknown inputs: {', '.join(sorted(unknown))}")
+
+    weights = np.zeros((len(inputs), len(CRITERIA)))
+    for column, criterion in enumerate(CRITERIA):
+        for name, weight in criteria[criterion]["weights"].items():
+            weights[inputs.index(name), column] = weight
+    intercepts = np.array([criteria[criterion]["intercept"] for criterion in CRITERIA], dtype=np.float64)
+    return BandModel(artifact["version"], inputs, weights, intercepts, artifact.get("provisional", False))
+
+
+def _level(band: float, high: str, middle: str, low: str) -> str:
+    return high if band >= 7 else middle if band >= 5 else low
+
+
+def feedback(bands: dict[str, float], features: dict[str, float]) -> dict[str, str]:
+    """
+    Write the feedback of every criterion of an essay, from its bands and the features behind them.
+
+    Args:
+        bands (dict[str, float]): The band of every criterion and the overall_score.
+        features (dict[str, float]): The text features of the essay.
+
+    Returns:
+        dict[str, str]: The text of every feedback column.
+    """
+    words = int(features["word_count"])
+    if not words:
+        return {f"{score}_feedback": "The answer is empty." for score in ("overall_score", *CRITERIA)}
+
+    paragraphs = int(features["paragraph_count"])
+    task = _level(
+        bands["task_achievement"],
+        "The response addresses the task fully with well-developed ideas.",
+        "The response addresses the task, but some ideas need more development.",
+        "The response does not address the task adequately.",
+    )
+    task += (
+        f" At {words} words it is under the {MIN_WORDS} words required."
+        if words < MIN_WORDS
+        else f" At {words} words it meets the length required."
+    )
+    coherence = _level(
+        bands["coherence_cohesion"],
+        "Ideas are organised logically and progress clearly.",
+        "The organisation is mostly clear, though the progression is uneven at times.",
+        "The answer lacks a clear overall organisation.",
+    )
+    coherence += f" It is written in {paragraphs} paragraph{'s' if paragraphs != 1 else ''}."
+    if paragraphs < 4:
+        coherence += " Use separate paragraphs for the introduction, each main idea and the conclusion."
+    lexical = _level(
+        bands["lexical_resource"],
+        "The vocabulary is wide and used precisely.",
+        "The vocabulary is adequate for the task, with some repetition.",
+        "The vocabulary is limited and repetitive.",
+    )
+    lexical += (
+        f" {features['type_token_ratio']:.0%} of the words are distinct and"
+        f" {features['lexical_density']:.0%} carry content."
+    )
+    grammar = _level(
+        bands["grammatical_range"],
+        "A wide range of sentence structures is used accurately.",
+        "A mix of simple and complex sentences is used.",
+        "Sentence structures are limited.",
+    )
+    grammar += (
+        f" Sentences are {features['sentence_length_mean']:.0f} words long on average,"
+        f" the longest {int(features['sentence_length_max'])}."
+    )
+    if features["short_sentences"] > 0.4:
+        grammar += " Combine short sentences with subordinate clauses."
+    elif features["long_sentences"] > 0.3:
+        grammar += " Split very long sentences so that each stays clear."
+
+    return {
+        "overall_score_feedback": (
+            f"Overall band {bands['overall_score']:g}: task achievement {bands['task_achievement']:g},"
+            f" coherence and cohesion {bands['coherence_cohesion']:g},"
+            f" lexical resource {bands['lexical_resource']:g},"
+            f" grammatical range and accuracy {bands['grammatical_range']:g}."
+        ),
+        "task_achievement_feedback": task,
+        "coherence_cohesion_feedback": coherence,
+        "lexical_resource_feedback": lexical,
+        "grammatical_range_feedback": grammar,
+    }
+
+
+class BandScorer:
+    def __init__(self, model_path: Path):
+        """
+        Initialize a scorer of essays against the IELTS band descriptors.
+
+        The scorer runs locally and deterministically: the same text always gets the same
+        bands and feedback from the same model. The model is loaded on first use, or by
+        load() at startup, and kept for the life of the process.
+
+        Args/Attributes:
+            model_path (Path): The band model artifact.
+        """
+        self.model_path = model_path
+        self._model: BandModel | None = None
+
+    def load(self) -> BandModel:
+        """
+        Load the band model, unless it is loaded already.
+
+        Returns:
+            BandModel: The model.
+        """
+        if self._model is None:
+            self._model = load_band_model(self.model_path)
+        return self._model
+
+    @property
+    def version(self) -> str:
+        return self.load().version
+
+    @property
+    def provisional(self) -> bool:
+        return self.load().provisional
+
+    def score(self, contents: list[str]) -> list[dict]:
+        """
+        Score a batch of essays.
+
+        The features and bands of the whole batch are computed at once. Criterion bands are
+        whole bands and the overall band is their mean rounded to a half band, all within
+        0-9; an essay without words gets 0 for every band.
+
+        Args:
+            contents (list[str]): The essay texts.
+
+        Returns:
+            list[dict]: For each essay, the overall and criterion bands with their feedback,
+            by assessment column.
+        """
+        features = extract_features(contents)
+        inputs = model_inputs(features)
+        bands = round_criterion(self.load().predict(inputs))
+        bands[features["word_count"] == 0] = 0.0
+        overall = round_overall(bands.mean(axis=1))
+
+        # The feedback reads features of one essay at a time, as Python values
+        values = {name: array.tolist() for name, array in (features | inputs).items() if array.ndim == 1}
+        scores = []
+        for i, (essay_bands, overall_score) in enumerate(zip(bands.tolist(), overall.tolist())):
+            essay_scores = {"overall_score": overall_score, **dict(zip(CRITERIA, essay_bands))}
+            essay_scores |= feedback(essay_scores, {name: column[i] for name, column in values.items()})
+            scores.append(essay_scores)
+        return scores
+
+
+scorer = BandScorer(essay_settings.ESSAY_SCORING_MODEL_PATH)
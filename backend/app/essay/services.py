@@ -0,0 +1,317 @@
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator
+from uuid import UUID, uuid4
+
+from asyncpg.exceptions import ForeignKeyViolationError
+from databases import Database
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from sqlalchemy import bindparam, insert
+
+from app.db.postgresql import postgresql_config
+from app.db.queries import column_list, columns, compile_query, row_class
+from app.db.statements import statements
+from app.essay.dedupe import assessment_cache, content_hash
+from app.essay.exceptions import EssayBadRequest, EssayNotFound, EssayPayloadTooLarge
+from app.essay.models import Essay
+from app.essay.queue import scoring_queue
+from app.essay.schemas import EssaySubmit
+from app.essay.scoring import SCORE_COLUMNS, scorer
+from app.metrics import current_route, db_query_duration_seconds
+from app.profiler import record_query
+
+# A submitted essay is only handed to the queue, by its key and owner
+EssayRow = row_class("EssayRow", Essay, ("id", "client_id", "owner_id", "created_at"))
+EssayToScoreRow = row_class(
+    "EssayToScoreRow", Essay, ("id", "created_at", "client_id", "owner_id", "question_id", "content")
+)
+
+# The columns a batch of essays is copied into; the others keep their defaults
+COPY_COLUMNS = ("id", "client_id", "owner_id", "question_id", "content", "created_at", "updated_at")
+
+SCORE_TYPES = {column: "text" if column.endswith("_feedback") else "numeric" for column in SCORE_COLUMNS}
+
+statements.register(
+    "create_essay",
+    compile_query(
+        insert(Essay)
+        .values(
+            client_id=bindparam("client_id"),
+            owner_id=bindparam("owner_id"),
+            question_id=bindparam("question_id"),
+            content=bindparam("content"),
+        )
+        .returning(*columns(Essay, EssayRow.fields))
+    ),
+    EssayRow,
+)
+statements.register(
+    "get_essays_to_score",
+    f"""SELECT {column_list(Essay, EssayToScoreRow.fields)}
+    FROM essay_contents
+    JOIN unnest(CAST(:essay_ids AS uuid[]), CAST(:essay_created_ats AS timestamptz[]))
+        AS job (essay_id, essay_created_at)
+        ON essay_contents.id = job.essay_id AND essay_contents.created_at = job.essay_created_at""",
+    EssayToScoreRow,
+)
+# An essay is assessed once, which the unique index on (essay_id, essay_created_at)
+# enforces: of two workers running the same job at once, e.g. one slow and one that
+# reclaimed the job, only the first inserts
+statements.register(
+    "create_assessments",
+    f"""INSERT INTO essay_assessments (
+        essay_id, essay_created_at, client_id, owner_id, content_hash, {", ".join(SCORE_COLUMNS)}
+    )
+    SELECT * FROM unnest(
+        CAST(:essay_ids AS uuid[]), CAST(:essay_created_ats AS timestamptz[]),
+        CAST(:client_ids AS uuid[]), CAST(:owner_ids AS uuid[]), CAST(:content_hashes AS varchar[]),
+        {", ".join(f"CAST(:{column}s AS {SCORE_TYPES[column]}[])" for column in SCORE_COLUMNS)}
+    )
+    ON CONFLICT (essay_id, essay_created_at) DO NOTHING
+    RETURNING id, essay_id""",
+)
+# Run as a statement of its own, so that it sees the assessments committed by another
+# worker while create_assessments waited on them
+statements.register(
+    "get_assessments_of_essays",
+    """SELECT essay_assessments.id, essay_assessments.essay_id
+    FROM essay_assessments
+    JOIN unnest(CAST(:essay_ids AS uuid[]), CAST(:essay_created_ats AS timestamptz[]))
+        AS essay (essay_id, essay_created_at)
+        ON essay_assessments.essay_id = essay.essay_id
+        AND essay_assessments.essay_created_at = essay.essay_created_at""",
+)
+
+
+def assessment_values(essays: list, content_hashes: list[str], scores: list[dict]) -> dict:
+    """
+    Build the values of create_assessments for a batch of essays.
+
+    Args:
+        essays (list): The essays, with their id, created_at, client_id and owner_id.
+        content_hashes (list[str]): The content hash of each essay.
+        scores (list[dict]): The scores of each essay, by assessment column.
+
+    Returns:
+        dict: The values by parameter name.
+    """
+    return {
+        "essay_ids": [essay.id for essay in essays],
+        "essay_created_ats": [essay.created_at for essay in essays],
+        "client_ids": [essay.client_id for essay in essays],
+        "owner_ids": [essay.owner_id for essay in essays],
+        "content_hashes": content_hashes,
+        **{f"{column}s": [score[column] for score in scores] for column in SCORE_COLUMNS},
+    }
+
+
+async def create_assessments(db: Database, values: dict) -> dict[str, str]:
+    """
+    Write the assessments of a batch of essays.
+
+    An essay assessed already, e.g. by a job run again after its assessment was written,
+    keeps its assessment, which is read back in a second statement.
+
+    Args:
+        db (Database): The primary database.
+        values (dict): The values, as built by assessment_values.
+
+    Returns:
+        dict[str, str]: The assessment_id by essay_id.
+    """
+    rows = await statements.fetch_all(db, "create_assessments", values)
+    assessments = {str(row.essay_id): str(row.id) for row in rows}
+    assessed = [
+        (essay_id, created_at)
+        for essay_id, created_at in zip(values["essay_ids"], values["essay_created_ats"])
+        if str(essay_id) not in assessments
+    ]
+    if assessed:
+        rows = await statements.fetch_all(
+            db,
+            "get_assessments_of_essays",
+            {
+                "essay_ids": [essay_id for essay_id, _ in assessed],
+                "essay_created_ats": [created_at for _, created_at in assessed],
+            },
+        )
+        assessments |= {str(row.essay_id): str(row.id) for row in rows}
+    return assessments
+
+
+async def read_essays(
+    chunks: AsyncIterator[bytes], max_essays: int, max_line_bytes: int, max_bytes: int
+) -> list[EssaySubmit]:
+    """
+    Reads and validates a batch of essays as the request body streams in.
+
+    The body holds one JSON essay per line, so each essay is validated as soon as its
+    line is complete, and a bad essay or an oversized batch is rejected without reading
+    the rest of the body.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The chunks of the request body.
+        max_essays (int): The maximum number of essays in a batch.
+        max_line_bytes (int): The maximum size of a line.
+        max_bytes (int): The maximum size of the body.
+
+    Returns:
+        list[EssaySubmit]: The essays, in order.
+
+    Raises:
+        EssayBadRequest: If a line is not a valid essay, or the batch is empty.
+        EssayPayloadTooLarge: If the batch has too many essays, or a line or the body is too large.
+    """
+    essays: list[EssaySubmit] = []
+    line_number = 0
+
+    def add(line: bytes):
+        nonlocal line_number
+        line_number += 1
+        if len(line) > max_line_bytes:
+            raise EssayPayloadTooLarge(detail=f"Line {line_number} is larger than {max_line_bytes} bytes")
+        if not line.strip():
+            return
+        if len(essays) == max_essays:
+            raise EssayPayloadTooLarge(detail=f"A batch holds at most {max_essays} essays")
+        try:
+            essays.append(EssaySubmit.model_validate_json(line))
+        except ValidationError as e:
+            raise EssayBadRequest(detail=f"Line {line_number}: {e.errors()[0]['msg']}")
+
+    buffer = b""
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise EssayPayloadTooLarge(detail=f"A batch is at most {max_bytes} bytes")
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            add(line)
+        if len(buffer) > max_line_bytes:
+            raise EssayPayloadTooLarge(detail=f"Line {line_number + 1} is larger than {max_line_bytes} bytes")
+    add(buffer)
+
+    if not essays:
+        raise EssayBadRequest(detail="No essays submitted")
+    return essays
+
+
+class EssayService:
+    def __init__(self, db: Database | None, redis: Redis):
+        self.db = db
+        self.redis = redis
+
+    async def submit_essay(self, client_id: str, owner_id: str, question_id: UUID | None, content: str) -> dict:
+        """
+        Stores an essay and queues its scoring, unless it can reuse an assessment.
+
+        The essay is committed before its job is queued, so that a worker picking up
+        the job always finds it. An essay the same as one assessed already against the
+        same question, whitespace aside, is given the scores of that assessment at once.
+
+        Args:
+            client_id (str): The client_id of the owner's profile.
+            owner_id (str): The user_id of the owner.
+            question_id (UUID | None): The question the essay answers, if any.
+            content (str): The essay text.
+
+        Returns:
+            dict: The essay_id, the job_id to poll, and the job status, "done" if an
+            assessment was reused.
+
+        Raises:
+            EssayBadRequest: If the question does not exist.
+        """
+        values = {"client_id": client_id, "owner_id": owner_id, "question_id": question_id, "content": content}
+        try:
+            essay = await statements.fetch_one(self.db, "create_essay", values)
+        except ForeignKeyViolationError:
+            raise EssayBadRequest(detail="Question does not exist")
+
+        digest = content_hash(scorer.version, question_id, content)
+        reused = (await assessment_cache.get_many(self.redis, self.db, [digest])).get(digest)
+        if reused is not None:
+            assessments = await create_assessments(self.db, assessment_values([essay], [digest], [reused]))
+            job_id = await scoring_queue.complete(self.redis, essay, assessments[str(essay.id)])
+            return {"essay_id": essay.id, "job_id": job_id, "status": "done"}
+
+        job_id = await scoring_queue.enqueue(self.redis, essay)
+        return {"essay_id": essay.id, "job_id": job_id, "status": "queued"}
+
+    async def submit_essays(self, client_id: str, owner_id: str, essays: list[EssaySubmit]) -> dict:
+        """
+        Stores a batch of essays with one COPY and queues their scoring in one round trip.
+
+        The ids and creation time of the essays are set here, since COPY returns no rows.
+        The batch is stored as a whole: if one essay is rejected, none is stored. Essays
+        assessed already are not looked up here: the workers reuse their assessments.
+
+        Args:
+            client_id (str): The client_id of the owner's profile.
+            owner_id (str): The user_id of the owner.
+            essays (list[EssaySubmit]): The essays.
+
+        Returns:
+            dict: The essay_id, job_id and job status of each essay, in order.
+
+        Raises:
+            EssayBadRequest: If a question does not exist.
+        """
+        created_at = datetime.now(timezone.utc)
+        records = [
+            (uuid4(), client_id, owner_id, essay.question_id, essay.content, created_at, created_at) for essay in essays
+        ]
+        started_at = time.perf_counter()
+        try:
+            async with postgresql_config.connection(self.db) as connection:
+                await connection.raw_connection.copy_records_to_table(Essay.name, records=records, columns=COPY_COLUMNS)
+        except ForeignKeyViolationError:
+            raise EssayBadRequest(detail="Question does not exist")
+        finally:
+            elapsed = time.perf_counter() - started_at
+            db_query_duration_seconds.labels(statement="copy_essays", route=current_route()).observe(elapsed)
+            record_query("copy_essays", elapsed)
+
+        queued = [
+            {"id": record[0], "created_at": created_at, "client_id": client_id, "owner_id": owner_id}
+            for record in records
+        ]
+        job_ids = await scoring_queue.enqueue_many(self.redis, queued)
+        return {
+            "essays": [
+                {"essay_id": essay["id"], "job_id": job_id, "status": "queued"}
+                for essay, job_id in zip(queued, job_ids)
+            ]
+        }
+
+    async def get_scoring_job(self, job_id: str, owner_id: str) -> dict:
+        """
+        Retrieves the status of a scoring job of an owner.
+
+        Args:
+            job_id (str): The job id returned on submission.
+            owner_id (str): The user_id of the owner of the essay.
+
+        Returns:
+            dict: The job status, its attempts, the assessment_id once scored, and the
+            version of the band model, with whether it is provisional.
+
+        Raises:
+            EssayNotFound: If the job does not exist, has expired, or is another user's.
+        """
+        job = await scoring_queue.get_status(self.redis, job_id)
+        if job is None or job.get("owner_id") != str(owner_id):
+            raise EssayNotFound(detail="Scoring job not found")
+        return {
+            "job_id": job_id,
+            "essay_id": job["essay_id"],
+            "status": job["status"],
+            "attempts": int(job.get("attempts", 0)),
+            "assessment_id": job.get("assessment_id"),
+            "error": job.get("error"),
+            "model_version": scorer.version,
+            "provisional": scorer.provisional,
+        }
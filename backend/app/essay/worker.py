@@ -0,0 +1,347 @@
+"""
+Essay scoring worker.
+
+Consumes the scoring jobs the API queues, scores the essays and writes their
+assessments. Every worker process is a consumer of the same consumer group, so
+scoring throughput scales with the number of worker processes, independently of
+the API workers.
+
+Usage:
+    uv run python -m app.essay.worker
+"""
+
+import asyncio
+import logging
+import logging.config
+import os
+import signal
+import socket
+import time
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+
+from databases import Database
+from redis.asyncio import Redis
+
+from app.db.postgresql import postgresql_config
+from app.db.redis import redis_config
+from app.db.statements import statements
+from app.essay.config import essay_settings
+from app.essay.dedupe import AssessmentCache, assessment_cache, content_hash, normalize_content
+from app.essay.queue import ScoringQueue, scoring_queue
+from app.essay.scoring import BandScorer, scorer
+from app.essay.services import assessment_values, create_assessments
+
+logger = logging.getLogger(__name__)
+
+LOGGING_CONFIG = Path(__file__).parents[2] / "logging.ini"
+
+
+class ScoringWorker:
+    def __init__(
+        self,
+        queue: ScoringQueue,
+        scorer: BandScorer,
+        cache: AssessmentCache,
+        consumer: str,
+        batch_size: int,
+        block_ms: int,
+        claim_idle_ms: int,
+        claim_interval: float,
+    ):
+        """
+        Initialize a scoring worker.
+
+        The worker reads jobs in batches, scores each batch at once and writes its
+        assessments with one statement, then acknowledges the jobs. A job whose batch
+        failed is left pending and retried once it has been idle for claim_idle_ms,
+        by this worker or another; jobs left by a worker that died are reclaimed the
+        same way. A job started more than the queue's max_attempts times is failed.
+
+        Args/Attributes:
+            queue (ScoringQueue): The queue of scoring jobs.
+            scorer (BandScorer): Scores a batch of essay texts.
+            cache (AssessmentCache): The assessments to reuse by content hash, and the locks
+                of the hashes being scored.
+            consumer (str): The consumer name of this worker in the consumer group.
+            batch_size (int): The maximum number of jobs read and scored at once.
+            block_ms (int): The time a read waits for new jobs in milliseconds.
+            claim_idle_ms (int): The time a job stays unacknowledged before it is reclaimed.
+            claim_interval (float): The time between two reclaims of stalled jobs in seconds.
+            scored (int): The number of jobs scored, reused assessments included.
+            reused (int): The number of essays given the scores of an existing assessment.
+            failed (int): The number of jobs given up.
+            reclaimed (int): The number of stalled jobs reclaimed.
+        """
+        self.queue = queue
+        self.scorer = scorer
+        self.cache = cache
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.claim_interval = claim_interval
+        self._stopping = False
+
+        self.scored = 0
+        self.reused = 0
+        self.failed = 0
+        self.reclaimed = 0
+
+    async def score(self, redis: Redis, db: Database, jobs: list[dict]) -> dict[str, str]:
+        """
+        Score the essays of a batch of jobs and write their assessments.
+
+        An essay whose content hash has an assessment already reuses its scores. The other
+        hashes are scored under their single-flight lock; a hash another worker holds the
+        lock of is waited for, then reused, or scored here if the wait runs out.
+
+        Args:
+            redis (Redis): The Redis client.
+            db (Database): The primary database.
+            jobs (list[dict]): The jobs.
+
+        Returns:
+            dict[str, str]: The assessment_id by essay_id. Essays that no longer exist are missing.
+        """
+        keys = dict.fromkeys((job["essay_id"], datetime.fromisoformat(job["essay_created_at"])) for job in jobs)
+        essays = await statements.fetch_all(
+            db,
+            "get_essays_to_score",
+            {
+                "essay_ids": [essay_id for essay_id, _ in keys],
+                "essay_created_ats": [created_at for _, created_at in keys],
+            },
+        )
+        if not essays:
+            return {}
+
+        version = self.scorer.version
+        content_hashes = [content_hash(version, essay.question_id, essay.content) for essay in essays]
+        reused = await self.cache.get_many(redis, db, list(dict.fromkeys(content_hashes)))
+        missing = [digest for digest in dict.fromkeys(content_hashes) if digest not in reused]
+        token = f"{self.consumer}:{uuid4().hex}"
+        locked = await self.cache.acquire(redis, missing, token)
+        ready = reused.keys() | set(locked)
+        try:
+            assessments = await self.assess(
+                redis,
+                db,
+                [(essay, digest) for essay, digest in zip(essays, content_hashes) if digest in ready],
+                reused,
+            )
+        finally:
+            await self.cache.release(redis, locked, token)
+
+        # Hashes locked by other workers are assessed once their scores are published
+        waiting = [(essay, digest) for essay, digest in zip(essays, content_hashes) if digest not in ready]
+        if waiting:
+            reused |= await self.cache.wait(redis, list(dict.fromkeys(digest for _, digest in waiting)))
+            assessments |= await self.assess(redis, db, waiting, reused)
+        return assessments
+
+    async def assess(self, redis: Redis, db: Database, essays: list[tuple], reused: dict[str, dict]) -> dict[str, str]:
+        """
+        Write the assessments of essays, scoring the content hashes that have none to reuse,
+        and publish the scores of those.
+
+        Args:
+            redis (Redis): The Redis client.
+            db (Database): The primary database.
+            essays (list[tuple]): The essays to score and their content hashes.
+            reused (dict[str, dict]): The assessment_id and scores of the hashes assessed already.
+
+        Returns:
+            dict[str, str]: The assessment_id by essay_id.
+        """
+        if not essays:
+            return {}
+
+        # Each hash is scored once, from the normalized text it was computed from
+        contents = {digest: normalize_content(essay.content) for essay, digest in essays if digest not in reused}
+        scored = dict(zip(contents, self.scorer.score(list(contents.values())))) if contents else {}
+        values = assessment_values(
+            [essay for essay, _ in essays],
+            [digest for _, digest in essays],
+            [reused.get(digest) or scored[digest] for _, digest in essays],
+        )
+        assessments = await create_assessments(db, values)
+        self.reused += sum(digest in reused for _, digest in essays)
+
+        published = {}
+        for essay, digest in essays:
+            if digest in scored and digest not in published and str(essay.id) in assessments:
+                published[digest] = {"assessment_id": assessments[str(essay.id)], **scored[digest]}
+        await self.cache.set_many(redis, published)
+        return assessments
+
+    async def try_score(
+        self, redis: Redis, db: Database, messages: list[tuple[str, dict]]
+    ) -> dict[str, str] | Exception:
+        """
+        Score a batch of jobs, returning the error instead of raising it.
+
+        Args:
+            redis (Redis): The Redis client.
+            db (Database): The primary database.
+            messages (list[tuple[str, dict]]): The message ids and jobs.
+
+        Returns:
+            dict[str, str] | Exception: The assessment_id by essay_id, or the error the batch failed with.
+        """
+        try:
+            return await self.score(redis, db, [job for _, job in messages])
+        except Exception as e:
+            logger.error(f"Failed to score {len(messages)} essays: {e}")
+            return e
+
+    async def process(self, redis: Redis, db: Database, messages: list[tuple[str, dict]]):
+        """
+        Run a batch of jobs and record their outcome.
+
+        If the batch fails, its jobs are scored one at a time, so that a single bad job
+        does not hold back the others. Jobs that fail are left unacknowledged to be
+        reclaimed, until they were started more than max_attempts times.
+
+        Args:
+            redis (Redis): The Redis client.
+            db (Database): The primary database.
+            messages (list[tuple[str, dict]]): The message ids and jobs.
+
+        Returns:
+            None
+        """
+        attempts = await self.queue.start(redis, [job for _, job in messages])
+        statuses: dict[str, dict] = {}
+        acknowledged: list[str] = []
+        runnable: list[tuple[str, dict]] = []
+        for (message_id, job), attempt in zip(messages, attempts):
+            if attempt > self.queue.max_attempts:
+                statuses[job["job_id"]] = {"status": "failed", "error": f"Gave up after {attempt - 1} attempts"}
+                acknowledged.append(message_id)
+                self.failed += 1
+            else:
+                runnable.append((message_id, job))
+
+        outcomes = []
+        if runnable:
+            outcomes.append((runnable, await self.try_score(redis, db, runnable)))
+            if isinstance(outcomes[0][1], Exception) and len(runnable) > 1:
+                # Score the jobs one at a time, so that only the jobs that fail on their own
+                # use up their attempts and the rest are acknowledged
+                outcomes = [([item], await self.try_score(redis, db, [item])) for item in runnable]
+
+        for group, outcome in outcomes:
+            if isinstance(outcome, Exception):
+                for _, job in group:
+                    statuses[job["job_id"]] = {"status": "retrying", "error": str(outcome)}
+                continue
+            for message_id, job in group:
+                assessment_id = outcome.get(job["essay_id"])
+                if assessment_id is None:
+                    statuses[job["job_id"]] = {"status": "failed", "error": "Essay not found"}
+                    self.failed += 1
+                else:
+                    statuses[job["job_id"]] = {"status": "done", "assessment_id": assessment_id}
+                    self.scored += 1
+                acknowledged.append(message_id)
+
+        await self.queue.finish(redis, acknowledged, statuses)
+
+    async def run(self, redis: Redis, db: Database):
+        """
+        Process jobs until stop() is called, reclaiming stalled jobs every interval.
+
+        The current batch is finished before returning.
+
+        Returns:
+            None
+        """
+        await self.queue.create_group(redis)
+        next_claim_at = 0.0
+        while not self._stopping:
+            try:
+                messages = []
+                if time.monotonic() >= next_claim_at:
+                    messages = await self.queue.claim_stalled(redis, self.consumer, self.batch_size, self.claim_idle_ms)
+                    # A full batch may leave more behind, which is claimed right after it
+                    next_claim_at = time.monotonic() + (0 if len(messages) == self.batch_size else self.claim_interval)
+                    if messages:
+                        self.reclaimed += len(messages)
+                        logger.warning(f"Reclaimed {len(messages)} stalled scoring jobs")
+                if not messages:
+                    messages = await self.queue.read(redis, self.consumer, self.batch_size, self.block_ms)
+                if messages:
+                    await self.process(redis, db, messages)
+            except Exception as e:
+                logger.error(f"Scoring worker error: {e}")
+                await asyncio.sleep(1)
+
+    def stop(self):
+        """
+        Ask the worker to stop after the current batch.
+
+        Returns:
+            None
+        """
+        self._stopping = True
+
+    def stats(self) -> dict:
+        """
+        Return the worker counters.
+
+        Returns:
+            dict: The number of scored, failed and reclaimed jobs, of reused assessments, and the
+            assessment cache counters.
+        """
+        return {
+            "scored": self.scored,
+            "reused": self.reused,
+            "failed": self.failed,
+            "reclaimed": self.reclaimed,
+            "cache": self.cache.stats(),
+        }
+
+
+async def run_worker():
+    """
+    Connect to PostgreSQL and Redis and run a scoring worker until SIGINT or SIGTERM.
+
+    Returns:
+        None
+    """
+    model = scorer.load()
+    logger.info(f"Loaded band model {model.version} from {scorer.model_path}")
+    if model.provisional:
+        logger.warning(f"Band model {model.version} is provisional: its weights are not fitted on marked essays")
+    await asyncio.gather(postgresql_config.connect(), redis_config.connect())
+    worker = ScoringWorker(
+        queue=scoring_queue,
+        scorer=scorer,
+        cache=assessment_cache,
+        consumer=f"{socket.gethostname()}-{os.getpid()}",
+        batch_size=essay_settings.ESSAY_WORKER_BATCH_SIZE,
+        block_ms=essay_settings.ESSAY_WORKER_BLOCK_MS,
+        claim_idle_ms=essay_settings.ESSAY_WORKER_CLAIM_IDLE_MS,
+        claim_interval=essay_settings.ESSAY_WORKER_CLAIM_INTERVAL,
+    )
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, worker.stop)
+
+    logger.info(f"Scoring worker {worker.consumer} started")
+    try:
+        await worker.run(redis_config.redis_client, postgresql_config.db_pool)
+    finally:
+        logger.info(f"Scoring worker {worker.consumer} stopped: {worker.stats()}")
+        await asyncio.gather(postgresql_config.disconnect(), redis_config.disconnect(), return_exceptions=True)
+
+
+def main():
+    logging.config.fileConfig(LOGGING_CONFIG, disable_existing_loggers=False)
+    asyncio.run(run_worker())
+
+
+if __name__ == "__main__":
+    main()
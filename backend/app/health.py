@@ -0,0 +1,67 @@
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+
+
+class Readiness:
+    def __init__(self):
+        """
+        Initialize the readiness state of this process.
+
+        Attributes:
+            ready (bool): Whether startup warm-up has finished and the process is not
+                shutting down, so it should receive traffic.
+            warm_up_seconds (float | None): The time from startup until warm-up finished.
+        """
+        self.ready = False
+        self.warm_up_seconds: float | None = None
+        self._started_at = time.perf_counter()
+
+    def mark_ready(self):
+        """
+        Record that warm-up has finished.
+
+        Returns:
+            None
+        """
+        self.warm_up_seconds = time.perf_counter() - self._started_at
+        self.ready = True
+
+    def mark_not_ready(self):
+        """
+        Record that the process is shutting down and should stop receiving traffic.
+
+        Returns:
+            None
+        """
+        self.ready = False
+
+
+readiness = Readiness()
+
+health_router = APIRouter(tags=["Health"])
+
+
+@health_router.get("/health/live", include_in_schema=False)
+async def live() -> ORJSONResponse:
+    """
+    Report that the process is up and serving requests.
+
+    Returns:
+        ORJSONResponse: Always 200.
+    """
+    return ORJSONResponse({"status": "live"})
+
+
+@health_router.get("/health/ready", include_in_schema=False)
+async def ready() -> ORJSONResponse:
+    """
+    Report whether the process should receive traffic.
+
+    Returns:
+        ORJSONResponse: 200 once warm-up has finished, 503 while warming up or shutting down.
+    """
+    if not readiness.ready:
+        return ORJSONResponse({"status": "warming_up"}, status_code=503)
+    return ORJSONResponse({"status": "ready", "warm_up_seconds": readiness.warm_up_seconds})
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -5,36 +6,115 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import ORJSONResponse
 
+from app.auth.hashing import password_hasher
 from app.config import settings
+from app.db.config import db_settings
 from app.db.postgresql import postgresql_config
-from app.db.redis import redis_config
+from app.db.redis import client_cache, redis_config
+from app.db.statements import statements
+from app.essay.partitions import partition_maintenance
+from app.health import health_router, readiness
+from app.metrics import MetricsMiddleware, metrics_router
+from app.profiler import QueryProfilerMiddleware
 from app.routes import api_router
+from app.user.cache import profile_cache
+from app.user.logins import last_login_buffer
 from app.utils import error_response
 
 logger = logging.getLogger(__name__)
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+async def connect_stores():
+    """
+    Connect to PostgreSQL and Redis concurrently.
+
+    Raises:
+        Exception: The first connection error, after every error has been logged.
+    """
+    results = await asyncio.gather(postgresql_config.connect(), redis_config.connect(), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, Exception)]
+    for store, result in zip(["PostgreSQL", "Redis"], results):
+        if isinstance(result, Exception):
+            logger.error(f"{store} error during lifespan: {result}")
+    if errors:
+        raise errors[0]
+
+
+async def warm_up():
+    """
+    Prepare the hot statements on the minimum connections of every pool and calibrate
+    password hashing, then report the process as ready.
+
+    A failed step is logged and the process still becomes ready, serving cold.
+
+    Returns:
+        None
+    """
+    db_pools = [postgresql_config.db_pool]
+    db_pools += [replica.db_pool for replica in postgresql_config.replicas if replica.db_pool.is_connected]
+    results = await asyncio.gather(
+        *(statements.warm(db_pool, db_settings.DATABASE_MIN_CONNECTIONS) for db_pool in db_pools),
+        password_hasher.calibrate(redis_config.redis_client),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Warm-up error during lifespan: {result}")
+    readiness.mark_ready()
+    logger.info(f"Warmed up in {readiness.warm_up_seconds:.2f}s")
+
+
+async def disconnect_stores():
+    """
+    Disconnect from PostgreSQL and Redis concurrently, giving up after SHUTDOWN_TIMEOUT.
+
+    Returns:
+        None
+    """
     try:
-        await postgresql_config.connect()
-    except Exception as e:
-        logger.error(f"PostgreSQL error during lifespan: {e}")
-        raise
+        async with asyncio.timeout(settings.SHUTDOWN_TIMEOUT):
+            results = await asyncio.gather(
+                postgresql_config.disconnect(), redis_config.disconnect(), return_exceptions=True
+            )
+    except TimeoutError:
+        logger.error(f"Database close did not finish within {settings.SHUTDOWN_TIMEOUT}s")
+        return
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Database close error during lifespan: {result}")
 
-    try:
-        await redis_config.connect()
-    except Exception as e:
-        logger.error(f"Redis error during lifespan: {e}")
-        raise
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect_stores()
+
+    password_hasher.start()
+    warm_up_task = asyncio.create_task(warm_up())
+    profile_cache_listener = asyncio.create_task(profile_cache.listen())
+    last_login_buffer.start()
+    partition_maintenance.start()
+    client_cache_tracker = None
+    if db_settings.REDIS_CLIENT_CACHE_ENABLED:
+        client_cache_tracker = asyncio.create_task(client_cache.track(redis_config.tracking_connection))
+    replication_lag_monitor = None
+    if postgresql_config.replicas:
+        replication_lag_monitor = asyncio.create_task(postgresql_config.monitor_replication_lag())
 
     yield
 
-    try:
-        await postgresql_config.disconnect()
-        await redis_config.disconnect()
-    except Exception as e:
-        logger.error(f"Database close error during lifespan: {e}")
+    readiness.mark_not_ready()
+    warm_up_task.cancel()
+    if replication_lag_monitor is not None:
+        replication_lag_monitor.cancel()
+    if client_cache_tracker is not None:
+        client_cache_tracker.cancel()
+    await last_login_buffer.stop()
+    await partition_maintenance.stop()
+    profile_cache_listener.cancel()
+    # Waits for the running hashes without blocking the event loop
+    await asyncio.to_thread(password_hasher.shutdown)
+
+    await disconnect_stores()
 
 
 app = FastAPI(
@@ -61,7 +141,12 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
-    return error_response(status_code=exc.status_code, message=exc.detail)
+    return error_response(status_code=exc.status_code, message=exc.detail, headers=exc.headers)
+
 
+app.add_middleware(QueryProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
+app.include_router(metrics_router)
+app.include_router(health_router)
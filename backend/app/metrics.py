@@ -0,0 +1,112 @@
+import time
+from contextvars import ContextVar
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, generate_latest
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Bucket upper bounds in seconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# The ASGI scope of the request being handled, whose "route" is set once routing is done
+_current_scope: ContextVar[Scope | None] = ContextVar("current_scope", default=None)
+
+
+def current_route() -> str:
+    """
+    Get the route template of the request being handled, for use as a metric label.
+
+    Returns:
+        str: The route template, e.g. "/api/v1/client/{client_id}/user/profile",
+        "unmatched" for a request no route matched, or "none" outside a request.
+    """
+    scope = _current_scope.get()
+    if scope is None:
+        return "none"
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or "unmatched"
+
+
+registry = CollectorRegistry()
+
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests in seconds.",
+    ("method", "route", "status"),
+    buckets=REQUEST_BUCKETS,
+    registry=registry,
+)
+db_pool_acquire_seconds = Histogram(
+    "db_pool_acquire_seconds",
+    "Time spent waiting for a PostgreSQL pool connection in seconds.",
+    ("pool", "route"),
+    buckets=QUERY_BUCKETS,
+    registry=registry,
+)
+db_query_duration_seconds = Histogram(
+    "db_query_duration_seconds",
+    "Duration of registered PostgreSQL statements in seconds.",
+    ("statement", "route"),
+    buckets=QUERY_BUCKETS,
+    registry=registry,
+)
+redis_command_duration_seconds = Histogram(
+    "redis_command_duration_seconds",
+    "Duration of Redis commands, pipelines counting as one, in seconds.",
+    ("command", "route"),
+    buckets=QUERY_BUCKETS,
+    registry=registry,
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        """
+        Initialize the ASGI middleware timing HTTP requests.
+
+        The request scope is made available to current_route() while the request is
+        handled, so that database and Redis metrics are labeled by route template.
+
+        Args:
+            app (ASGIApp): The wrapped application.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _current_scope.set(scope)
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_request_duration_seconds.labels(
+                method=scope["method"], route=current_route(), status=str(status)
+            ).observe(time.perf_counter() - started_at)
+            _current_scope.reset(token)
+
+
+metrics_router = APIRouter(tags=["Metrics"])
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """
+    Expose the metrics of this process in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: The exposition.
+    """
+    return PlainTextResponse(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,226 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from asyncpg import Connection as AsyncpgConnection
+from asyncpg.connection import LoggedQuery
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.metrics import current_route
+
+logger = logging.getLogger(__name__)
+
+# Statements every transaction runs, never reported as repeated
+TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+class RequestProfile:
+    def __init__(self):
+        """
+        Initialize the profile of one request.
+
+        Attributes:
+            queries (list[tuple[str, float]]): The PostgreSQL statements run for the request,
+                by statement name or SQL, with their duration in seconds.
+            commands (list[tuple[str, float]]): The Redis commands run for the request,
+                pipelines counting as one, with their duration in seconds.
+        """
+        self.queries: list[tuple[str, float]] = []
+        self.commands: list[tuple[str, float]] = []
+
+    @property
+    def db_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.queries)
+
+    @property
+    def redis_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.commands)
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """
+        Find the statements run at least threshold times, the usual sign of an N+1 query.
+
+        Args:
+            threshold (int): The number of runs from which a statement is reported.
+
+        Returns:
+            dict[str, int]: The number of runs by statement.
+        """
+        counts: dict[str, int] = {}
+        for statement, _ in self.queries:
+            if not statement.upper().startswith(TRANSACTION_CONTROL):
+                counts[statement] = counts.get(statement, 0) + 1
+        return {statement: count for statement, count in counts.items() if count >= threshold}
+
+    def server_timing(self, total_seconds: float) -> str:
+        """
+        Render the profile as a Server-Timing header value.
+
+        Args:
+            total_seconds (float): The time spent handling the request so far.
+
+        Returns:
+            str: The db, redis and app metrics, durations in milliseconds.
+        """
+        return ", ".join(
+            [
+                f'db;dur={self.db_seconds * 1000:.1f};desc="{len(self.queries)} queries"',
+                f'redis;dur={self.redis_seconds * 1000:.1f};desc="{len(self.commands)} commands"',
+                f"app;dur={total_seconds * 1000:.1f}",
+            ]
+        )
+
+
+_current_profile: ContextVar[RequestProfile | None] = ContextVar("current_profile", default=None)
+# Set while the statement registry runs a statement it records itself
+_recording_statement: ContextVar[bool] = ContextVar("recording_statement", default=False)
+
+
+def record_query(statement: str, seconds: float):
+    """
+    Record a PostgreSQL statement in the profile of the current request, and log it if slow.
+
+    A slow statement run outside a profiled request, e.g. by a background task, is
+    logged as background work rather than against a route.
+
+    Args:
+        statement (str): The statement name, or its SQL for unregistered statements.
+        seconds (float): The duration of the statement.
+
+    Returns:
+        None
+    """
+    profile = _current_profile.get()
+    if seconds * 1000 >= settings.PROFILER_SLOW_QUERY_MS:
+        source = f"on {current_route()}" if profile is not None else "in background work"
+        logger.warning(f"Slow query {source} took {seconds * 1000:.1f}ms: {statement}")
+    if profile is not None:
+        profile.queries.append((statement, seconds))
+
+
+def record_command(command: str, seconds: float):
+    """
+    Record a Redis command in the profile of the current request.
+
+    Args:
+        command (str): The command name, e.g. "GET", or "PIPELINE".
+        seconds (float): The duration of the command.
+
+    Returns:
+        None
+    """
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.commands.append((command, seconds))
+
+
+@contextmanager
+def recording_statement() -> Iterator[None]:
+    """
+    Keep the query logger from recording the statement run within, which the caller
+    records by name. asyncpg only logs statements it does not run prepared.
+
+    Yields:
+        None
+    """
+    token = _recording_statement.set(True)
+    try:
+        yield
+    finally:
+        _recording_statement.reset(token)
+
+
+def log_query(record: LoggedQuery):
+    """
+    Record a statement asyncpg ran outside the statement registry, e.g. a query of
+    databases or the BEGIN and COMMIT of a transaction.
+
+    asyncpg calls query loggers in a copy of the context of the task that ran the
+    statement, so the statement lands in the profile of the request that ran it.
+
+    Args:
+        record (LoggedQuery): The statement and its duration.
+
+    Returns:
+        None
+    """
+    if _recording_statement.get():
+        return
+    record_query(" ".join(record.query.split()), record.elapsed)
+
+
+async def attach_query_logger(connection: AsyncpgConnection):
+    """
+    Log the statements of a new pool connection into the request profiles.
+
+    Used as the init callback of the asyncpg pools.
+
+    Args:
+        connection (AsyncpgConnection): The new connection.
+
+    Returns:
+        None
+    """
+    connection.add_query_logger(log_query)
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, app: ASGIApp):
+        """
+        Initialize the ASGI middleware profiling the PostgreSQL and Redis work of requests.
+
+        Requests running more statements or spending more time in PostgreSQL than the
+        configured budgets are logged, as are statements repeated within one request.
+        In local development, the response carries a Server-Timing header.
+
+        Args:
+            app (ASGIApp): The wrapped application.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.PROFILER_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        started_at = time.perf_counter()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start" and settings.ENVIRONMENT == "local":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing(time.perf_counter() - started_at))
+            await send(message)
+
+        token = _current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(token)
+            self.report(scope, profile)
+
+    def report(self, scope: Scope, profile: RequestProfile):
+        """
+        Log the profile of a request that exceeded a budget or repeated a statement.
+
+        Args:
+            scope (Scope): The ASGI scope of the request.
+            profile (RequestProfile): The profile of the request.
+
+        Returns:
+            None
+        """
+        route = getattr(scope.get("route"), "path_format", None) or scope["path"]
+        request = f"{scope['method']} {route}"
+        db_ms = profile.db_seconds * 1000
+        if len(profile.queries) > settings.PROFILER_MAX_QUERIES or db_ms > settings.PROFILER_MAX_DB_MS:
+            logger.warning(
+                f"{request} ran {len(profile.queries)} queries in {db_ms:.1f}ms, over the budget of "
+                f"{settings.PROFILER_MAX_QUERIES} queries and {settings.PROFILER_MAX_DB_MS}ms"
+            )
+        for statement, count in profile.repeated(settings.PROFILER_REPEATED_QUERY_THRESHOLD).items():
+            logger.warning(f"{request} ran {statement} {count} times, possible N+1 query")
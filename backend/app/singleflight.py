@@ -0,0 +1,76 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Initialize a SingleFlight group.
+
+        Concurrent calls made with the same key share the result of a single in-flight
+        call instead of each running the work.
+
+        Attributes:
+            calls (int): The number of calls that ran the work.
+            shared (int): The number of calls that awaited another call's result.
+        """
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run func for a key, or await the in-flight call for the same key.
+
+        If the in-flight call is cancelled, the callers awaiting it are not: one of them
+        runs func in its place, and the others await that call.
+
+        Args:
+            key (Hashable): The key identifying the work.
+            func (Callable[[], Awaitable[T]]): The coroutine function doing the work.
+
+        Returns:
+            T: The result of the call, shared by every concurrent caller.
+
+        Raises:
+            Exception: Whatever the call raised, re-raised to every concurrent caller.
+        """
+        while (future := self._in_flight.get(key)) is not None:
+            self.shared += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The call was cancelled, e.g. its client went away, rather than this
+                # caller: retry, running the work unless another caller took over
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the exception as retrieved even when no other caller was waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[key] = future
+        self.calls += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> dict:
+        """
+        Return the call counters.
+
+        Returns:
+            dict: The number of calls that ran the work and that shared a result.
+        """
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._in_flight)}
@@ -0,0 +1,242 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Mapping
+
+import orjson
+from redis.exceptions import RedisError
+
+from app.cache import LRUCache
+from app.db.redis import redis_config
+from app.user.config import user_settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_KEY_PREFIX = "profile:"
+PROFILE_INVALIDATION_CHANNEL = "profile:invalidate"
+# Bumped by every invalidation of a profile, see ProfileCache.set()
+PROFILE_GENERATION_PREFIX = "profile:generation:"
+
+# Stores a profile only if its generation is still the one seen before it was read.
+# KEYS: the profile key, its generation key. ARGV: the profile, the ttl in seconds, the generation.
+# Returns 1 if the profile was stored, 0 if it was invalidated meanwhile.
+SET_IF_GENERATION_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[3] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+
+class ProfileCache:
+    def __init__(self, max_size: int, local_ttl: int, redis_ttl: int):
+        """
+        Initialize a two-tier profile cache.
+
+        Profiles are kept in an in-process TTL LRU in front of a Redis tier shared by
+        all workers, both keyed by (client_id, user_id). Invalidations delete the Redis
+        entry, bump the generation of the profile, and are broadcast over Redis pub/sub
+        so every worker drops its local copy. Profiles are returned as copies, so that a
+        caller changing one does not change the cached entry.
+        Lookups and stores do not depend on Redis being up: a Redis error is logged and
+        treated as a miss of the Redis tier, so that callers fall through to the database.
+
+        Args/Attributes:
+            max_size (int): The maximum number of profiles kept in the local tier.
+            local_ttl (int): The time to live of a local entry in seconds. This bounds
+                staleness if an invalidation message is missed.
+            redis_ttl (int): The time to live of a Redis entry in seconds.
+            local (LRUCache): The in-process tier.
+        """
+        self.local = LRUCache(max_size=max_size, ttl=local_ttl)
+        self.redis_ttl = redis_ttl
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_errors = 0
+        self.stale_sets = 0
+        self._script = None
+
+    @staticmethod
+    def key(client_id: str, user_id: str) -> str:
+        """
+        Build the cache key of a profile.
+
+        Args:
+            client_id (str): The client_id of the profile.
+            user_id (str): The user_id of the profile.
+
+        Returns:
+            str: The cache key.
+        """
+        return f"{client_id}:{user_id}"
+
+    async def get(self, client_id: str, user_id: str, load: Callable[[], Awaitable[Mapping | None]]) -> dict | None:
+        """
+        Look up a profile in the local tier, then in Redis, then load it from the database.
+
+        A Redis hit is copied into the local tier. A loaded profile is stored in both tiers,
+        unless the profile was invalidated while it was being loaded: the generation of the
+        profile is read with the Redis lookup, and the store only succeeds if it is unchanged,
+        so a row read before an invalidation is never cached after it.
+
+        Args:
+            client_id (str): The client_id of the profile.
+            user_id (str): The user_id of the profile.
+            load (Callable[[], Awaitable[Mapping | None]]): Reads the profile record from the
+                database, or returns None if it does not exist.
+
+        Returns:
+            dict | None: A copy of the profile, or None if it does not exist.
+        """
+        key = self.key(client_id, user_id)
+        profile = self.local.get(key)
+        if profile is not None:
+            return dict(profile)
+
+        generation = None
+        try:
+            cached, generation = await redis_config.redis_client.mget(
+                [PROFILE_KEY_PREFIX + key, PROFILE_GENERATION_PREFIX + key]
+            )
+        except RedisError as e:
+            logger.warning(f"Profile cache lookup failed, reading from the database: {e}")
+            self.redis_errors += 1
+            cached = None
+        else:
+            if cached is not None:
+                self.redis_hits += 1
+                profile = orjson.loads(cached)
+                self.local.set(key, profile)
+                return dict(profile)
+            self.redis_misses += 1
+
+        record = await load()
+        if record is None:
+            return None
+        return await self.set(client_id, user_id, record, generation or "0")
+
+    async def set(self, client_id: str, user_id: str, record: Mapping, generation: str) -> dict:
+        """
+        Store a profile record in both tiers if it was not invalidated since it was read.
+
+        If Redis cannot be written, the profile is still kept in the local tier.
+
+        Args:
+            client_id (str): The client_id of the profile.
+            user_id (str): The user_id of the profile.
+            record (Mapping): The profile record fetched from the database.
+            generation (str): The generation of the profile before the record was read,
+                "0" if it had none.
+
+        Returns:
+            dict: A copy of the profile as it is served from the cache.
+        """
+        key = self.key(client_id, user_id)
+        serialized = orjson.dumps(dict(record))
+        profile = orjson.loads(serialized)
+
+        if self._script is None or self._script.registered_client is not redis_config.redis_client:
+            self._script = redis_config.redis_client.register_script(SET_IF_GENERATION_SCRIPT)
+        try:
+            stored = await self._script(
+                keys=[PROFILE_KEY_PREFIX + key, PROFILE_GENERATION_PREFIX + key],
+                args=[serialized, self.redis_ttl, generation],
+            )
+        except RedisError as e:
+            logger.warning(f"Profile cache store failed: {e}")
+            self.redis_errors += 1
+            stored = True
+        if stored:
+            self.local.set(key, profile)
+        else:
+            self.stale_sets += 1
+        return dict(profile)
+
+    async def invalidate(self, client_id: str, user_id: str):
+        """
+        Drop a profile from both tiers on every worker.
+
+        Args:
+            client_id (str): The client_id of the profile.
+            user_id (str): The user_id of the profile.
+
+        Returns:
+            None
+        """
+        await self.invalidate_many([(client_id, user_id)])
+
+    async def invalidate_many(self, keys: list[tuple[str, str]]):
+        """
+        Drop several profiles from both tiers on every worker in one round trip.
+
+        The generation of every profile is bumped first, so that a profile read before the
+        invalidation and stored after it is rejected.
+
+        Args:
+            keys (list[tuple[str, str]]): The (client_id, user_id) pairs of the profiles.
+
+        Returns:
+            None
+        """
+        if not keys:
+            return
+
+        async with redis_config.redis_client.pipeline(transaction=False) as pipe:
+            for client_id, user_id in keys:
+                key = self.key(client_id, user_id)
+                self.local.delete(key)
+                pipe.incr(PROFILE_GENERATION_PREFIX + key)
+                pipe.expire(PROFILE_GENERATION_PREFIX + key, self.redis_ttl)
+                pipe.delete(PROFILE_KEY_PREFIX + key)
+                pipe.publish(PROFILE_INVALIDATION_CHANNEL, key)
+            await pipe.execute()
+
+    async def listen(self):
+        """
+        Apply invalidations published by other workers to the local tier.
+
+        This coroutine runs until cancelled. If the subscription drops, the local tier
+        is cleared, since messages may have been missed, and the subscription is retried.
+
+        Returns:
+            None
+        """
+        while True:
+            pubsub = redis_config.pubsub()
+            try:
+                await pubsub.subscribe(PROFILE_INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.local.delete(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Profile cache invalidation listener error: {e}")
+                self.local.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def stats(self) -> dict:
+        """
+        Return the hit/miss counters of both tiers.
+
+        Returns:
+            dict: The cache counters.
+        """
+        return {
+            "local": self.local.stats(),
+            "redis": {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "errors": self.redis_errors,
+                "stale_sets": self.stale_sets,
+            },
+        }
+
+
+profile_cache = ProfileCache(
+    max_size=user_settings.PROFILE_CACHE_SIZE,
+    local_ttl=user_settings.PROFILE_CACHE_LOCAL_TTL,
+    redis_ttl=user_settings.PROFILE_CACHE_REDIS_TTL,
+)
@@ -0,0 +1,15 @@
+from app.config import BaseSettings
+
+
+class UserConfig(BaseSettings):
+    # Profile cache settings
+    PROFILE_CACHE_SIZE: int = 10_000
+    PROFILE_CACHE_LOCAL_TTL: int = 30  # 30 secs
+    PROFILE_CACHE_REDIS_TTL: int = 60 * 10  # 10 mins
+
+    # Write-behind last_login_at settings
+    LAST_LOGIN_FLUSH_INTERVAL_MS: int = 1000  # 1 sec
+    LAST_LOGIN_MAX_BATCH_SIZE: int = 500
+
+
+user_settings = UserConfig()
@@ -1,20 +1,42 @@
 from typing import Annotated
 
-import jwt
 from databases import Database
-from databases.backends.postgres import Record
 from fastapi import Depends
 from jwt.exceptions import InvalidTokenError
+from sqlalchemy import bindparam, select
 
-from app.auth.config import auth_settings
 from app.auth.deps import AccessDep
-from app.db.deps import SimpleDbDep
+from app.auth.utils import decode_access_token
+from app.db.deps import StatementReadDbDep
+from app.db.queries import columns, compile_query, row_class
+from app.db.statements import statements
+from app.user.cache import profile_cache
 from app.user.exceptions import UserNotAuthenticated
+from app.user.models import Profile
+from app.user.schemas import ProfileOut
+
+# Profiles are only ever served as ProfileOut, so only its columns are read
+ProfileRow = row_class("ProfileRow", Profile, ProfileOut)
+
+statements.register(
+    "get_profile",
+    compile_query(
+        select(*columns(Profile, ProfileOut)).where(
+            Profile.c.client_id == bindparam("client_id"), Profile.c.user_id == bindparam("user_id")
+        )
+    ),
+    ProfileRow,
+)
 
 
 async def get_profile_by_id(db: Database, client_id: str, user_id: str):
     """
-    Fetches a profile record from the database using the given client_id and user_id.
+    Fetches a profile using the given client_id and user_id.
+
+    The profile is served from the profile cache when possible and only read from
+    the database on a miss in both cache tiers. The miss may be read from a replica:
+    writes to a profile, such as a last login flush, mark its user as having written,
+    so that the user's reads go to the primary until the replicas have the write.
 
     Args:
         db (Database): The database connection.
@@ -22,13 +44,16 @@ async def get_profile_by_id(db: Database, client_id: str, user_id: str):
         user_id (str): The user_id of the profile.
 
     Returns:
-        Record: The fetched profile record.
+        dict | None: The fetched profile, or None if it does not exist.
     """
-    query = "SELECT * FROM profiles WHERE client_id = :client_id AND user_id = :user_id"
-    return await db.fetch_one(query=query, values={"client_id": client_id, "user_id": user_id})
+    return await profile_cache.get(
+        client_id,
+        user_id,
+        lambda: statements.fetch_one(db, "get_profile", {"client_id": client_id, "user_id": user_id}),
+    )
 
 
-async def get_current_profile(db: SimpleDbDep, token: AccessDep, client_id: str):
+async def get_current_profile(db: StatementReadDbDep, token: AccessDep, client_id: str):
     """
     Retrieve the current user's profile from the database.
 
@@ -38,12 +63,12 @@ async def get_current_profile(db: SimpleDbDep, token: AccessDep, client_id: str)
     a UserNotAuthenticated exception.
 
     Args:
-        db (SimpleDbDep): The database dependency for executing queries.
+        db (StatementReadDbDep): The database dependency for executing queries.
         token (AccessDep): The access token dependency containing the JWT.
         client_id (str): The expected client_id to validate against the token.
 
     Returns:
-        Record: The user's profile record from the database.
+        dict: The user's profile.
 
     Raises:
         UserNotAuthenticated: If the token is invalid, the client_id does not match,
@@ -52,11 +77,7 @@ async def get_current_profile(db: SimpleDbDep, token: AccessDep, client_id: str)
 
     try:
         access_token = token.get("access_token")
-        payload = jwt.decode(
-            access_token,
-            auth_settings.ACCESS_SECRET_KEY,
-            algorithms=[auth_settings.ALGORITHM],
-        )
+        payload = decode_access_token(access_token)
         payload_client_id = payload.get("client_id")
         payload_user_id = payload.get("user_id")
     except InvalidTokenError:
@@ -69,4 +90,4 @@ async def get_current_profile(db: SimpleDbDep, token: AccessDep, client_id: str)
     return profile
 
 
-ProfileDep = Annotated[Record, Depends(get_current_profile)]
+ProfileDep = Annotated[dict, Depends(get_current_profile)]
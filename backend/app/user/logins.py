@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from app.db.consistency import mark_written_many
+from app.db.postgresql import postgresql_config
+from app.db.redis import redis_config
+from app.db.statements import statements
+from app.user.cache import profile_cache
+from app.user.config import user_settings
+
+logger = logging.getLogger(__name__)
+
+statements.register(
+    "update_last_login",
+    """UPDATE profiles AS p SET last_login_at = v.last_login_at
+    FROM unnest(CAST(:client_ids AS uuid[]), CAST(:user_ids AS uuid[]), CAST(:last_login_ats AS timestamptz[]))
+        AS v (client_id, user_id, last_login_at)
+    WHERE p.client_id = v.client_id AND p.user_id = v.user_id
+    AND (p.last_login_at IS NULL OR p.last_login_at < v.last_login_at)""",
+)
+
+
+class LastLoginBuffer:
+    def __init__(self, flush_interval_ms: int, max_batch_size: int):
+        """
+        Initialize a write-behind buffer for profile last_login_at updates.
+
+        Logins record their timestamp here instead of updating the profile row inside
+        the login transaction. A background task flushes the buffer every interval as
+        one UPDATE ... FROM unnest(...) per batch. Batches are passed as arrays, so the
+        statement is the same whatever the batch size and is prepared only once.
+
+        Args/Attributes:
+            flush_interval_ms (int): The time between two flushes in milliseconds.
+            max_batch_size (int): The maximum number of profiles updated by one statement.
+            flushed (int): The number of profile updates written.
+            failed_flushes (int): The number of flushes that failed and were retried later.
+        """
+        self.flush_interval_ms = flush_interval_ms
+        self.max_batch_size = max_batch_size
+        self._pending: dict[tuple[str, str], datetime] = {}
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+        self.flushed = 0
+        self.failed_flushes = 0
+
+    def record(self, client_id: str, user_id: str, last_login_at: datetime):
+        """
+        Record a login to be written on the next flush.
+
+        Only the latest timestamp of a profile is kept.
+
+        Args:
+            client_id (str): The ID of the client associated with the profile.
+            user_id (str): The ID of the user associated with the profile.
+            last_login_at (datetime): The login time.
+
+        Returns:
+            None
+        """
+        key = (str(client_id), str(user_id))
+        pending = self._pending.get(key)
+        if pending is None or pending < last_login_at:
+            self._pending[key] = last_login_at
+
+    @staticmethod
+    def build_values(batch: list[tuple[tuple[str, str], datetime]]) -> dict:
+        """
+        Build the values of the statement updating a batch of profiles.
+
+        Args:
+            batch (list[tuple[tuple[str, str], datetime]]): The ((client_id, user_id), last_login_at) items.
+
+        Returns:
+            dict: The client IDs, user IDs and login times as parallel arrays.
+        """
+        return {
+            "client_ids": [client_id for (client_id, _), _ in batch],
+            "user_ids": [user_id for (_, user_id), _ in batch],
+            "last_login_ats": [last_login_at for _, last_login_at in batch],
+        }
+
+    async def flush(self):
+        """
+        Write every pending login to the database.
+
+        Batches that fail are put back in the buffer, unless a newer login of the same
+        profile was recorded meanwhile, and are retried on the next flush. If the flush is
+        cancelled, the batch in flight and those after it are put back the same way:
+        writing a login twice is harmless.
+
+        Returns:
+            None
+        """
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        items = list(pending.items())
+
+        for start in range(0, len(items), self.max_batch_size):
+            batch = items[start : start + self.max_batch_size]
+            try:
+                await statements.execute(postgresql_config.db_pool, "update_last_login", self.build_values(batch))
+            except asyncio.CancelledError:
+                for (client_id, user_id), last_login_at in items[start:]:
+                    self.record(client_id, user_id, last_login_at)
+                raise
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} last login updates: {e}")
+                self.failed_flushes += 1
+                for (client_id, user_id), last_login_at in batch:
+                    self.record(client_id, user_id, last_login_at)
+                continue
+
+            self.flushed += len(batch)
+            # The users read their profile from the primary until the replicas have the
+            # update, so that a read of a lagging replica does not cache the old row again
+            await mark_written_many(redis_config.redis_client, [user_id for (_, user_id), _ in batch])
+            try:
+                await profile_cache.invalidate_many([key for key, _ in batch])
+            except Exception as e:
+                logger.warning(f"Failed to invalidate profiles after last login flush: {e}")
+
+    async def _run(self):
+        """
+        Flush the buffer every interval until stop() is called.
+
+        Returns:
+            None
+        """
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def start(self):
+        """
+        Start the background flush task.
+
+        Returns:
+            None
+        """
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the background flush task and write whatever is still pending.
+
+        The task is not cancelled but asked to exit, so that a flush in progress
+        completes rather than losing the logins it took from the buffer.
+
+        Returns:
+            None
+        """
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        """
+        Return the buffer counters.
+
+        Returns:
+            dict: The number of pending, flushed and failed updates.
+        """
+        return {"pending": len(self._pending), "flushed": self.flushed, "failed_flushes": self.failed_flushes}
+
+
+last_login_buffer = LastLoginBuffer(
+    flush_interval_ms=user_settings.LAST_LOGIN_FLUSH_INTERVAL_MS,
+    max_batch_size=user_settings.LAST_LOGIN_MAX_BATCH_SIZE,
+)
@@ -1,17 +1,105 @@
+from datetime import datetime, timezone
+
+from asyncpg.exceptions import ForeignKeyViolationError
 from databases import Database
-from databases.backends.postgres import Record
 from pydantic import EmailStr
+from sqlalchemy import bindparam, func, insert, literal_column, or_, select
 
-from app.auth.utils import get_password_hash, verify_password
+from app.auth.hashing import password_hasher
+from app.db.queries import column_list, columns, compile_query, row_class
+from app.db.statements import Row, statements
+from app.user.deps import ProfileRow, get_profile_by_id
 from app.user.exceptions import UserBadRequest, UserNotAuthenticated
+from app.user.logins import last_login_buffer
+from app.user.models import Profile, User
+from app.user.schemas import ProfileOut
 from app.user.utils import check_username_email_exists
 
+# Authentication only needs the password hash and what the tokens are issued for
+UserAuthRow = row_class("UserAuthRow", User, ("id", "hashed_password", "current_client_id"))
+# A created user is returned without its password hash
+UserRow = row_class(
+    "UserRow", User, ("id", "username", "email", "is_admin", "current_client_id", "created_at", "updated_at")
+)
+
+statements.register(
+    "get_user",
+    compile_query(
+        select(*columns(User, UserAuthRow.fields)).where(
+            or_(User.c.username == bindparam("username"), User.c.email == bindparam("username"))
+        )
+    ),
+    UserAuthRow,
+)
+statements.register(
+    "create_user",
+    compile_query(
+        insert(User)
+        .values(
+            username=bindparam("username"),
+            email=bindparam("email"),
+            hashed_password=bindparam("hashed_password"),
+            is_admin=bindparam("is_admin"),
+        )
+        .returning(*columns(User, UserRow.fields))
+    ),
+    UserRow,
+)
+statements.register(
+    "create_user_with_profile",
+    f"""WITH new_client AS (
+        INSERT INTO clients (name)
+        SELECT CAST(:client_name AS varchar) WHERE CAST(:client_id AS uuid) IS NULL
+        RETURNING id
+    ), target_client AS (
+        SELECT id FROM new_client
+        UNION ALL
+        SELECT CAST(:client_id AS uuid) WHERE CAST(:client_id AS uuid) IS NOT NULL
+    ), new_user AS (
+        INSERT INTO users (username, email, hashed_password, is_admin, current_client_id)
+        SELECT CAST(:username AS varchar), CAST(:email AS varchar), CAST(:hashed_password AS varchar),
+            CAST(:is_admin AS boolean), id
+        FROM target_client
+        ON CONFLICT DO NOTHING
+        RETURNING id, username, current_client_id
+    ), new_profile AS (
+        INSERT INTO profiles (client_id, user_id, full_name, is_client_owner, last_login_at, status)
+        SELECT current_client_id, id, username, TRUE, NOW(), 'active' FROM new_user
+        RETURNING {column_list(Profile, ProfileOut)}
+    ), conflicts AS (
+        SELECT EXISTS (SELECT 1 FROM users WHERE username = CAST(:username AS varchar)) AS username_exists,
+            EXISTS (SELECT 1 FROM users WHERE email = CAST(:email AS varchar)) AS email_exists
+    )
+    SELECT conflicts.username_exists, conflicts.email_exists, new_profile.*
+    FROM conflicts LEFT JOIN new_profile ON TRUE""",
+)
+statements.register(
+    "update_user_password_hash", "UPDATE users SET hashed_password = :hashed_password WHERE id = :user_id"
+)
+statements.register("update_user_current_client", "UPDATE users SET current_client_id = :client_id WHERE id = :user_id")
+statements.register(
+    "create_profile",
+    compile_query(
+        insert(Profile)
+        .values(
+            client_id=bindparam("client_id"),
+            user_id=bindparam("user_id"),
+            full_name=bindparam("full_name"),
+            is_client_owner=bindparam("is_client_owner"),
+            last_login_at=func.now(),
+            status=literal_column("'active'"),
+        )
+        .returning(*columns(Profile, ProfileOut))
+    ),
+    ProfileRow,
+)
+
 
 class UserService:
     def __init__(self, db: Database):
         self.db = db
 
-    async def get_user(self, username: str) -> Record:
+    async def get_user(self, username: str) -> Row:
         """
         Retrieves a user by username or email.
 
@@ -19,38 +107,47 @@ class UserService:
             username (str): The username or email of the user to retrieve.
 
         Returns:
-            Record: The user record if found, otherwise None.
+            Row: The user record if found, otherwise None.
         """
-        query = "SELECT * FROM users WHERE username = :username OR email = :username"
-        return await self.db.fetch_one(query=query, values={"username": username})
+        return await statements.fetch_one(self.db, "get_user", {"username": username})
 
-    async def authenticate_user(self, username: str, password: str) -> Record:
+    async def authenticate_user(self, username: str, password: str) -> Row:
         """
         Authenticates a user by verifying their username and password.
 
+        If the stored hash was created with a different bcrypt work factor than the
+        current one, the password is hashed again and written back through the same
+        database connection, i.e. within the login transaction.
+
         Args:
             username (str): The username or email of the user to authenticate.
             password (str): The password of the user to authenticate.
 
         Returns:
-            Record: The user record if authenticated, otherwise raises UserNotAuthenticated.
+            Row: The user record if authenticated, otherwise raises UserNotAuthenticated.
 
         Raises:
             UserNotAuthenticated: If the username or password is invalid.
         """
         user = await self.get_user(username)
-        if user is None or not verify_password(password, user.hashed_password):
+        if user is None or not await password_hasher.verify(password, user.hashed_password):
             raise UserNotAuthenticated(detail="Incorrect username or password")
+
+        # Bring the stored hash to the current work factor while the password is at hand
+        if password_hasher.needs_rehash(user.hashed_password):
+            hashed_password = await password_hasher.hash(password)
+            await self.update_user_password_hash(user.id, hashed_password)
+            password_hasher.rehashed += 1
         return user
 
-    async def check_users_field_exists(self, field: str, value: str, user: Record | None = None) -> bool:
+    async def check_users_field_exists(self, field: str, value: str, user: Row | None = None) -> bool:
         """
         Checks if a given field exists in the users table.
 
         Args:
             field (str): The field to check for existence.
             value (str): The value of the field to check.
-            user (Record | None): The user record to exclude from the check.
+            user (Row | None): The user record to exclude from the check.
 
         Returns:
             bool: True if the field exists, otherwise False.
@@ -58,7 +155,7 @@ class UserService:
         if user and user.get(field) == value:
             return False
 
-        query = f"SELECT * FROM users WHERE {field} = :{field}"
+        query = f"SELECT id FROM users WHERE {field} = :{field}"
         existing_field = await self.db.fetch_one(query=query, values={field: value})
 
         return existing_field
@@ -69,7 +166,7 @@ class UserService:
         email: EmailStr,
         password: str,
         is_admin: bool | None = False,
-    ) -> Record:
+    ) -> Row:
         """
         Creates a new user in the database.
 
@@ -80,29 +177,109 @@ class UserService:
             is_admin (bool | None): Whether the user is an admin or not.
 
         Returns:
-            Record: The created user record.
+            Row: The created user record.
 
         Raises:
             UserBadRequest: If the user could not be created due to a bad request.
         """
         await check_username_email_exists(self.db, username, email)
 
-        query = """INSERT INTO users (username, email, hashed_password, is_admin)
-                VALUES (:username, :email, :hashed_password, :is_admin) RETURNING *"""
-
         try:
-            hashed_password = get_password_hash(password)
+            hashed_password = await password_hasher.hash(password)
             values = {
                 "username": username,
                 "email": email,
                 "hashed_password": hashed_password,
                 "is_admin": is_admin,
             }
-            created_user = await self.db.fetch_one(query=query, values=values)
+            created_user = await statements.fetch_one(self.db, "create_user", values)
             return created_user
         except Exception as e:
             raise UserBadRequest(detail=f"Failed to create user: {str(e)}")
 
+    async def create_user_with_profile(
+        self,
+        username: str,
+        email: EmailStr,
+        password: str,
+        client_name: str | None,
+        client_id: str | None,
+        is_admin: bool | None = False,
+    ) -> dict:
+        """
+        Creates a user, its client if needed, and its client owner profile in one statement.
+
+        A single data-modifying CTE creates the client when no client ID is given, inserts
+        the user with that client as its current client, and inserts the profile. Username
+        and email uniqueness is enforced by the users unique constraints through
+        ON CONFLICT DO NOTHING. When the user row is not inserted, the same statement
+        reports which of the username and email already existed.
+
+        Args:
+            username (str): The username of the new user.
+            email (EmailStr): The email address of the new user.
+            password (str): The password of the new user.
+            client_name (str | None): The name of the client to create if no client ID is provided.
+            client_id (str | None): The ID of an existing client to join.
+            is_admin (bool | None): Whether the user is an admin or not.
+
+        Returns:
+            dict: The created profile.
+
+        Raises:
+            UserBadRequest: If the username or email already exists, the client does not exist,
+            or the user could not be created due to a bad request.
+        """
+
+        hashed_password = await password_hasher.hash(password)
+        values = {
+            "username": username,
+            "email": email,
+            "hashed_password": hashed_password,
+            "is_admin": is_admin,
+            "client_name": client_name,
+            "client_id": str(client_id) if client_id is not None else None,
+        }
+        try:
+            result = await statements.fetch_one(self.db, "create_user_with_profile", values)
+        except ForeignKeyViolationError:
+            raise UserBadRequest(detail=[{"client_id": "Client does not exist."}])
+        except Exception as e:
+            raise UserBadRequest(detail=f"Failed to create user: {str(e)}")
+
+        profile = dict(result)
+        username_exists = profile.pop("username_exists")
+        email_exists = profile.pop("email_exists")
+        if profile["user_id"] is None:
+            errors = []
+            if username_exists:
+                errors.append({"username": "Username already exists."})
+            if email_exists:
+                errors.append({"email": "Email already exists."})
+            raise UserBadRequest(detail=errors or "Username or email already exists.")
+
+        return profile
+
+    async def update_user_password_hash(self, user_id: str, hashed_password: str):
+        """
+        Replaces a user's stored password hash.
+
+        Args:
+            user_id (str): The id of the user to update.
+            hashed_password (str): The new hashed password.
+
+        Raises:
+            UserBadRequest: If the password hash could not be updated due to a bad request.
+        """
+        try:
+            values = {
+                "user_id": user_id,
+                "hashed_password": hashed_password,
+            }
+            await statements.execute(self.db, "update_user_password_hash", values)
+        except Exception as e:
+            raise UserBadRequest(detail=f"Failed to update password hash: {str(e)}")
+
     async def update_user_current_client(self, user_id: str, client_id: str):
         """
         Updates a user's current_client_id in the database.
@@ -115,13 +292,12 @@ class UserService:
             UserBadRequest: If the client could not be updated due to a bad request.
         """
 
-        query = """UPDATE users SET current_client_id = :client_id WHERE id = :user_id"""
         try:
             values = {
                 "user_id": user_id,
                 "client_id": client_id,
             }
-            await self.db.execute(query=query, values=values)
+            await statements.execute(self.db, "update_user_current_client", values)
         except Exception as e:
             raise UserBadRequest(detail=f"Failed to update current client: {str(e)}")
 
@@ -131,7 +307,7 @@ class UserService:
         user_id: str,
         full_name: str,
         is_client_owner: bool = False,
-    ) -> Record:
+    ) -> Row:
         """
         Creates a new profile in the database for a user with the specified client ID.
 
@@ -146,14 +322,12 @@ class UserService:
             is_client_owner (bool, optional): Indicates if the user is the client owner. Defaults to False.
 
         Returns:
-            Record: The newly created profile record.
+            Row: The newly created profile record.
 
         Raises:
             UserBadRequest: If the profile creation fails due to a database error.
         """
 
-        query = """INSERT INTO profiles (client_id, user_id, full_name, is_client_owner, last_login_at, status) VALUES
-        (:client_id, :user_id,:full_name, :is_client_owner, NOW(), 'active') RETURNING *"""
         try:
             values = {
                 "client_id": client_id,
@@ -161,31 +335,34 @@ class UserService:
                 "full_name": full_name,
                 "is_client_owner": is_client_owner,
             }
-            return await self.db.fetch_one(query=query, values=values)
+            profile = await statements.fetch_one(self.db, "create_profile", values)
         except Exception as e:
             raise UserBadRequest(detail=f"Failed to create user: {str(e)}")
 
-    async def update_profile_login(self, client_id: str, user_id: str):
+        return profile
+
+    async def update_profile_login(self, client_id: str, user_id: str) -> dict:
         """
-        Updates the last login time for a profile with the specified client ID and user ID.
+        Records a login for the profile with the specified client ID and user ID.
+
+        The last login time is written behind by the last login buffer, so the login
+        does not wait on the profile row update. The returned profile already carries
+        the new last login time.
 
         Args:
             client_id (str): The ID of the client associated with the profile.
             user_id (str): The ID of the user associated with the profile.
 
         Returns:
-            Record: The updated profile record.
+            dict: The profile with its updated last login time.
 
         Raises:
-            UserBadRequest: If the profile update fails due to a database error.
+            UserBadRequest: If the profile does not exist.
         """
-        query = """UPDATE profiles SET last_login_at = NOW() WHERE client_id = :client_id AND
-        user_id = :user_id RETURNING *"""
-        try:
-            values = {
-                "client_id": client_id,
-                "user_id": user_id,
-            }
-            return await self.db.fetch_one(query=query, values=values)
-        except Exception as e:
-            raise UserBadRequest(detail=f"Failed to update profile login: {str(e)}")
+        last_login_at = datetime.now(timezone.utc)
+        profile = await get_profile_by_id(self.db, str(client_id), str(user_id))
+        if profile is None:
+            raise UserBadRequest(detail="Failed to update profile login: profile not found")
+
+        last_login_buffer.record(client_id, user_id, last_login_at)
+        return {**profile, "last_login_at": last_login_at}
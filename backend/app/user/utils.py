@@ -2,14 +2,17 @@ from databases import Database
 from databases.backends.postgres import Record
 from pydantic import EmailStr
 
-from app.auth.utils import verify_password
-from app.user.exceptions import UserBadRequest, UserNotAuthenticated
+from app.user.exceptions import UserBadRequest
 
 
 async def authenticate_user(db: Database, username: str, password: str) -> Record | None:
     """
     Authenticates a user by verifying their username and password.
 
+    This is UserService.authenticate_user on the given connection, so that the hash of a
+    user is brought to the current work factor, and written back within the login
+    transaction, the same way on every login path.
+
     Args:
         db (Database): The database connection used to retrieve user data.
         username (str): The username or email of the user to authenticate.
@@ -24,11 +27,7 @@ async def authenticate_user(db: Database, username: str, password: str) -> Recor
 
     from app.user.services import UserService
 
-    user_service = UserService(db)
-    user = await user_service.get_user(username)
-    if user is None or not verify_password(password, user.hashed_password):
-        raise UserNotAuthenticated(detail="Incorrect username or password")
-    return user
+    return await UserService(db).authenticate_user(username, password)
 
 
 async def check_users_field_exists(db: Database, field: str, value: str, user: Record | None = None) -> bool:
@@ -15,8 +15,8 @@ def final_response(
 
 
 # Used for error responses
-def error_response(status_code: int, message: str | list | None = None):
-    return ORJSONResponse(content=final_response(status_code, message), status_code=status_code)
+def error_response(status_code: int, message: str | list | None = None, headers: dict[str, str] | None = None):
+    return ORJSONResponse(content=final_response(status_code, message), status_code=status_code, headers=headers)
 
 
 # Used for Swagger docs
@@ -0,0 +1,331 @@
+"""
+Auth path microbenchmarks.
+
+Drives /auth/register, /auth/login and the refresh branch of CookieJWTAuth through
+the real FastAPI app, with in-memory stand-ins for PostgreSQL and Redis, and reports
+requests/sec, latency percentiles and per-stage timings (bcrypt, jwt, db, redis).
+
+Usage:
+    uv run python -m benchmarks.auth --requests 200 --concurrency 20
+    uv run python -m benchmarks.auth --baseline benchmarks/results/auth-<commit>.json
+
+Results are written as JSON to benchmarks/results/auth-<commit>.json by default, so
+runs on two commits can be compared with --baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+
+from app.auth.hashing import password_hasher
+from app.auth.throttle import login_throttle
+from app.auth.utils import access_token_cache
+from app.config import settings
+from app.db.postgresql import postgresql_config
+from app.db.redis import redis_config
+from app.main import app
+from app.user.cache import profile_cache
+from app.user.logins import last_login_buffer
+from benchmarks.fakes import FakeDatabase, FakeRedis
+from benchmarks.stages import StageTimer, instrument
+
+RESULTS_DIR = Path(__file__).parent / "results"
+PASSWORD = "benchmark-password"
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """
+    Return the nearest-rank percentile of sorted values.
+
+    Args:
+        sorted_values (list[float]): The values, in ascending order.
+        p (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile value, or 0.0 if there are no values.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_scenario(
+    timer: StageTimer,
+    requests: list[Callable[[], Awaitable[httpx.Response]]],
+    expected_status: int,
+    concurrency: int,
+) -> tuple[dict, list[httpx.Response]]:
+    """
+    Send requests with a fixed number of concurrent clients and measure them.
+
+    Args:
+        timer (StageTimer): The stage timer, reset before the first request.
+        requests (list[Callable[[], Awaitable[httpx.Response]]]): The requests to send.
+        expected_status (int): The status code of a successful response.
+        concurrency (int): The number of requests in flight at once.
+
+    Returns:
+        tuple[dict, list[httpx.Response]]: The scenario results and the responses, in request order.
+    """
+    latencies: list[float] = []
+    responses: list[httpx.Response | None] = [None] * len(requests)
+    pending = iter(enumerate(requests))
+
+    async def client():
+        for i, send in pending:
+            started_at = time.perf_counter()
+            responses[i] = await send()
+            latencies.append(time.perf_counter() - started_at)
+
+    timer.reset()
+    started_at = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+
+    latencies.sort()
+    errors = sum(response.status_code != expected_status for response in responses)
+    result = {
+        "requests": len(requests),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(requests) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+        "stages": timer.summary(len(requests)),
+    }
+    return result, responses
+
+
+async def run_benchmark(
+    requests: int,
+    concurrency: int,
+    bcrypt_rounds: int,
+    db_latency_ms: float = 0.0,
+    redis_latency_ms: float = 0.0,
+) -> dict:
+    """
+    Run the register, login and refresh scenarios against the app.
+
+    The app's PostgreSQL pool and Redis client are replaced by the stand-ins for the
+    duration of the run and restored afterwards. The login throttle is lifted since
+    every request comes from the same client address.
+
+    Args:
+        requests (int): The number of requests per scenario.
+        concurrency (int): The number of requests in flight at once.
+        bcrypt_rounds (int): The bcrypt work factor passwords are hashed with.
+        db_latency_ms (float): The simulated latency of a PostgreSQL round trip.
+        redis_latency_ms (float): The simulated latency of a Redis round trip.
+
+    Returns:
+        dict: The results of every scenario.
+    """
+    timer = StageTimer()
+    db = FakeDatabase(timer, latency_ms=db_latency_ms)
+    redis = FakeRedis(timer, latency_ms=redis_latency_ms)
+
+    saved = (
+        postgresql_config.db_pool,
+        redis_config.redis_client,
+        password_hasher.rounds,
+        login_throttle.max_attempts_per_username,
+        login_throttle.max_attempts_per_ip,
+    )
+    postgresql_config.db_pool = db
+    redis_config.redis_client = redis
+    password_hasher.rounds = bcrypt_rounds
+    login_throttle.max_attempts_per_username = sys.maxsize
+    login_throttle.max_attempts_per_ip = sys.maxsize
+    access_token_cache.clear()
+    profile_cache.local.clear()
+
+    password_hasher.start()
+    last_login_buffer.start()
+    # Cookies are read from each response and sent explicitly, never kept by the client
+    cookies = httpx.Cookies(CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])))
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="https://bench", cookies=cookies) as client:
+            with instrument(timer, password_hasher):
+                results = {}
+
+                users = [(f"bench{i}", f"bench{i}@example.com") for i in range(requests)]
+                results["register"], _ = await run_scenario(
+                    timer,
+                    [
+                        lambda username=username, email=email: client.post(
+                            f"{settings.API_V1_STR}/auth/register",
+                            json={
+                                "username": username,
+                                "email": email,
+                                "password": PASSWORD,
+                                "client_name": "Benchmark",
+                                "client_id": None,
+                            },
+                        )
+                        for username, email in users
+                    ],
+                    201,
+                    concurrency,
+                )
+
+                results["login"], responses = await run_scenario(
+                    timer,
+                    [
+                        lambda username=username: client.post(
+                            f"{settings.API_V1_STR}/auth/login",
+                            json={"username": username, "password": PASSWORD},
+                        )
+                        for username, _ in users
+                    ],
+                    200,
+                    concurrency,
+                )
+
+                sessions = [
+                    (response.json()["data"]["client_id"], response.cookies["refresh_token"])
+                    for response in responses
+                    if response.status_code == 200
+                ]
+                results["refresh"], _ = await run_scenario(
+                    timer,
+                    [
+                        lambda client_id=client_id, refresh_token=refresh_token: client.get(
+                            f"{settings.API_V1_STR}/client/{client_id}/user/profile",
+                            headers={"Cookie": f"refresh_token={refresh_token}"},
+                        )
+                        for client_id, refresh_token in sessions
+                    ],
+                    200,
+                    concurrency,
+                )
+    finally:
+        await last_login_buffer.stop()
+        password_hasher.shutdown()
+        (
+            postgresql_config.db_pool,
+            redis_config.redis_client,
+            password_hasher.rounds,
+            login_throttle.max_attempts_per_username,
+            login_throttle.max_attempts_per_ip,
+        ) = saved
+
+    return results
+
+
+def git_commit() -> str | None:
+    """
+    Return the commit the benchmark runs on, or None outside a git checkout.
+
+    Returns:
+        str | None: The abbreviated commit hash, suffixed with "-dirty" if the tree has changes.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "app"], capture_output=True, text=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty.strip() else commit
+
+
+def compare(results: dict, baseline: dict) -> str:
+    """
+    Format the change of every scenario's throughput and latency against a baseline run.
+
+    Args:
+        results (dict): The results of this run.
+        baseline (dict): The results of the baseline run.
+
+    Returns:
+        str: One line per scenario present in both runs.
+    """
+    lines = [f"compared with {baseline['meta'].get('commit')}:"]
+    for name, result in results["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        changes = []
+        for label, now, then in [
+            ("req/s", result["requests_per_second"], before["requests_per_second"]),
+            ("p50", result["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+            ("p95", result["latency_ms"]["p95"], before["latency_ms"]["p95"]),
+            ("p99", result["latency_ms"]["p99"], before["latency_ms"]["p99"]),
+        ]:
+            change = (now - then) / then * 100 if then else 0.0
+            changes.append(f"{label} {then} -> {now} ({change:+.1f}%)")
+        lines.append(f"  {name:<8} " + ", ".join(changes))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight at once")
+    parser.add_argument("--bcrypt-rounds", type=int, default=10, help="bcrypt work factor")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="simulated PostgreSQL round trip")
+    parser.add_argument("--redis-latency-ms", type=float, default=0.0, help="simulated Redis round trip")
+    parser.add_argument("--output", type=Path, help="result file, defaults to benchmarks/results/auth-<commit>.json")
+    parser.add_argument("--baseline", type=Path, help="result file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    scenarios = asyncio.run(
+        run_benchmark(
+            requests=args.requests,
+            concurrency=args.concurrency,
+            bcrypt_rounds=args.bcrypt_rounds,
+            db_latency_ms=args.db_latency_ms,
+            redis_latency_ms=args.redis_latency_ms,
+        )
+    )
+    results = {
+        "meta": {
+            "commit": commit,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "bcrypt_rounds": args.bcrypt_rounds,
+            "db_latency_ms": args.db_latency_ms,
+            "redis_latency_ms": args.redis_latency_ms,
+        },
+        "scenarios": scenarios,
+    }
+
+    for name, result in scenarios.items():
+        latency = result["latency_ms"]
+        stages = ", ".join(f"{stage} {stats['ms_per_request']}ms" for stage, stats in result["stages"].items())
+        print(
+            f"{name:<8} {result['requests_per_second']:>8} req/s  p50 {latency['p50']}ms  p95 {latency['p95']}ms  "
+            f"p99 {latency['p99']}ms  errors {result['errors']}  [{stages}]"
+        )
+
+    output = args.output or RESULTS_DIR / f"auth-{commit or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"results written to {output}")
+
+    if args.baseline:
+        print(compare(results, json.loads(args.baseline.read_text())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable
+from uuid import uuid4
+
+from app.auth.throttle import SLIDING_WINDOW_SCRIPT
+from app.db.statements import Statement, statements
+from benchmarks.stages import StageTimer
+
+
+class FakeRecord(dict):
+    """
+    A row returned by FakeDatabase.
+
+    Like the records of databases, it can be read both as a mapping and by attribute.
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class FakeDatabase:
+    def __init__(self, timer: StageTimer, latency_ms: float = 0.0):
+        """
+        Initialize an in-memory stand-in for databases.Database.
+
+        The app's registered statements are prepared and run on a stand-in asyncpg
+        connection. Only the statements of the auth path are understood, answered from
+        plain dictionaries by statement name, and any other statement raises
+        NotImplementedError so that a new query is noticed instead of silently measured
+        wrong.
+
+        Args/Attributes:
+            timer (StageTimer): The timer every round trip is recorded on, as the "db" stage.
+            latency_ms (float): The simulated network latency added to every round trip.
+            clients (dict): The clients by id.
+            users (dict): The users by id.
+            profiles (dict): The profiles by (client_id, user_id).
+        """
+        self.timer = timer
+        self.latency_ms = latency_ms
+        self.clients: dict[str, FakeRecord] = {}
+        self.users: dict[str, FakeRecord] = {}
+        self.users_by_username: dict[str, FakeRecord] = {}
+        self.users_by_email: dict[str, FakeRecord] = {}
+        self.profiles: dict[tuple[str, str], FakeRecord] = {}
+
+        self._handlers: dict[str, Callable[[dict], Any]] = {
+            "create_user_with_profile": self._create_user_with_profile,
+            "get_user": self._get_user,
+            "get_profile": self._get_profile,
+            "update_user_password_hash": self._update_user_password_hash,
+            "update_last_login": self._update_last_login,
+        }
+        self._raw_connection = FakeConnection(self)
+
+    async def round_trip(self):
+        """
+        Simulate one round trip, recording it on the "db" stage.
+
+        Returns:
+            None
+        """
+        with self.timer.measure("db"):
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000)
+
+    def handler(self, sql: str) -> Callable[[list], Any]:
+        """
+        Return the handler answering a registered statement.
+
+        Rows are projected onto the columns of the statement's row class, like the
+        statement would select them.
+
+        Args:
+            sql (str): The positional SQL of the statement, as it is prepared.
+
+        Returns:
+            Callable[[list], Any]: A function answering the statement from its positional arguments.
+
+        Raises:
+            NotImplementedError: If the statement is not one of the auth path statements.
+        """
+        for statement in statements:
+            if statement.sql == sql and statement.name in self._handlers:
+                return lambda args, statement=statement: self._answer(statement, args)
+        raise NotImplementedError(f"FakeDatabase does not understand: {' '.join(sql.split())[:120]}")
+
+    def _answer(self, statement: Statement, args: list) -> Any:
+        result = self._handlers[statement.name](dict(zip(statement.params, args)))
+        fields = getattr(statement.row, "fields", None)
+        if result is None or fields is None:
+            return result
+        return FakeRecord({field: result[field] for field in fields})
+
+    async def fetch_one(self, query: str, values: dict | None = None) -> Any:
+        raise NotImplementedError(f"FakeDatabase only runs registered statements, not: {query[:120]}")
+
+    fetch_all = execute = fetch_one
+
+    @asynccontextmanager
+    async def connection(self):
+        yield SimpleNamespace(raw_connection=self._raw_connection)
+
+    @asynccontextmanager
+    async def transaction(self, **kwargs):
+        # BEGIN and COMMIT each cost a round trip on a real connection
+        await self.round_trip()
+        yield self
+        await self.round_trip()
+
+    def _create_user_with_profile(self, values: dict) -> FakeRecord:
+        username_exists = values["username"] in self.users_by_username
+        email_exists = values["email"] in self.users_by_email
+        result = FakeRecord(username_exists=username_exists, email_exists=email_exists)
+        if username_exists or email_exists:
+            return FakeRecord(result, client_id=None, user_id=None)
+
+        now = datetime.now(timezone.utc)
+        client_id = values["client_id"]
+        if client_id is None:
+            client_id = str(uuid4())
+            self.clients[client_id] = FakeRecord(id=client_id, name=values["client_name"], created_at=now)
+
+        user = FakeRecord(
+            id=str(uuid4()),
+            username=values["username"],
+            email=values["email"],
+            hashed_password=values["hashed_password"],
+            is_admin=values["is_admin"],
+            current_client_id=client_id,
+            created_at=now,
+            updated_at=now,
+        )
+        self.users[user.id] = user
+        self.users_by_username[user.username] = user
+        self.users_by_email[user.email] = user
+
+        profile = FakeRecord(
+            client_id=client_id,
+            user_id=user.id,
+            is_client_owner=True,
+            avatar_url=None,
+            full_name=user.username,
+            status="active",
+            last_login_at=now,
+            created_at=now,
+            updated_at=now,
+        )
+        self.profiles[(client_id, user.id)] = profile
+        return FakeRecord(result, **profile)
+
+    def _get_user(self, values: dict) -> FakeRecord | None:
+        username = values["username"]
+        return self.users_by_username.get(username) or self.users_by_email.get(username)
+
+    def _get_profile(self, values: dict) -> FakeRecord | None:
+        return self.profiles.get((str(values["client_id"]), str(values["user_id"])))
+
+    def _update_user_password_hash(self, values: dict):
+        user = self.users.get(str(values["user_id"]))
+        if user is not None:
+            user["hashed_password"] = values["hashed_password"]
+
+    def _update_last_login(self, values: dict):
+        for client_id, user_id, last_login_at in zip(
+            values["client_ids"], values["user_ids"], values["last_login_ats"]
+        ):
+            profile = self.profiles.get((client_id, user_id))
+            if profile is not None and (profile.last_login_at is None or profile.last_login_at < last_login_at):
+                profile["last_login_at"] = last_login_at
+
+
+class FakePreparedStatement:
+    def __init__(self, db: FakeDatabase, sql: str):
+        """
+        Stand-in for an asyncpg prepared statement, answered by FakeDatabase.
+        """
+        self._db = db
+        self._handler = db.handler(sql)
+
+    async def fetchrow(self, *args) -> Any:
+        await self._db.round_trip()
+        return self._handler(list(args))
+
+    async def fetch(self, *args) -> list:
+        await self._db.round_trip()
+        result = self._handler(list(args))
+        return [] if result is None else [result]
+
+    def get_statusmsg(self) -> str:
+        return ""
+
+
+class FakeConnection:
+    def __init__(self, db: FakeDatabase):
+        """
+        Stand-in for the asyncpg connection behind a databases connection.
+        """
+        self._db = db
+
+    async def prepare(self, sql: str, record_class: type | None = None) -> FakePreparedStatement:
+        await self._db.round_trip()
+        return FakePreparedStatement(self._db, sql)
+
+    async def _unnamed(self, sql: str) -> FakePreparedStatement:
+        # Without a statement cache, asyncpg parses the query in a round trip of its own
+        # before binding and executing it
+        await self._db.round_trip()
+        return FakePreparedStatement(self._db, sql)
+
+    async def fetchrow(self, sql: str, *args, record_class: type | None = None) -> Any:
+        return await (await self._unnamed(sql)).fetchrow(*args)
+
+    async def fetch(self, sql: str, *args, record_class: type | None = None) -> list:
+        return await (await self._unnamed(sql)).fetch(*args)
+
+    async def execute(self, sql: str, *args) -> str:
+        await (await self._unnamed(sql)).fetch(*args)
+        return ""
+
+
+class FakeScript:
+    def __init__(self, redis: "FakeRedis", func: Callable[..., Any]):
+        """
+        Stand-in for a registered Lua script, running its Python equivalent.
+
+        Args/Attributes:
+            registered_client (FakeRedis): The client the script was registered on.
+        """
+        self.registered_client = redis
+        self._func = func
+
+    async def __call__(self, keys: list | None = None, args: list | None = None) -> Any:
+        return await self.registered_client._command(self._func, keys or [], args or [])
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        """
+        Stand-in for a redis-py pipeline.
+
+        Commands are buffered and run together in one simulated round trip.
+        """
+        self._redis = redis
+        self._commands: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str) -> Callable[..., "FakePipeline"]:
+        if not hasattr(FakeRedis, "_" + name):
+            raise AttributeError(name)
+
+        def buffer(*args, **kwargs) -> "FakePipeline":
+            self._commands.append((name, args, kwargs))
+            return self
+
+        return buffer
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._commands = []
+
+    async def execute(self) -> list:
+        commands, self._commands = self._commands, []
+
+        def run() -> list:
+            return [getattr(self._redis, "_" + name)(*args, **kwargs) for name, args, kwargs in commands]
+
+        return await self._redis._command(run)
+
+
+class FakePubSub:
+    def __init__(self, redis: "FakeRedis"):
+        """
+        Stand-in for a redis-py PubSub, delivering messages published on the same FakeRedis.
+        """
+        self._redis = redis
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._channels: set[str] = set()
+
+    async def subscribe(self, *channels: str):
+        self._channels.update(channels)
+        self._redis._subscribers.add(self)
+
+    async def listen(self):
+        while True:
+            yield await self._queue.get()
+
+    async def aclose(self):
+        self._redis._subscribers.discard(self)
+
+
+class FakeRedis:
+    def __init__(self, timer: StageTimer, latency_ms: float = 0.0):
+        """
+        Initialize an in-memory stand-in for redis.asyncio.Redis with decoded responses.
+
+        It implements the commands, pipelines and scripts the auth path uses. Every
+        command, pipeline execution and script call counts as one round trip on the
+        "redis" stage.
+
+        Args/Attributes:
+            timer (StageTimer): The timer every round trip is recorded on.
+            latency_ms (float): The simulated network latency added to every round trip.
+        """
+        self.timer = timer
+        self.latency_ms = latency_ms
+        self._data: dict[str, Any] = {}
+        self._expires_at: dict[str, float] = {}
+        self._subscribers: set[FakePubSub] = set()
+        self._scripts: dict[str, Callable[..., Any]] = {SLIDING_WINDOW_SCRIPT: self._sliding_window}
+
+    def __getattr__(self, name: str) -> Callable[..., Awaitable[Any]]:
+        command = getattr(type(self), "_" + name, None)
+        if command is None:
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs) -> Any:
+            return await self._command(command, self, *args, **kwargs)
+
+        return call
+
+    async def _command(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        with self.timer.measure("redis"):
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000)
+            return func(*args, **kwargs)
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self)
+
+    def register_script(self, script: str) -> FakeScript:
+        if script not in self._scripts:
+            raise NotImplementedError("FakeRedis has no Python equivalent of this script")
+        return FakeScript(self, self._scripts[script])
+
+    async def close(self):
+        pass
+
+    def _live(self, key: str) -> Any:
+        expires_at = self._expires_at.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            self._expires_at.pop(key, None)
+        return self._data.get(key)
+
+    @staticmethod
+    def _seconds(value: int | float | timedelta) -> float:
+        return value.total_seconds() if isinstance(value, timedelta) else value
+
+    def _get(self, key: str) -> str | None:
+        return self._live(key)
+
+    def _set(self, key: str, value: Any, ex: Any = None, px: int | None = None, nx: bool = False) -> bool | None:
+        if nx and self._live(key) is not None:
+            return None
+        self._data[key] = str(value) if not isinstance(value, bytes) else value.decode("utf-8")
+        self._expires_at.pop(key, None)
+        if ex is not None:
+            self._expires_at[key] = time.time() + self._seconds(ex)
+        if px is not None:
+            self._expires_at[key] = time.time() + px / 1000
+        return True
+
+    def _delete(self, *keys: str) -> int:
+        deleted = 0
+        for key in keys:
+            if self._live(key) is not None:
+                deleted += 1
+            self._data.pop(key, None)
+            self._expires_at.pop(key, None)
+        return deleted
+
+    def _expire(self, key: str, seconds: int | timedelta) -> bool:
+        if self._live(key) is None:
+            return False
+        self._expires_at[key] = time.time() + self._seconds(seconds)
+        return True
+
+    def _pexpire(self, key: str, milliseconds: int) -> bool:
+        return self._expire(key, milliseconds / 1000)
+
+    def _hset(self, key: str, field: str | None = None, value: Any = None, mapping: dict | None = None) -> int:
+        hash_ = self._live(key)
+        if hash_ is None:
+            hash_ = self._data[key] = {}
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        added = len(items.keys() - hash_.keys())
+        hash_.update({k: str(v) for k, v in items.items()})
+        return added
+
+    def _hget(self, key: str, field: str) -> str | None:
+        return (self._live(key) or {}).get(field)
+
+    def _hgetall(self, key: str) -> dict:
+        return dict(self._live(key) or {})
+
+    def _sadd(self, key: str, *members: str) -> int:
+        set_ = self._live(key)
+        if set_ is None:
+            set_ = self._data[key] = set()
+        added = len(set(members) - set_)
+        set_.update(members)
+        return added
+
+    def _srem(self, key: str, *members: str) -> int:
+        set_ = self._live(key) or set()
+        removed = len(set_ & set(members))
+        set_.difference_update(members)
+        return removed
+
+    def _smembers(self, key: str) -> set:
+        return set(self._live(key) or set())
+
+    def _publish(self, channel: str, message: str) -> int:
+        receivers = [subscriber for subscriber in self._subscribers if channel in subscriber._channels]
+        for subscriber in receivers:
+            subscriber._queue.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(receivers)
+
+    def _sliding_window(self, keys: list[str], args: list) -> int:
+        # Python equivalent of app.auth.throttle.SLIDING_WINDOW_SCRIPT
+        now = time.time() * 1000
+        window = int(args[0])
+        for i, key in enumerate(keys, start=1):
+            attempts = [at for at in self._live(key) or [] if at > now - window]
+            self._data[key] = attempts
+            if len(attempts) >= int(args[i + 1]):
+                return i
+        for key in keys:
+            self._data[key].append(now)
+            self._expires_at[key] = time.time() + window / 1000
+        return 0
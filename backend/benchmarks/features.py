@@ -0,0 +1,190 @@
+"""
+Essay feature extraction microbenchmarks.
+
+Computes the features of app.essay.features for batches of synthetic essays, with the
+batched NumPy engine and with a per-word Python loop computing the same features, and
+checks that both agree. Reports microseconds per essay and the speedup of the engine,
+and the time the band scorer takes per essay, features included.
+
+Usage:
+    uv run python -m benchmarks.features --essays 1000 --words 300 --batch-size 32
+    uv run python -m benchmarks.features --baseline benchmarks/results/features-<commit>.json
+
+Results are written as JSON to benchmarks/results/features-<commit>.json by default.
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from app.essay.features.extract import SENTENCE_LENGTH_BINS, extract_features
+from app.essay.features.tokens import FUNCTION_WORDS
+from app.essay.scoring import scorer
+from benchmarks.auth import RESULTS_DIR, git_commit
+
+# The tokens of the loop: words, runs of sentence-ending punctuation, and blank lines
+TOKEN = re.compile(r"[a-z0-9]+(?:['’-][a-z0-9]+)*|[.!?]+|\n[ \t]*\n\s*")
+
+# The features both implementations compute, compared after every run
+COMPARED = (
+    "word_count",
+    "sentence_count",
+    "paragraph_count",
+    "sentence_length_mean",
+    "sentence_length_histogram",
+    "type_token_ratio",
+    "lexical_density",
+    "word_length_mean",
+)
+
+
+def make_essays(essays: int, words: int, seed: int = 0) -> list[str]:
+    """
+    Generate essays of about the given number of words, in sentences and paragraphs.
+
+    Returns:
+        list[str]: The essay texts.
+    """
+    rng = random.Random(seed)
+    vocabulary = sorted(FUNCTION_WORDS) + [f"word{i}" for i in range(2000)]
+    texts = []
+    for _ in range(essays):
+        paragraphs, written = [], 0
+        while written < words:
+            sentences = []
+            for _ in range(rng.randint(3, 6)):
+                length = rng.randint(5, 30)
+                sentences.append(" ".join(rng.choice(vocabulary) for _ in range(length)).capitalize() + ".")
+                written += length
+            paragraphs.append(" ".join(sentences))
+        texts.append("\n\n".join(paragraphs))
+    return texts
+
+
+def loop_features(texts: list[str]) -> dict[str, list]:
+    """
+    Compute the features word by word, one essay after another, tokenizing with a regex.
+
+    Returns:
+        dict[str, list]: One list per feature, with one entry per essay.
+    """
+    features = {name: [] for name in ("word_count", "sentence_count", "paragraph_count")}
+    features |= {name: [] for name in ("sentence_length_mean", "type_token_ratio", "lexical_density")}
+    features |= {"sentence_length_histogram": [], "word_length_mean": []}
+    for text in texts:
+        words, sentences, paragraphs, content, characters = 0, [], 0, 0, 0
+        types, sentence, paragraph = set(), 0, 0
+        for token in TOKEN.findall(text.lower()):
+            if token[0] in ".!?\n":
+                if sentence:
+                    sentences.append(sentence)
+                sentence = 0
+                if token[0] == "\n":
+                    paragraphs += paragraph > 0
+                    paragraph = 0
+                continue
+            words += 1
+            sentence += 1
+            paragraph += 1
+            types.add(token)
+            content += token not in FUNCTION_WORDS
+            characters += len(token)
+        if sentence:
+            sentences.append(sentence)
+        paragraphs += paragraph > 0
+        histogram = [0] * (len(SENTENCE_LENGTH_BINS) + 1)
+        for length in sentences:
+            histogram[sum(length >= bound for bound in SENTENCE_LENGTH_BINS)] += 1
+        features["word_count"].append(words)
+        features["sentence_count"].append(len(sentences))
+        features["paragraph_count"].append(paragraphs)
+        features["sentence_length_mean"].append(sum(sentences) / len(sentences) if sentences else 0.0)
+        features["type_token_ratio"].append(len(types) / words if words else 0.0)
+        features["lexical_density"].append(content / words if words else 0.0)
+        features["sentence_length_histogram"].append([count / max(len(sentences), 1) for count in histogram])
+        features["word_length_mean"].append(characters / words if words else 0.0)
+    return features
+
+
+def run_benchmark(essays: int, words: int, batch_size: int, repeats: int) -> dict:
+    """
+    Time both implementations, and the band scorer, over the same essays, batch by batch.
+
+    Returns:
+        dict: The microseconds per essay of each implementation and of scoring, and the engine's speedup.
+
+    Raises:
+        AssertionError: If the implementations disagree.
+    """
+    texts = make_essays(essays, words)
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = {}
+    for name, implementation in [("loop", loop_features), ("numpy", extract_features), ("scoring", scorer.score)]:
+        best = float("inf")
+        for _ in range(repeats):
+            started_at = time.perf_counter()
+            for batch in batches:
+                implementation(batch)
+            best = min(best, time.perf_counter() - started_at)
+        results[name] = {"us_per_essay": round(best / essays * 1e6, 2)}
+
+    for batch in batches[:3]:
+        expected, actual = loop_features(batch), extract_features(batch)
+        for feature in COMPARED:
+            assert np.allclose(expected[feature], actual[feature]), feature
+    results["speedup"] = round(results["loop"]["us_per_essay"] / results["numpy"]["us_per_essay"], 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--essays", type=int, default=1000, help="essays in total")
+    parser.add_argument("--words", type=int, default=300, help="words per essay")
+    parser.add_argument("--batch-size", type=int, default=32, help="essays per batch, as the scoring worker reads them")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per implementation, the best is kept")
+    parser.add_argument(
+        "--output", type=Path, help="result file, defaults to benchmarks/results/features-<commit>.json"
+    )
+    parser.add_argument("--baseline", type=Path, help="result file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    scenarios = run_benchmark(args.essays, args.words, args.batch_size, args.repeats)
+    results = {
+        "meta": {
+            "commit": commit,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "essays": args.essays,
+            "words": args.words,
+            "batch_size": args.batch_size,
+        },
+        "scenarios": scenarios,
+    }
+
+    print(
+        f"loop {scenarios['loop']['us_per_essay']}us/essay  numpy {scenarios['numpy']['us_per_essay']}us/essay  "
+        f"speedup {scenarios['speedup']}x  scoring {scenarios['scoring']['us_per_essay']}us/essay"
+    )
+
+    output = args.output or RESULTS_DIR / f"features-{commit or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        before, now = baseline["scenarios"]["numpy"]["us_per_essay"], scenarios["numpy"]["us_per_essay"]
+        print(f"compared with {baseline['meta'].get('commit')}: numpy {before} -> {now}us/essay")
+
+
+if __name__ == "__main__":
+    main()
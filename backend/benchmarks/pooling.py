@@ -0,0 +1,150 @@
+"""
+Connection pooling mode microbenchmarks.
+
+Serves the profile read and the three-statement report of benchmarks.reads with the
+app connected directly to PostgreSQL ("session" pool mode, registered statements
+prepared once per connection) and through PgBouncer in transaction pooling mode
+("transaction" pool mode, every statement parsed as an unnamed statement, and every
+round trip paying the extra hop through the proxy), with an in-memory stand-in for
+PostgreSQL. Reports requests/sec, latency percentiles and PostgreSQL round trips per
+request.
+
+This measures what a request pays for going through PgBouncer. What it buys, running
+more workers than PostgreSQL has connections for, is not something one process shows.
+
+Usage:
+    uv run python -m benchmarks.pooling --requests 500 --concurrency 20 --db-latency-ms 0.5 --proxy-latency-ms 0.1
+    uv run python -m benchmarks.pooling --baseline benchmarks/results/pooling-<commit>.json
+
+Results are written as JSON to benchmarks/results/pooling-<commit>.json by default.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+
+from app.db.postgresql import postgresql_config
+from app.user.deps import ProfileRow
+from benchmarks.auth import RESULTS_DIR, compare, git_commit, run_scenario
+from benchmarks.fakes import FakeDatabase, FakeRecord
+from benchmarks.reads import build_app
+from benchmarks.stages import StageTimer
+
+# The pool mode each scenario runs in
+MODES = {"direct": "session", "pooled": "transaction"}
+
+
+async def run_benchmark(
+    requests: int, concurrency: int, db_latency_ms: float = 0.0, proxy_latency_ms: float = 0.0
+) -> dict:
+    """
+    Run the profile and report scenarios connected directly and through the proxy.
+
+    The app's PostgreSQL pool and pool mode are replaced for the duration of the run
+    and restored afterwards. Reads go to the primary, as without replicas.
+
+    Args:
+        requests (int): The number of requests per scenario.
+        concurrency (int): The number of requests in flight at once.
+        db_latency_ms (float): The simulated latency of a PostgreSQL round trip.
+        proxy_latency_ms (float): The latency the proxy adds to every round trip.
+
+    Returns:
+        dict: The results of every scenario.
+    """
+    client_id, user_id = str(uuid4()), str(uuid4())
+    now = datetime.now(timezone.utc)
+    profile = FakeRecord(
+        {field: None for field in ProfileRow.fields},
+        client_id=client_id,
+        user_id=user_id,
+        status="active",
+        created_at=now,
+        updated_at=now,
+    )
+
+    saved = postgresql_config.db_pool, postgresql_config.replicas, postgresql_config.pool_mode
+    results = {}
+    try:
+        for connection, pool_mode in MODES.items():
+            timer = StageTimer()
+            latency_ms = db_latency_ms + (proxy_latency_ms if pool_mode == "transaction" else 0)
+            db = FakeDatabase(timer, latency_ms=latency_ms)
+            db.profiles[(client_id, user_id)] = profile
+            postgresql_config.db_pool, postgresql_config.replicas = db, []
+            postgresql_config.pool_mode = pool_mode
+
+            transport = httpx.ASGITransport(app=build_app(client_id, user_id))
+            async with httpx.AsyncClient(transport=transport, base_url="https://bench") as client:
+                # Prepare the statement once, so that no scenario pays for it
+                await client.get("/statement/profile")
+                for shape in ["profile", "report"]:
+                    results[f"{shape}:{connection}"], _ = await run_scenario(
+                        timer,
+                        [lambda path=f"/statement/{shape}": client.get(path) for _ in range(requests)],
+                        200,
+                        concurrency,
+                    )
+    finally:
+        postgresql_config.db_pool, postgresql_config.replicas, postgresql_config.pool_mode = saved
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight at once")
+    parser.add_argument("--db-latency-ms", type=float, default=0.5, help="simulated PostgreSQL round trip")
+    parser.add_argument("--proxy-latency-ms", type=float, default=0.1, help="latency PgBouncer adds to a round trip")
+    parser.add_argument("--output", type=Path, help="result file, defaults to benchmarks/results/pooling-<commit>.json")
+    parser.add_argument("--baseline", type=Path, help="result file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    scenarios = asyncio.run(
+        run_benchmark(
+            requests=args.requests,
+            concurrency=args.concurrency,
+            db_latency_ms=args.db_latency_ms,
+            proxy_latency_ms=args.proxy_latency_ms,
+        )
+    )
+    results = {
+        "meta": {
+            "commit": commit,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "db_latency_ms": args.db_latency_ms,
+            "proxy_latency_ms": args.proxy_latency_ms,
+        },
+        "scenarios": scenarios,
+    }
+
+    for name, result in scenarios.items():
+        latency = result["latency_ms"]
+        round_trips = result["stages"].get("db", {}).get("calls_per_request", 0)
+        print(
+            f"{name:<16} {result['requests_per_second']:>8} req/s  p50 {latency['p50']}ms  p95 {latency['p95']}ms  "
+            f"p99 {latency['p99']}ms  errors {result['errors']}  [db round trips {round_trips}/request]"
+        )
+
+    output = args.output or RESULTS_DIR / f"pooling-{commit or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"results written to {output}")
+
+    if args.baseline:
+        print(compare(results, json.loads(args.baseline.read_text())))
+
+
+if __name__ == "__main__":
+    main()
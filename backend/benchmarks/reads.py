@@ -0,0 +1,166 @@
+"""
+Read consistency microbenchmarks.
+
+Serves the same profile read in the two read modes a route can declare, statement
+(StatementReadDbDep, autocommit on a pooled connection) and snapshot
+(SnapshotReadDbDep, a REPEATABLE READ READ ONLY transaction), for a single-statement
+read and for a three-statement report, with an in-memory stand-in for PostgreSQL.
+Reports requests/sec, latency percentiles and PostgreSQL round trips per request.
+
+Usage:
+    uv run python -m benchmarks.reads --requests 500 --concurrency 20 --db-latency-ms 0.5
+    uv run python -m benchmarks.reads --baseline benchmarks/results/reads-<commit>.json
+
+Results are written as JSON to benchmarks/results/reads-<commit>.json by default.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+from fastapi import FastAPI
+
+from app.db.deps import SnapshotReadDbDep, StatementReadDbDep
+from app.db.postgresql import postgresql_config
+from app.db.statements import statements
+from app.user.deps import ProfileRow
+from benchmarks.auth import RESULTS_DIR, compare, git_commit, run_scenario
+from benchmarks.fakes import FakeDatabase, FakeRecord
+from benchmarks.stages import StageTimer
+
+# The statements of a report that must agree, e.g. a profile and what hangs off it
+REPORT_STATEMENTS = 3
+
+
+def build_app(client_id: str, user_id: str) -> FastAPI:
+    """
+    Build an app reading one profile in each read mode.
+
+    Args:
+        client_id (str): The client_id of the profile.
+        user_id (str): The user_id of the profile.
+
+    Returns:
+        FastAPI: The app.
+    """
+    app = FastAPI()
+    values = {"client_id": client_id, "user_id": user_id}
+
+    @app.get("/statement/profile")
+    async def statement_profile(db: StatementReadDbDep):
+        return dict(await statements.fetch_one(db, "get_profile", values))
+
+    @app.get("/snapshot/profile")
+    async def snapshot_profile(db: SnapshotReadDbDep):
+        return dict(await statements.fetch_one(db, "get_profile", values))
+
+    @app.get("/statement/report")
+    async def statement_report(db: StatementReadDbDep):
+        return [dict(await statements.fetch_one(db, "get_profile", values)) for _ in range(REPORT_STATEMENTS)]
+
+    @app.get("/snapshot/report")
+    async def snapshot_report(db: SnapshotReadDbDep):
+        return [dict(await statements.fetch_one(db, "get_profile", values)) for _ in range(REPORT_STATEMENTS)]
+
+    return app
+
+
+async def run_benchmark(requests: int, concurrency: int, db_latency_ms: float = 0.0) -> dict:
+    """
+    Run the profile and report scenarios in both read modes.
+
+    The app's PostgreSQL pool is replaced by the stand-in for the duration of the run
+    and restored afterwards. Reads go to the primary, as without replicas.
+
+    Args:
+        requests (int): The number of requests per scenario.
+        concurrency (int): The number of requests in flight at once.
+        db_latency_ms (float): The simulated latency of a PostgreSQL round trip.
+
+    Returns:
+        dict: The results of every scenario.
+    """
+    timer = StageTimer()
+    db = FakeDatabase(timer, latency_ms=db_latency_ms)
+    client_id, user_id = str(uuid4()), str(uuid4())
+    now = datetime.now(timezone.utc)
+    db.profiles[(client_id, user_id)] = FakeRecord(
+        {field: None for field in ProfileRow.fields},
+        client_id=client_id,
+        user_id=user_id,
+        status="active",
+        created_at=now,
+        updated_at=now,
+    )
+
+    saved = postgresql_config.db_pool, postgresql_config.replicas
+    postgresql_config.db_pool, postgresql_config.replicas = db, []
+    try:
+        transport = httpx.ASGITransport(app=build_app(client_id, user_id))
+        async with httpx.AsyncClient(transport=transport, base_url="https://bench") as client:
+            # Prepare the statement once, so that no scenario pays for it
+            await client.get("/statement/profile")
+            results = {}
+            for shape in ["profile", "report"]:
+                for mode in ["statement", "snapshot"]:
+                    results[f"{shape}:{mode}"], _ = await run_scenario(
+                        timer,
+                        [lambda path=f"/{mode}/{shape}": client.get(path) for _ in range(requests)],
+                        200,
+                        concurrency,
+                    )
+    finally:
+        postgresql_config.db_pool, postgresql_config.replicas = saved
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight at once")
+    parser.add_argument("--db-latency-ms", type=float, default=0.5, help="simulated PostgreSQL round trip")
+    parser.add_argument("--output", type=Path, help="result file, defaults to benchmarks/results/reads-<commit>.json")
+    parser.add_argument("--baseline", type=Path, help="result file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    scenarios = asyncio.run(
+        run_benchmark(requests=args.requests, concurrency=args.concurrency, db_latency_ms=args.db_latency_ms)
+    )
+    results = {
+        "meta": {
+            "commit": commit,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "db_latency_ms": args.db_latency_ms,
+        },
+        "scenarios": scenarios,
+    }
+
+    for name, result in scenarios.items():
+        latency = result["latency_ms"]
+        round_trips = result["stages"].get("db", {}).get("calls_per_request", 0)
+        print(
+            f"{name:<18} {result['requests_per_second']:>8} req/s  p50 {latency['p50']}ms  p95 {latency['p95']}ms  "
+            f"p99 {latency['p99']}ms  errors {result['errors']}  [db round trips {round_trips}/request]"
+        )
+
+    output = args.output or RESULTS_DIR / f"reads-{commit or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"results written to {output}")
+
+    if args.baseline:
+        print(compare(results, json.loads(args.baseline.read_text())))
+
+
+if __name__ == "__main__":
+    main()
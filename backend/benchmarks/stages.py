@@ -0,0 +1,120 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator
+
+import jwt
+
+from app.auth.hashing import PasswordHasher
+
+
+class StageTimer:
+    def __init__(self):
+        """
+        Initialize a StageTimer.
+
+        Stages are named parts of the request path (bcrypt, jwt, db, redis). Their
+        calls are counted and timed. Concurrent requests overlap, so stage times are
+        summed call durations rather than a share of the wall time.
+
+        Attributes:
+            calls (dict[str, int]): The number of calls per stage.
+            seconds (dict[str, float]): The summed duration of the calls per stage.
+        """
+        self.calls: dict[str, int] = {}
+        self.seconds: dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """
+        Time the enclosed block as one call of a stage.
+
+        Args:
+            stage (str): The stage name.
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + time.perf_counter() - started_at
+
+    def reset(self):
+        """
+        Forget every recorded call.
+
+        Returns:
+            None
+        """
+        self.calls.clear()
+        self.seconds.clear()
+
+    def summary(self, requests: int) -> dict:
+        """
+        Summarize the recorded stages per request.
+
+        Args:
+            requests (int): The number of requests the calls were made for.
+
+        Returns:
+            dict: For each stage, the calls and milliseconds in total and per request.
+        """
+        return {
+            stage: {
+                "calls": self.calls[stage],
+                "total_ms": round(self.seconds[stage] * 1000, 3),
+                "calls_per_request": round(self.calls[stage] / requests, 3) if requests else 0,
+                "ms_per_request": round(self.seconds[stage] * 1000 / requests, 3) if requests else 0,
+            }
+            for stage in sorted(self.calls)
+        }
+
+
+def _timed_async(timer: StageTimer, stage: str, func: Callable[..., Any]) -> Callable[..., Any]:
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        with timer.measure(stage):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def _timed(timer: StageTimer, stage: str, func: Callable[..., Any]) -> Callable[..., Any]:
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with timer.measure(stage):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def instrument(timer: StageTimer, hasher: PasswordHasher) -> Iterator[None]:
+    """
+    Time the bcrypt and JWT stages of the app for the duration of the block.
+
+    Password hashing is timed around the PasswordHasher coroutines, so it includes
+    the wait for a free worker. JWT signing and verification are timed around PyJWT.
+    The db and redis stages are timed by the stand-ins themselves.
+
+    Args:
+        timer (StageTimer): The timer the stages are recorded on.
+        hasher (PasswordHasher): The password hasher used by the app.
+    """
+    patches = [
+        (hasher, "hash", _timed_async(timer, "bcrypt", hasher.hash)),
+        (hasher, "verify", _timed_async(timer, "bcrypt", hasher.verify)),
+        (jwt, "encode", _timed(timer, "jwt", jwt.encode)),
+        (jwt, "decode", _timed(timer, "jwt", jwt.decode)),
+    ]
+    originals = [(target, name, getattr(target, name)) for target, name, _ in patches]
+    for target, name, replacement in patches:
+        setattr(target, name, replacement)
+    try:
+        yield
+    finally:
+        for target, name, original in originals:
+            if target is hasher:
+                delattr(target, name)
+            else:
+                setattr(target, name, original)
@@ -5,6 +5,7 @@ from fastapi.responses import ORJSONResponse
 
 from app.auth.deps import oauth2_scheme
 from app.auth.exceptions import NotAuthenticated
+from app.auth.utils import REFRESH_LOCK_PREFIX, REFRESH_SESSION_PREFIX, refresh_session_id
 
 
 @pytest.mark.asyncio
@@ -13,15 +14,21 @@ async def test_auth_deps_with_no_access_token_invalid_refresh_token():
     Tests that the `oauth2_scheme` dependency raises a `NotAuthenticated` exception
     when an access token is not provided and the refresh token is invalid.
 
-    Verifies that the dependency does not make a call to `get` on the Redis mock.
+    Verifies that the dependency looks the session up once under each layout, releases
+    the refresh lock and sets no cookie.
     """
     mock_response = MagicMock(spec=ORJSONResponse)
     mock_redis = AsyncMock()
-
-    mock_redis.get.return_value = None
+    mock_pipe = MagicMock()
+    mock_pipe.execute = AsyncMock(side_effect=[[None, True, {}], [-2, None]])
+    mock_redis.pipeline = MagicMock()
+    mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipe
 
     with pytest.raises(NotAuthenticated):
         await oauth2_scheme(response=mock_response, redis=mock_redis, access_token=None, refresh_token="invalid_token")
 
-    mock_redis.get.assert_called_once_with("invalid_token")
+    session_id = refresh_session_id("invalid_token")
+    mock_pipe.hgetall.assert_called_once_with(REFRESH_SESSION_PREFIX + session_id)
+    mock_pipe.get.assert_called_with("invalid_token")
+    mock_redis.delete.assert_awaited_once_with(REFRESH_LOCK_PREFIX + session_id)
     mock_response.set_cookie.assert_not_called()
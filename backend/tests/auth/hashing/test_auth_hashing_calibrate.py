@@ -0,0 +1,81 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.auth import hashing
+from app.auth.hashing import PASSWORD_HASH_ROUNDS_KEY, PasswordHasher
+from app.auth.utils import get_password_hash
+
+
+@pytest.fixture
+def password_hasher():
+    hasher = PasswordHasher(executor_type="thread", max_workers=1, max_concurrency=1, budget_ms=250)
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_calibrate_picks_highest_rounds_within_budget(password_hasher, monkeypatch):
+    """
+    Tests that calibration picks the highest work factor whose measured hash time
+    fits in the budget, stops measuring once the budget is exceeded, and shares the
+    result through Redis.
+    """
+    measured = []
+
+    def fake_measure(rounds: int) -> float:
+        measured.append(rounds)
+        return 0.05 * 2 ** (rounds - 10)  # 50, 100, 200, 400 ms
+
+    monkeypatch.setattr(hashing, "measure_password_hash", fake_measure)
+    mock_redis = AsyncMock()
+    mock_redis.get.side_effect = [None, "12"]
+
+    rounds = await password_hasher.calibrate(mock_redis)
+
+    assert rounds == 12
+    assert password_hasher.rounds == 12
+    assert measured == [10, 11, 12, 13]
+    mock_redis.set.assert_awaited_once_with(PASSWORD_HASH_ROUNDS_KEY, 12, nx=True, ex=3600)
+
+
+@pytest.mark.asyncio
+async def test_calibrate_adopts_rounds_shared_by_another_worker(password_hasher, monkeypatch):
+    """
+    Tests that a worker adopts the work factor another worker already calibrated
+    instead of measuring its own.
+    """
+    monkeypatch.setattr(hashing, "measure_password_hash", lambda rounds: pytest.fail("measured"))
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = "11"
+
+    assert await password_hasher.calibrate(mock_redis) == 11
+
+
+@pytest.mark.asyncio
+async def test_calibrate_raises_shared_rounds_to_the_minimum(password_hasher, monkeypatch):
+    """
+    Tests that a shared work factor below min_rounds, e.g. one calibrated by a worker
+    with an older configuration, is raised to min_rounds.
+    """
+    monkeypatch.setattr(hashing, "measure_password_hash", lambda rounds: pytest.fail("measured"))
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = "8"
+
+    assert await password_hasher.calibrate(mock_redis) == 10
+    assert password_hasher.rounds == 10
+
+
+@pytest.mark.asyncio
+async def test_calibrate_keeps_fixed_rounds():
+    """
+    Tests that a configured work factor is kept and only hashes with a lower work
+    factor need to be rehashed.
+    """
+    hasher = PasswordHasher(executor_type="thread", max_workers=1, max_concurrency=1, rounds=5)
+
+    assert await hasher.calibrate() == 5
+    assert hasher.needs_rehash(get_password_hash("my_secret", rounds=4)) is True
+    assert hasher.needs_rehash(get_password_hash("my_secret", rounds=5)) is False
+    assert hasher.needs_rehash(get_password_hash("my_secret", rounds=6)) is False
+    hasher.shutdown()
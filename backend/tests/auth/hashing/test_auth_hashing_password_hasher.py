@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import bcrypt
+import pytest
+
+from app.auth import hashing
+from app.auth.hashing import PasswordHasher
+
+
+@pytest.fixture
+def password_hasher():
+    hasher = PasswordHasher(executor_type="thread", max_workers=2, max_concurrency=2)
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_hash_and_verify(password_hasher):
+    """
+    Tests that a password hashed by the PasswordHasher is a valid bcrypt hash that
+    the PasswordHasher verifies against the original password only.
+    """
+    password = "my_secret"
+
+    hashed = await password_hasher.hash(password)
+
+    assert bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8")) is True
+    assert await password_hasher.verify(password, hashed) is True
+    assert await password_hasher.verify("wrong_password", hashed) is False
+    assert password_hasher.stats()["completed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_respects_concurrency_cap(password_hasher, monkeypatch):
+    """
+    Tests that the PasswordHasher never runs more jobs than its concurrency cap,
+    that the callers above the cap are counted as queued, and that the event loop
+    stays responsive while the jobs run.
+    """
+    running = 0
+    max_running = 0
+
+    def slow_hash(password: str, rounds: int | None = None) -> str:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        time.sleep(0.05)
+        running -= 1
+        return password
+
+    monkeypatch.setattr(hashing, "get_password_hash", slow_hash)
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    ticker_task = asyncio.create_task(ticker())
+    results = await asyncio.gather(*(password_hasher.hash(str(i)) for i in range(6)))
+    ticker_task.cancel()
+
+    stats = password_hasher.stats()
+    assert results == [str(i) for i in range(6)]
+    assert max_running <= 2
+    assert stats["max_queued"] >= 4
+    assert stats["queued"] == 0
+    assert stats["in_flight"] == 0
+    assert ticks > 10
@@ -0,0 +1,36 @@
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.auth.exceptions import TooManyLoginAttempts
+from app.auth.routes import auth_router
+from app.db.deps import write_db_transaction
+
+
+@pytest.mark.asyncio
+async def test_throttled_login_takes_no_database_connection():
+    """
+    Tests that a login rejected by the throttle is answered with its Retry-After before
+    the database dependency is resolved.
+    """
+    app = FastAPI()
+    app.include_router(auth_router)
+    write_db = AsyncMock()
+
+    async def override_write_db():
+        await write_db()
+        yield None
+
+    app.dependency_overrides[write_db_transaction] = override_write_db
+    hit = AsyncMock(side_effect=TooManyLoginAttempts(headers={"Retry-After": "12"}))
+
+    with patch("app.auth.deps.login_throttle.hit", hit):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/login", json={"username": "testuser", "password": "testpassword"})
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "12"
+    assert hit.await_args.args[1:] == ("testuser", "127.0.0.1")
+    write_db.assert_not_awaited()
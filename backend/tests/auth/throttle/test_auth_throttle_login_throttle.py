@@ -0,0 +1,76 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.auth.exceptions import TooManyLoginAttempts
+from app.auth.throttle import (
+    LOGIN_THROTTLE_IP_PREFIX,
+    LOGIN_THROTTLE_USERNAME_PREFIX,
+    SLIDING_WINDOW_SCRIPT,
+    LoginThrottle,
+)
+
+
+@pytest.fixture
+def mock_redis():
+    mock_redis = MagicMock()
+    mock_script = AsyncMock(return_value=[0, 0])
+    mock_script.registered_client = mock_redis
+    mock_redis.register_script.return_value = mock_script
+    return mock_redis
+
+
+@pytest.fixture
+def login_throttle():
+    return LoginThrottle(window_seconds=60, max_attempts_per_username=5, max_attempts_per_ip=20)
+
+
+@pytest.mark.asyncio
+async def test_login_throttle_allows_attempt_under_limits(mock_redis, login_throttle):
+    """
+    Tests that an attempt under both limits is allowed and that the script is
+    registered once and called with the username and IP keys and their limits.
+    """
+    await login_throttle.hit(mock_redis, "TestUser", "10.0.0.1")
+    await login_throttle.hit(mock_redis, "TestUser", "10.0.0.1")
+
+    mock_redis.register_script.assert_called_once_with(SLIDING_WINDOW_SCRIPT)
+    mock_script = mock_redis.register_script.return_value
+    call = mock_script.call_args.kwargs
+    assert call["keys"] == [LOGIN_THROTTLE_USERNAME_PREFIX + "testuser", LOGIN_THROTTLE_IP_PREFIX + "10.0.0.1"]
+    assert call["args"][0] == 60_000
+    assert call["args"][2:] == [5, 20]
+    assert login_throttle.stats() == {"allowed": 2, "rejected_username": 0, "rejected_ip": 0}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("exceeded, counter", [(1, "rejected_username"), (2, "rejected_ip")])
+async def test_login_throttle_rejects_attempt_over_limit(mock_redis, login_throttle, exceeded, counter):
+    """
+    Tests that an attempt over the username or the IP limit raises TooManyLoginAttempts
+    with a Retry-After header of the whole seconds until the oldest attempt of the window
+    expires, and is counted against the limit that was hit.
+    """
+    mock_redis.register_script.return_value.return_value = [exceeded, 12_300]
+
+    with pytest.raises(TooManyLoginAttempts) as exc_info:
+        await login_throttle.hit(mock_redis, "testuser", "10.0.0.1")
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers == {"Retry-After": "13"}
+    assert login_throttle.stats()[counter] == 1
+    assert login_throttle.stats()["allowed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_login_throttle_without_ip_limit(mock_redis):
+    """
+    Tests that a limit per IP of 0 throttles per username only.
+    """
+    login_throttle = LoginThrottle(window_seconds=60, max_attempts_per_username=5, max_attempts_per_ip=0)
+
+    await login_throttle.hit(mock_redis, "testuser", "10.0.0.1")
+
+    call = mock_redis.register_script.return_value.call_args.kwargs
+    assert call["keys"] == [LOGIN_THROTTLE_USERNAME_PREFIX + "testuser"]
+    assert call["args"][2:] == [5]
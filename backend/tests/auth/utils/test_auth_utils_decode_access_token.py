@@ -0,0 +1,71 @@
+import time
+from unittest.mock import patch
+
+import jwt
+import pytest
+from jwt.exceptions import InvalidTokenError
+
+from app.auth.config import auth_settings
+from app.auth.utils import access_token_cache, decode_access_token, generate_token
+
+
+@pytest.fixture(autouse=True)
+def clear_access_token_cache():
+    access_token_cache.clear()
+    yield
+    access_token_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_decode_access_token_caches_verified_payload():
+    """
+    Tests that `decode_access_token` verifies a token once and serves repeat
+    lookups of the same token from the cache, counting hits and misses.
+    """
+    access_token, _ = await generate_token(
+        "access_token",
+        auth_settings.ACCESS_SECRET_KEY,
+        auth_settings.ALGORITHM,
+        auth_settings.ACCESS_TOKEN_EXPIRE_MINUTES,
+        "client_id_123",
+        "user_id_456",
+    )
+    hits, misses = access_token_cache.hits, access_token_cache.misses
+
+    with patch("app.auth.utils.jwt.decode", wraps=jwt.decode) as mock_decode:
+        first = decode_access_token(access_token)
+        second = decode_access_token(access_token)
+
+    assert first == second
+    assert first["client_id"] == "client_id_123"
+    assert first["user_id"] == "user_id_456"
+    mock_decode.assert_called_once()
+    assert access_token_cache.hits == hits + 1
+    assert access_token_cache.misses == misses + 1
+
+
+@pytest.mark.asyncio
+async def test_decode_access_token_evicts_at_exp():
+    """
+    Tests that a cached payload is dropped once the token's exp has passed, so an
+    expired token is verified again and rejected.
+    """
+    access_token = jwt.encode(
+        {"client_id": "client_id_123", "user_id": "user_id_456", "exp": int(time.time()) + 60},
+        auth_settings.ACCESS_SECRET_KEY,
+        algorithm=auth_settings.ALGORITHM,
+    )
+    decode_access_token(access_token)
+
+    with patch("app.cache.time.time", return_value=time.time() + 120):
+        assert access_token_cache.get(access_token) is None
+
+
+def test_decode_access_token_invalid_token_not_cached():
+    """
+    Tests that an invalid token raises InvalidTokenError and is not cached.
+    """
+    with pytest.raises(InvalidTokenError):
+        decode_access_token("invalid_token")
+
+    assert access_token_cache.stats()["size"] == 0
@@ -1,8 +1,14 @@
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-from app.auth.utils import delete_refresh_token  # Your actual import path
+from app.auth.utils import (
+    REFRESH_RESULT_PREFIX,
+    REFRESH_SESSION_PREFIX,
+    REFRESH_USER_SESSIONS_PREFIX,
+    delete_refresh_token,
+    refresh_session_id,
+)
 
 
 @pytest.mark.asyncio
@@ -10,13 +16,26 @@ async def test_delete_refresh_token():
     """
     Tests that `delete_refresh_token` correctly deletes a refresh token from Redis.
 
-    Verifies that the function calls Redis' `delete` method with the correct refresh token.
+    Verifies that the function deletes the session hash, any access token shared by
+    a recent refresh and a session stored under the legacy layout, and removes the
+    session id from the user's session set.
     """
     mock_redis = AsyncMock()
+    mock_pipe = MagicMock()
+    mock_pipe.execute = AsyncMock()
+    mock_redis.pipeline = MagicMock()
+    mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipe
+    mock_redis.hget.return_value = "user_abc"
     refresh_token = "refresh_to_delete"
+    session_id = refresh_session_id(refresh_token)
 
     # Call the function to delete the refresh token
     await delete_refresh_token(mock_redis, refresh_token)
 
-    # Verify that the Redis delete method was called with the correct refresh token
-    mock_redis.delete.assert_called_once_with(refresh_token)
+    # Verify that the session and its index entry were deleted
+    mock_redis.hget.assert_called_once_with(REFRESH_SESSION_PREFIX + session_id, "u")
+    mock_pipe.delete.assert_called_once_with(
+        REFRESH_SESSION_PREFIX + session_id, REFRESH_RESULT_PREFIX + session_id, refresh_token
+    )
+    mock_pipe.srem.assert_called_once_with(REFRESH_USER_SESSIONS_PREFIX + "user_abc", session_id)
+    mock_pipe.execute.assert_awaited_once()
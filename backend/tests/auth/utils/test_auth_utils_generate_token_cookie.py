@@ -6,7 +6,7 @@ import pytest
 from fastapi.responses import ORJSONResponse
 
 from app.auth.config import auth_settings
-from app.auth.utils import generate_token_cookie
+from app.auth.utils import REFRESH_SESSION_PREFIX, generate_token_cookie, refresh_session_id
 
 
 @pytest.mark.asyncio
@@ -20,6 +20,10 @@ async def test_generate_token_cookie():
 
     # Mock Redis client to prevent actual database usage
     mock_redis = AsyncMock()
+    mock_pipe = MagicMock()
+    mock_pipe.execute = AsyncMock()
+    mock_redis.pipeline = MagicMock()
+    mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipe
 
     # Create a mock ORJSONResponse object to inspect cookie settings
     mock_response = MagicMock(spec=ORJSONResponse)
@@ -72,12 +76,11 @@ async def test_generate_token_cookie():
     assert refresh_expires_at == cookie_expires_at
 
     # Verify that the refresh token was saved to Redis correctly
-    mock_redis.setex.assert_awaited()
-    redis_key = mock_redis.setex.call_args.args[0]
-    redis_expiry = mock_redis.setex.call_args.args[1]
-    redis_value = mock_redis.setex.call_args.args[2]
+    mock_pipe.execute.assert_awaited()
+    redis_key = mock_pipe.hset.call_args.args[0]
+    redis_value = mock_pipe.hset.call_args.kwargs["mapping"]
+    redis_expiry = mock_pipe.expire.call_args_list[0].args[1]
 
-    assert isinstance(redis_key, str)
+    assert redis_key == REFRESH_SESSION_PREFIX + refresh_session_id(refresh_token)
     assert isinstance(redis_expiry, timedelta)
-    assert client_id in redis_value
-    assert user_id in redis_value
+    assert redis_value == {"c": client_id, "u": user_id}
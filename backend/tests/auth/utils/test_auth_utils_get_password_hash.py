@@ -1,6 +1,6 @@
 import bcrypt
 
-from app.auth.utils import get_password_hash
+from app.auth.utils import get_password_hash, get_password_hash_rounds
 
 
 def test_get_password_hash_returns_str():
@@ -49,3 +49,14 @@ def test_get_password_hash_can_be_verified():
     hashed = get_password_hash(password)
 
     assert bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8")) is True
+
+
+def test_get_password_hash_with_rounds():
+    """
+    Test that get_password_hash uses the requested bcrypt work factor and that
+    get_password_hash_rounds reads it back from the hash.
+    """
+    hashed = get_password_hash("my_secret", rounds=4)
+
+    assert hashed.startswith("$2b$04$")
+    assert get_password_hash_rounds(hashed) == 4
@@ -1,35 +1,34 @@
-import json
-from unittest.mock import AsyncMock
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-from app.auth.utils import get_refresh_token
+from app.auth.utils import REFRESH_SESSION_PREFIX, get_refresh_token, refresh_session_id
 
 
 @pytest.mark.asyncio
 async def test_get_refresh_token_found():
     """
-    Tests that `get_refresh_token` returns the expected value when a refresh token is found
+    Tests that `get_refresh_token` returns the session when a refresh token is found
     in Redis.
 
-    Verifies that the function calls Redis' `get` method correctly and that the returned
-    value matches the expected value.
+    Verifies that the function looks the session up by its session id with a single
+    `hgetall` and expands the compact field names.
     """
     mock_redis = AsyncMock()
     refresh_token = "refresh123"
-    expected_value = json.dumps({"client_id": "client_xyz", "user_id": "user_abc"})
 
-    # Mock Redis to return the expected value
-    mock_redis.get.return_value = expected_value
+    # Mock Redis to return the stored session hash
+    mock_redis.hgetall.return_value = {"c": "client_xyz", "u": "user_abc"}
 
     # Call the function
     result = await get_refresh_token(mock_redis, refresh_token)
 
     # Assert the result matches the expected value
-    assert result == expected_value
+    assert result == {"client_id": "client_xyz", "user_id": "user_abc"}
 
-    # Verify that Redis' get method was called correctly
-    mock_redis.get.assert_called_once_with(refresh_token)
+    # Verify that Redis' hgetall method was called correctly
+    mock_redis.hgetall.assert_called_once_with(REFRESH_SESSION_PREFIX + refresh_session_id(refresh_token))
 
 
 @pytest.mark.asyncio
@@ -38,14 +37,18 @@ async def test_get_refresh_token_not_found():
     Tests that `get_refresh_token` returns None when a refresh token is not found
     in Redis.
 
-    Verifies that the function calls Redis' `get` method correctly and that the
+    Verifies that the function calls Redis' `hgetall` method correctly and that the
     returned value is None when the token is not found.
     """
     mock_redis = AsyncMock()
+    mock_pipe = MagicMock()
+    mock_pipe.execute = AsyncMock(return_value=[-2, None])
+    mock_redis.pipeline = MagicMock()
+    mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipe
     refresh_token = "refresh_not_found"
 
-    # Mock Redis to return None (token not found)
-    mock_redis.get.return_value = None
+    # Mock Redis to return an empty hash and no legacy session (token not found)
+    mock_redis.hgetall.return_value = {}
 
     # Call the function
     result = await get_refresh_token(mock_redis, refresh_token)
@@ -53,5 +56,33 @@ async def test_get_refresh_token_not_found():
     # Assert the result is None (token not found)
     assert result is None
 
-    # Verify that Redis' get method was called correctly
-    mock_redis.get.assert_called_once_with(refresh_token)
+    # Verify that Redis' hgetall method was called correctly
+    mock_redis.hgetall.assert_called_once_with(REFRESH_SESSION_PREFIX + refresh_session_id(refresh_token))
+
+
+@pytest.mark.asyncio
+async def test_get_refresh_token_migrates_legacy_session():
+    """
+    Tests that a session stored under the legacy layout, keyed by the token with a JSON
+    value, is found and moved to the current layout with the time it had left.
+    """
+    mock_redis = AsyncMock()
+    mock_pipe = MagicMock()
+    mock_pipe.execute = AsyncMock(side_effect=[[60_000, '{"client_id": "client_xyz", "user_id": "user_abc"}'], []])
+    mock_redis.pipeline = MagicMock()
+    mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipe
+    mock_redis.hgetall.return_value = {}
+    refresh_token = "legacy_refresh"
+    session_id = refresh_session_id(refresh_token)
+
+    result = await get_refresh_token(mock_redis, refresh_token)
+
+    assert result == {"client_id": "client_xyz", "user_id": "user_abc"}
+    mock_pipe.pttl.assert_called_once_with(refresh_token)
+    mock_pipe.get.assert_called_once_with(refresh_token)
+    mock_pipe.hset.assert_called_once_with(
+        REFRESH_SESSION_PREFIX + session_id, mapping={"c": "client_xyz", "u": "user_abc"}
+    )
+    expires_in = mock_pipe.expire.call_args_list[0].args[1]
+    assert timedelta(seconds=58) < expires_in <= timedelta(seconds=60)
+    mock_redis.delete.assert_awaited_once_with(refresh_token)
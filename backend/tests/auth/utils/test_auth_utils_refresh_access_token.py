@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.auth.utils import REFRESH_RESULT_PREFIX, refresh_access_token, refresh_session_id
+
+
+def mock_redis_with_pipeline(*results):
+    mock_redis = AsyncMock()
+    mock_pipe = MagicMock()
+    mock_pipe.execute = AsyncMock(side_effect=list(results))
+    mock_redis.pipeline = MagicMock()
+    mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipe
+    return mock_redis, mock_pipe
+
+
+@pytest.mark.asyncio
+async def test_refresh_access_token_coalesces_concurrent_refreshes():
+    """
+    Tests that concurrent refreshes of the same refresh token within a worker cost one
+    lookup and one token mint, and that every caller receives the same access token,
+    which is shared with the other workers.
+    """
+    mock_redis, mock_pipe = mock_redis_with_pipeline(
+        [None, True, {"c": "client_xyz", "u": "user_abc"}],
+        [True, 1],
+    )
+    expires_at = datetime.now(timezone.utc)
+
+    async def slow_generate_token(*args):
+        await asyncio.sleep(0.01)
+        return "new_access_token", expires_at
+
+    with patch("app.auth.utils.generate_token", side_effect=slow_generate_token) as mock_generate_token:
+        results = await asyncio.gather(*(refresh_access_token(mock_redis, "refresh123") for _ in range(5)))
+
+    assert results == [("new_access_token", expires_at)] * 5
+    mock_generate_token.assert_called_once()
+    assert mock_generate_token.call_args.args[-2:] == ("client_xyz", "user_abc")
+    assert mock_pipe.execute.await_count == 2
+    assert mock_pipe.set.call_args_list[-1].args == (
+        REFRESH_RESULT_PREFIX + refresh_session_id("refresh123"),
+        f"new_access_token {expires_at.timestamp()}",
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_access_token_uses_result_shared_by_another_worker():
+    """
+    Tests that a refresh returns the access token another worker already minted for
+    the same session without minting a new one.
+    """
+    expires_at = datetime.now(timezone.utc).replace(microsecond=0)
+    mock_redis, _ = mock_redis_with_pipeline(
+        [f"shared_access_token {expires_at.timestamp()}", False, {"c": "client_xyz", "u": "user_abc"}],
+    )
+
+    with patch("app.auth.utils.generate_token") as mock_generate_token:
+        result = await refresh_access_token(mock_redis, "refresh123")
+
+    assert result == ("shared_access_token", expires_at)
+    mock_generate_token.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_refresh_access_token_waits_for_lock_holder():
+    """
+    Tests that a worker losing the lock race waits for the lock holder's result
+    instead of minting its own token.
+    """
+    expires_at = datetime.now(timezone.utc).replace(microsecond=0)
+    mock_redis, _ = mock_redis_with_pipeline([None, False, {"c": "client_xyz", "u": "user_abc"}])
+    mock_redis.get.side_effect = [None, f"shared_access_token {expires_at.timestamp()}"]
+
+    with patch("app.auth.utils.generate_token") as mock_generate_token:
+        result = await refresh_access_token(mock_redis, "refresh123")
+
+    assert result == ("shared_access_token", expires_at)
+    assert mock_redis.get.await_count == 2
+    mock_generate_token.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_refresh_access_token_migrates_legacy_session():
+    """
+    Tests that a refresh token whose session is stored under the legacy layout still
+    refreshes, and that its session is migrated.
+    """
+    mock_redis, mock_pipe = mock_redis_with_pipeline(
+        [None, True, {}],
+        [60_000, '{"client_id": "client_xyz", "user_id": "user_abc"}'],
+        [],
+        [True, 1],
+    )
+    expires_at = datetime.now(timezone.utc)
+
+    with patch("app.auth.utils.generate_token", return_value=("new_access_token", expires_at)) as mock_generate_token:
+        result = await refresh_access_token(mock_redis, "legacy_refresh")
+
+    assert result == ("new_access_token", expires_at)
+    assert mock_generate_token.call_args.args[-2:] == ("client_xyz", "user_abc")
+    mock_pipe.hset.assert_called_once()
+    mock_redis.delete.assert_awaited_once_with("legacy_refresh")
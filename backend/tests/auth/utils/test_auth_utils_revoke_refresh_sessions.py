@@ -0,0 +1,48 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.auth.utils import (
+    REFRESH_RESULT_PREFIX,
+    REFRESH_SESSION_PREFIX,
+    REFRESH_USER_SESSIONS_PREFIX,
+    revoke_refresh_sessions,
+)
+
+
+@pytest.mark.asyncio
+async def test_revoke_refresh_sessions():
+    """
+    Tests that `revoke_refresh_sessions` deletes every session of a user and the
+    user's session set in one pipeline, returning the number of deleted sessions.
+    """
+    mock_redis = AsyncMock()
+    mock_pipe = MagicMock()
+    mock_pipe.execute = AsyncMock(return_value=[2, 1])
+    mock_redis.pipeline = MagicMock()
+    mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipe
+    mock_redis.smembers.return_value = {"session_a", "session_b", "session_c"}
+
+    revoked = await revoke_refresh_sessions(mock_redis, "user_abc")
+
+    assert revoked == 2
+    mock_redis.smembers.assert_called_once_with(REFRESH_USER_SESSIONS_PREFIX + "user_abc")
+    deleted_keys = set(mock_pipe.delete.call_args_list[0].args)
+    assert deleted_keys == {REFRESH_SESSION_PREFIX + s for s in ("session_a", "session_b", "session_c")}
+    revoked_keys = set(mock_pipe.delete.call_args_list[1].args)
+    assert revoked_keys == {REFRESH_USER_SESSIONS_PREFIX + "user_abc"} | {
+        REFRESH_RESULT_PREFIX + s for s in ("session_a", "session_b", "session_c")
+    }
+
+
+@pytest.mark.asyncio
+async def test_revoke_refresh_sessions_without_sessions():
+    """
+    Tests that `revoke_refresh_sessions` does nothing when the user has no sessions.
+    """
+    mock_redis = AsyncMock()
+    mock_redis.pipeline = MagicMock()
+    mock_redis.smembers.return_value = set()
+
+    assert await revoke_refresh_sessions(mock_redis, "user_abc") == 0
+    mock_redis.pipeline.assert_not_called()
@@ -1,21 +1,33 @@
-import json
 from datetime import datetime, timedelta, timezone
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-from app.auth.utils import save_refresh_token
+from app.auth.utils import (
+    REFRESH_SESSION_PREFIX,
+    REFRESH_USER_SESSIONS_PREFIX,
+    refresh_session_id,
+    save_refresh_token,
+)
+
+
+@pytest.fixture
+def mock_redis():
+    mock_redis = AsyncMock()
+    mock_pipe = MagicMock()
+    mock_pipe.execute = AsyncMock()
+    mock_redis.pipeline = MagicMock()
+    mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipe
+    return mock_redis
 
 
 @pytest.mark.asyncio
-async def test_save_refresh_token_with_timedelta_expiration():
+async def test_save_refresh_token_with_timedelta_expiration(mock_redis):
     """
-    Tests that `save_refresh_token` saves a refresh token in Redis with its associated
-    client_id and user_id when given a timedelta expiration time.
-
-    Verifies that the `setex` method is called with the correct arguments.
+    Tests that `save_refresh_token` stores the session hash under its short session id
+    and indexes it in the user's session set, in a single MULTI pipeline, when given
+    an expiration time in seconds.
     """
-    mock_redis = AsyncMock()
     refresh_token = "refresh123"
     expires_in = 3600  # seconds
     client_id = "client_xyz"
@@ -23,21 +35,25 @@ async def test_save_refresh_token_with_timedelta_expiration():
 
     await save_refresh_token(mock_redis, refresh_token, expires_in, client_id, user_id)
 
-    mock_redis.setex.assert_called_once_with(
-        refresh_token, expires_in, json.dumps({"client_id": client_id, "user_id": user_id})
-    )
+    session_id = refresh_session_id(refresh_token)
+    session_key = REFRESH_SESSION_PREFIX + session_id
+    user_key = REFRESH_USER_SESSIONS_PREFIX + user_id
+    mock_pipe = mock_redis.pipeline.return_value.__aenter__.return_value
+
+    mock_redis.pipeline.assert_called_once_with(transaction=True)
+    mock_pipe.hset.assert_called_once_with(session_key, mapping={"c": client_id, "u": user_id})
+    mock_pipe.expire.assert_any_call(session_key, expires_in)
+    mock_pipe.sadd.assert_called_once_with(user_key, session_id)
+    mock_pipe.expire.assert_any_call(user_key, expires_in)
+    mock_pipe.execute.assert_awaited_once()
 
 
 @pytest.mark.asyncio
-async def test_save_refresh_token_with_datetime_expiration():
+async def test_save_refresh_token_with_datetime_expiration(mock_redis):
     """
-    Tests that `save_refresh_token` saves a refresh token in Redis with its associated
-    client_id and user_id when given a datetime expiration time.
-
-    Verifies that the `setex` method is called with the correct arguments. The expiration
-    time should be between 3598 and 3600 seconds.
+    Tests that `save_refresh_token` converts a datetime expiration time to the remaining
+    time to live. The expiration time should be between 3598 and 3600 seconds.
     """
-    mock_redis = AsyncMock()
     refresh_token = "refresh456"
     expires_in = datetime.now(timezone.utc) + timedelta(hours=1)
     client_id = "client_123"
@@ -45,9 +61,20 @@ async def test_save_refresh_token_with_datetime_expiration():
 
     await save_refresh_token(mock_redis, refresh_token, expires_in, client_id, user_id)
 
-    called_args = mock_redis.setex.call_args[0]
-    assert called_args[0] == refresh_token
-    assert called_args[2] == json.dumps({"client_id": client_id, "user_id": user_id})
+    mock_pipe = mock_redis.pipeline.return_value.__aenter__.return_value
+    called_args = mock_pipe.expire.call_args_list[0][0]
+    assert called_args[0] == REFRESH_SESSION_PREFIX + refresh_session_id(refresh_token)
 
     # The expiration time should be between 3598 and 3600 seconds
     assert 3598 <= called_args[1].total_seconds() <= 3600
+
+
+def test_refresh_session_id_is_short_and_stable():
+    """
+    Tests that the session id of a refresh token is a short, stable digest.
+    """
+    refresh_token = "a" * 300
+
+    assert refresh_session_id(refresh_token) == refresh_session_id(refresh_token)
+    assert refresh_session_id(refresh_token) != refresh_session_id("b" * 300)
+    assert len(refresh_session_id(refresh_token)) == 24
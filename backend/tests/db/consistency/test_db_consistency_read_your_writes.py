@@ -0,0 +1,86 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.auth.config import auth_settings
+from app.auth.utils import generate_token
+from app.db.consistency import READ_YOUR_WRITES_PREFIX, mark_written, mark_written_many, request_user_id, wrote_recently
+
+
+@pytest.fixture
+def mock_postgresql_config():
+    with patch("app.db.consistency.postgresql_config") as mock_postgresql_config:
+        mock_postgresql_config.replicas = [MagicMock()]
+        yield mock_postgresql_config
+
+
+@pytest.mark.asyncio
+async def test_request_user_id_reads_access_token_cookie():
+    """
+    Tests that the user of a request comes from a valid access token cookie only.
+    """
+    access_token, _ = await generate_token(
+        "access_token", auth_settings.ACCESS_SECRET_KEY, auth_settings.ALGORITHM, 15, "client_id", "user_id"
+    )
+
+    assert request_user_id(MagicMock(cookies={"access_token": access_token})) == "user_id"
+    assert request_user_id(MagicMock(cookies={"access_token": "invalid"})) is None
+    assert request_user_id(MagicMock(cookies={})) is None
+
+
+@pytest.mark.asyncio
+async def test_mark_written_sets_expiring_marker(mock_postgresql_config):
+    """
+    Tests that a write sets an expiring marker for the user, and that nothing is
+    written without a user or without replicas.
+    """
+    mock_redis = AsyncMock()
+
+    await mark_written(mock_redis, "user_id")
+    mock_redis.set.assert_awaited_once()
+    key, _ = mock_redis.set.call_args.args
+    assert key == READ_YOUR_WRITES_PREFIX + "user_id"
+    assert mock_redis.set.call_args.kwargs["ex"] > 0
+
+    mock_redis.set.reset_mock()
+    await mark_written(mock_redis, None)
+    mock_postgresql_config.replicas = []
+    await mark_written(mock_redis, "user_id")
+    mock_redis.set.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_mark_written_many_sets_markers_in_one_round_trip(mock_postgresql_config):
+    """
+    Tests that the writes of several users set one expiring marker each in a single pipeline.
+    """
+    mock_redis = MagicMock()
+    mock_pipe = MagicMock()
+    mock_pipe.execute = AsyncMock()
+    mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipe
+
+    await mark_written_many(mock_redis, ["user_a", "user_b"])
+
+    assert [call.args[0] for call in mock_pipe.set.call_args_list] == [
+        READ_YOUR_WRITES_PREFIX + "user_a",
+        READ_YOUR_WRITES_PREFIX + "user_b",
+    ]
+    mock_pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_wrote_recently():
+    """
+    Tests that reads go to the primary while the marker exists or when Redis fails.
+    """
+    mock_redis = AsyncMock()
+
+    mock_redis.exists.return_value = 1
+    assert await wrote_recently(mock_redis, "user_id") is True
+
+    mock_redis.exists.return_value = 0
+    assert await wrote_recently(mock_redis, "user_id") is False
+    assert await wrote_recently(mock_redis, None) is False
+
+    mock_redis.exists.side_effect = Exception("connection lost")
+    assert await wrote_recently(mock_redis, "user_id") is True
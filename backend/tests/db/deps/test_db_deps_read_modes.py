@@ -0,0 +1,61 @@
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.db.deps import get_db, read_db_transaction
+
+
+def mock_postgresql_config(db: MagicMock) -> MagicMock:
+    config = MagicMock()
+    config.replicas = []
+
+    @asynccontextmanager
+    async def read_pool(primary: bool = False):
+        yield db
+
+    @asynccontextmanager
+    async def connection(db_pool):
+        config.held = True
+        yield db_pool
+
+    config.read_pool = read_pool
+    config.connection = connection
+    config.held = False
+    return config
+
+
+@pytest.mark.asyncio
+async def test_statement_reads_neither_hold_a_connection_nor_open_a_transaction():
+    """
+    Tests that the statement read mode yields the pool as is, so that each statement
+    runs in autocommit on a connection acquired for it only.
+    """
+    db = MagicMock()
+    config = mock_postgresql_config(db)
+
+    with patch("app.db.deps.postgresql_config", config):
+        dependency = get_db(MagicMock(), MagicMock())
+        assert await anext(dependency) is db
+        await dependency.aclose()
+
+    db.transaction.assert_not_called()
+    assert not config.held
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reads_share_one_read_only_transaction():
+    """
+    Tests that the snapshot read mode holds a connection and opens one repeatable read,
+    read only transaction for the request.
+    """
+    db = MagicMock()
+    config = mock_postgresql_config(db)
+
+    with patch("app.db.deps.postgresql_config", config):
+        dependency = read_db_transaction(MagicMock(), MagicMock())
+        assert await anext(dependency) is db
+        await dependency.aclose()
+
+    db.transaction.assert_called_once_with(isolation="repeatable_read", readonly=True, deferrable=True)
+    assert config.held
@@ -0,0 +1,128 @@
+import itertools
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from asyncpg.exceptions import InvalidSQLStatementNameError
+
+from app.db.postgresql import postgresql_config
+from app.db.statements import statements
+from app.user.services import UserService
+
+
+class ServerConnection:
+    def __init__(self, pid: int):
+        """
+        A PostgreSQL server connection behind the proxy, with its own prepared statements.
+        """
+        self.pid = pid
+        self.prepared: set[str] = set()
+        self.statements: list[str] = []
+
+
+class TransactionPooler:
+    def __init__(self, servers: int):
+        """
+        Stand-in for PgBouncer in transaction pooling mode.
+
+        Every statement outside a transaction runs on the next server connection in
+        turn, so that consecutive statements of a client never share one.
+        """
+        self.servers = [ServerConnection(pid) for pid in range(servers)]
+        self._next = itertools.cycle(self.servers)
+        self._names = itertools.count()
+
+    def assign(self) -> ServerConnection:
+        return next(self._next)
+
+
+class ProxiedPreparedStatement:
+    def __init__(self, pooler: TransactionPooler, name: str, sql: str):
+        self._pooler = pooler
+        self.name = name
+        self.sql = sql
+
+    def _server(self) -> ServerConnection:
+        server = self._pooler.assign()
+        if self.name not in server.prepared:
+            raise InvalidSQLStatementNameError(f'prepared statement "{self.name}" does not exist')
+        server.statements.append(self.sql)
+        return server
+
+    async def fetchrow(self, *args):
+        return {"server": self._server().pid}
+
+    async def fetch(self, *args) -> list:
+        return [{"server": self._server().pid}]
+
+    def get_statusmsg(self) -> str:
+        return "UPDATE 1"
+
+
+class ProxiedConnection:
+    def __init__(self, pooler: TransactionPooler):
+        """
+        Stand-in for an asyncpg connection to the proxy.
+        """
+        self._pooler = pooler
+
+    async def prepare(self, sql: str, record_class: type | None = None) -> ProxiedPreparedStatement:
+        name = f"__asyncpg_stmt_{next(self._pooler._names)}__"
+        self._pooler.assign().prepared.add(name)
+        return ProxiedPreparedStatement(self._pooler, name, sql)
+
+    async def fetchrow(self, sql: str, *args, record_class: type | None = None):
+        # An unnamed statement is parsed, bound and executed on one server connection
+        server = self._pooler.assign()
+        server.statements.append(sql)
+        return {"server": server.pid}
+
+    async def fetch(self, sql: str, *args, record_class: type | None = None) -> list:
+        return [await self.fetchrow(sql, *args)]
+
+    async def execute(self, sql: str, *args) -> str:
+        await self.fetchrow(sql, *args)
+        return "UPDATE 1"
+
+
+@pytest.fixture
+def pooler() -> TransactionPooler:
+    return TransactionPooler(servers=3)
+
+
+@pytest.fixture
+def proxied_db(pooler) -> MagicMock:
+    db = MagicMock()
+    db.connection.return_value.__aenter__.return_value = SimpleNamespace(raw_connection=ProxiedConnection(pooler))
+    return db
+
+
+@pytest.mark.asyncio
+async def test_prepared_statements_break_behind_transaction_pooler(monkeypatch, proxied_db):
+    """
+    Tests that the stand-in reproduces the failure of session pool mode behind PgBouncer:
+    a statement prepared on one server connection is missing on the next.
+    """
+    monkeypatch.setattr(postgresql_config, "pool_mode", "session")
+    monkeypatch.setattr(statements, "_prepared", type(statements._prepared)())
+
+    with pytest.raises(InvalidSQLStatementNameError):
+        await UserService(proxied_db).get_user("alice")
+
+
+@pytest.mark.asyncio
+async def test_service_layer_runs_behind_transaction_pooler(monkeypatch, pooler, proxied_db):
+    """
+    Tests that in transaction pool mode the service layer runs its registered statements
+    across server connections, as unnamed statements that keep no state on them.
+    """
+    monkeypatch.setattr(postgresql_config, "pool_mode", "transaction")
+    service = UserService(proxied_db)
+
+    for _ in range(len(pooler.servers)):
+        assert await service.get_user("alice") is not None
+    await service.update_user_password_hash("user-id", "new-hash")
+
+    assert all(not server.prepared for server in pooler.servers)
+    assert all(statements.get("get_user").sql in server.statements for server in pooler.servers)
+    assert statements.get("update_user_password_hash").sql in pooler.servers[0].statements
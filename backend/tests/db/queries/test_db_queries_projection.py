@@ -0,0 +1,60 @@
+import asyncpg
+import pytest
+from sqlalchemy import bindparam, select
+
+import app.user.services  # noqa: F401
+from app.db.queries import column_list, columns, compile_query, row_class
+from app.db.statements import Row, Statement, statements
+from app.user.models import Profile, User
+from app.user.schemas import ProfileOut
+
+
+def test_columns_follow_the_output_schema():
+    """
+    Tests that a schema selects exactly its fields, in its order, and that a field
+    that is not a column is rejected.
+    """
+    assert [column.name for column in columns(Profile, ProfileOut)] == list(ProfileOut.model_fields)
+    assert column_list(User, ["id", "current_client_id"]) == "id, current_client_id"
+    with pytest.raises(ValueError):
+        columns(User, ["id", "password"])
+
+
+def test_compiled_query_runs_through_the_registry():
+    """
+    Tests that a SQLAlchemy Core statement compiles to named parameters the registry
+    turns into positional ones, leaving the dialect's casts alone.
+    """
+    sql = compile_query(
+        select(*columns(User, ["id"])).where(
+            (User.c.username == bindparam("username")) | (User.c.email == bindparam("username"))
+        )
+    )
+    statement = Statement("test", sql)
+
+    assert statement.params == ["username"]
+    assert "users.username = $1::VARCHAR OR users.email = $1::VARCHAR" in statement.sql
+
+
+def test_row_class_is_slotted_and_typed():
+    """
+    Tests that a row class adds no instance dict to asyncpg's records and lists its columns.
+    """
+    ProfileRow = row_class("ProfileRow", Profile, ProfileOut)
+
+    assert issubclass(ProfileRow, Row)
+    assert ProfileRow.__dictoffset__ == asyncpg.Record.__dictoffset__ == 0
+    assert ProfileRow.fields == tuple(ProfileOut.model_fields)
+    assert all(type(field) is str for field in ProfileRow.fields)
+
+
+def test_hot_statements_select_only_what_they_return():
+    """
+    Tests that the profile and authentication statements no longer select every column.
+    """
+    assert "*" not in statements.get("get_profile").sql
+    assert "hashed_password" not in statements.get("get_profile").sql
+    assert statements.get("get_profile").row.fields == tuple(ProfileOut.model_fields)
+    assert statements.get("get_user").row.fields == ("id", "hashed_password", "current_client_id")
+    assert "new_profile.*" in statements.get("create_user_with_profile").sql
+    assert "RETURNING *" not in statements.get("create_user_with_profile").sql
@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.auth.utils import REFRESH_RESULT_PREFIX, REFRESH_SESSION_PREFIX, refresh_access_token, refresh_session_id
+from app.db.redis import ClientSideCache
+
+
+def tracking_cache() -> ClientSideCache:
+    cache = ClientSideCache(prefixes=["rt:"], max_size=10, ttl=60)
+    cache.tracking = True
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_client_cache_serves_tracked_keys_until_invalidated():
+    """
+    Tests that a tracked key is read from Redis once, then served locally until Redis
+    pushes its invalidation, and that keys outside the prefixes are never cached.
+    """
+    cache = tracking_cache()
+    read = AsyncMock(return_value={"c": "client_xyz", "u": "user_abc"})
+
+    assert await cache.fetch("rt:abc", read) == {"c": "client_xyz", "u": "user_abc"}
+    assert await cache.fetch("rt:abc", read) == {"c": "client_xyz", "u": "user_abc"}
+    assert read.await_count == 1
+
+    await cache.invalidate(["invalidate", ["rt:abc"]])
+    await cache.fetch("rt:abc", read)
+    assert read.await_count == 2
+
+    await cache.fetch("profile:abc", read)
+    await cache.fetch("profile:abc", read)
+    assert read.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_client_cache_drops_reads_invalidated_in_flight():
+    """
+    Tests that a value read while its key was invalidated is not cached, since it may
+    predate the write, and that a flush fails every read in flight.
+    """
+    cache = tracking_cache()
+
+    async def read_during_invalidation():
+        await cache.invalidate(["invalidate", ["rt:abc"]])
+        return {"u": "stale"}
+
+    async def read_during_flush():
+        await cache.invalidate(["invalidate", None])
+        return {"u": "stale"}
+
+    await cache.fetch("rt:abc", read_during_invalidation)
+    await cache.fetch("rt:def", read_during_flush)
+
+    assert cache.get("rt:abc") is None
+    assert cache.get("rt:def") is None
+    assert cache.invalidations == 2
+
+
+@pytest.mark.asyncio
+async def test_client_cache_is_bypassed_while_not_tracking():
+    """
+    Tests that nothing is cached or served while no invalidations are received.
+    """
+    cache = ClientSideCache(prefixes=["rt:"], max_size=10, ttl=60)
+    read = AsyncMock(return_value={"u": "user_abc"})
+
+    await cache.fetch("rt:abc", read)
+    await cache.fetch("rt:abc", read)
+
+    assert read.await_count == 2
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_client_cache_is_disabled_without_invalidation_push_support():
+    """
+    Tests that tracking gives up, leaving the cache bypassed, when the redis-py connection
+    has no way to receive invalidation pushes.
+    """
+    cache = ClientSideCache(prefixes=["rt:"], max_size=10, ttl=60)
+    connection = MagicMock()
+    connection.connect = AsyncMock()
+    connection.disconnect = AsyncMock()
+    connection.send_command = AsyncMock()
+    connection._parser = object()
+
+    await asyncio.wait_for(cache.track(lambda: connection), timeout=1)
+
+    connection.send_command.assert_not_called()
+    connection.disconnect.assert_awaited_once()
+    assert cache.stats()["tracking"] is False
+
+
+@pytest.mark.asyncio
+async def test_refresh_access_token_reuses_cached_session_and_result():
+    """
+    Tests that with client-side caching on, a refresh skips reading a cached session,
+    and a later refresh returns the cached shared result without a round trip.
+    """
+    cache = tracking_cache()
+    session_id = refresh_session_id("refresh123")
+    cache.local.set(REFRESH_SESSION_PREFIX + session_id, {"c": "client_xyz", "u": "user_abc"})
+    expires_at = datetime.now(timezone.utc).replace(microsecond=0)
+
+    mock_redis = AsyncMock()
+    mock_pipe = MagicMock()
+    mock_pipe.execute = AsyncMock(return_value=[f"shared_access_token {expires_at.timestamp()}", False])
+    mock_redis.pipeline = MagicMock()
+    mock_redis.pipeline.return_value.__aenter__.return_value = mock_pipe
+
+    with patch("app.auth.utils.client_cache", cache):
+        first = await refresh_access_token(mock_redis, "refresh123")
+        await asyncio.sleep(0)
+        second = await refresh_access_token(mock_redis, "refresh123")
+
+    assert first == second == ("shared_access_token", expires_at)
+    mock_pipe.hgetall.assert_not_called()
+    assert mock_pipe.execute.await_count == 1
+    assert cache.get(REFRESH_RESULT_PREFIX + session_id) is not None
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from app.db.redis import RedisConfig
+
+
+async def read_command(reader: asyncio.StreamReader) -> list[str]:
+    count = int((await reader.readline())[1:])
+    command = []
+    for _ in range(count):
+        length = int((await reader.readline())[1:])
+        command.append((await reader.readexactly(length + 2))[:-2].decode())
+    return command
+
+
+async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """
+    Answer like a Redis server that never publishes: PING, SUBSCRIBE, and OK to the rest.
+    """
+    try:
+        while True:
+            command = await read_command(reader)
+            name = command[0].upper()
+            if name == "PING":
+                writer.write(b"+PONG\r\n")
+            elif name == "SUBSCRIBE":
+                channel = command[1].encode()
+                writer.write(b"*3\r\n$9\r\nsubscribe\r\n$%d\r\n%s\r\n:1\r\n" % (len(channel), channel))
+            else:
+                writer.write(b"+OK\r\n")
+            await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError, ValueError):
+        writer.close()
+
+
+@pytest.mark.asyncio
+async def test_idle_subscription_outlives_the_socket_timeout():
+    """
+    Tests that a subscriber waiting on an idle channel is not interrupted by the read
+    timeout of commands.
+    """
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    config = RedisConfig(host="127.0.0.1", port=port, decode_responses=True, socket_timeout=0.1)
+    await config.connect()
+    pubsub = config.pubsub()
+    try:
+        await pubsub.subscribe("profile:invalidate")
+
+        async def listen():
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    return message
+
+        listener = asyncio.create_task(listen())
+        await asyncio.sleep(0.5)
+
+        assert not listener.done()
+        assert pubsub.connection.socket_timeout is None
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+    finally:
+        await pubsub.aclose()
+        await config.disconnect()
+        server.close()
+        await server.wait_closed()
@@ -0,0 +1,153 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from asyncpg.exceptions import InvalidCachedStatementError
+from asyncpg.pool import PoolConnectionProxy
+
+from app.db.statements import Row, Statement, StatementRegistry
+
+
+class MockConnection:
+    def __init__(self):
+        self.prepared = MagicMock()
+        self.prepared.fetchrow = AsyncMock(return_value="row")
+        self.prepared.fetch = AsyncMock(return_value=[])
+        self.prepared.get_statusmsg = MagicMock(return_value="UPDATE 1")
+        self.prepare = AsyncMock(return_value=self.prepared)
+        self.in_transaction = False
+
+    def is_in_transaction(self):
+        return self.in_transaction
+
+    def _set_proxy(self, proxy):
+        pass
+
+
+def mock_db(raw_connection) -> MagicMock:
+    db = MagicMock()
+    db.connection.return_value.__aenter__.return_value = SimpleNamespace(raw_connection=raw_connection)
+    return db
+
+
+def test_statement_compiles_named_parameters():
+    """
+    Tests that named parameters are numbered in order of first use, that a repeated
+    parameter reuses its number and that type casts are left alone.
+    """
+    statement = Statement(
+        "test",
+        "SELECT :b::text, CAST(:a AS uuid) FROM users WHERE username = :b AND created_at > NOW()::date",
+    )
+
+    assert (
+        statement.sql == "SELECT $1::text, CAST($2 AS uuid) FROM users WHERE username = $1 AND created_at > NOW()::date"
+    )
+    assert statement.params == ["b", "a"]
+    assert statement.args({"a": 1, "b": 2}) == [2, 1]
+
+
+def test_register_rejects_another_query_under_the_same_name():
+    """
+    Tests that a name can be registered again with the same query but not with another one.
+    """
+    registry = StatementRegistry()
+    statement = registry.register("get_user", "SELECT * FROM users WHERE id = :user_id")
+
+    assert registry.register("get_user", "SELECT * FROM users WHERE id = :user_id") is statement
+    with pytest.raises(ValueError):
+        registry.register("get_user", "SELECT * FROM users WHERE username = :username")
+
+
+@pytest.mark.asyncio
+async def test_statement_is_prepared_once_per_connection():
+    """
+    Tests that a statement is prepared on the first execution on a connection, reused
+    by later executions on the same connection, also through a new pool proxy, and
+    prepared again on another connection.
+    """
+    registry = StatementRegistry()
+    registry.register("get_user", "SELECT * FROM users WHERE id = :user_id")
+    connection, other_connection = MockConnection(), MockConnection()
+
+    assert await registry.fetch_one(mock_db(connection), "get_user", {"user_id": "1"}) == "row"
+    await registry.fetch_one(mock_db(PoolConnectionProxy(MagicMock(), connection)), "get_user", {"user_id": "2"})
+    await registry.fetch_one(mock_db(other_connection), "get_user", {"user_id": "3"})
+
+    connection.prepare.assert_awaited_once_with("SELECT * FROM users WHERE id = $1", record_class=Row)
+    assert connection.prepared.fetchrow.await_args_list[1].args == ("2",)
+    other_connection.prepare.assert_awaited_once()
+    assert registry.stats()["get_user"]["calls"] == 3
+    assert registry.stats()["get_user"]["prepares"] == 2
+
+
+@pytest.mark.asyncio
+async def test_statement_prepared_against_an_older_schema_is_prepared_again():
+    """
+    Tests that a statement invalidated by a schema change is prepared again and run once
+    more outside a transaction, that within one the error is raised, and that it is then
+    prepared again on every connection.
+    """
+    registry = StatementRegistry()
+    registry.register("get_user", "SELECT * FROM users WHERE id = :user_id")
+    connection, other_connection = MockConnection(), MockConnection()
+    await registry.fetch_one(mock_db(other_connection), "get_user", {"user_id": "1"})
+    invalidated = InvalidCachedStatementError("cached statement plan is invalid")
+
+    connection.prepared.fetchrow.side_effect = [invalidated, "row"]
+    assert await registry.fetch_one(mock_db(connection), "get_user", {"user_id": "1"}) == "row"
+    assert connection.prepare.await_count == 2
+
+    connection.in_transaction = True
+    connection.prepared.fetchrow.side_effect = [invalidated]
+    with pytest.raises(InvalidCachedStatementError):
+        await registry.fetch_one(mock_db(connection), "get_user", {"user_id": "1"})
+    assert connection.prepare.await_count == 2
+
+    connection.prepared.fetchrow.side_effect = None
+    await registry.fetch_one(mock_db(connection), "get_user", {"user_id": "1"})
+    await registry.fetch_one(mock_db(other_connection), "get_user", {"user_id": "1"})
+    assert (connection.prepare.await_count, other_connection.prepare.await_count) == (3, 2)
+
+
+@pytest.mark.asyncio
+async def test_execute_returns_status_and_counts_errors():
+    """
+    Tests that execute returns the command status and that failed executions are counted.
+    """
+    registry = StatementRegistry()
+    registry.register("touch_user", "UPDATE users SET updated_at = NOW() WHERE id = :user_id")
+    connection = MockConnection()
+    db = mock_db(connection)
+
+    assert await registry.execute(db, "touch_user", {"user_id": "1"}) == "UPDATE 1"
+
+    connection.prepared.fetch.side_effect = Exception("connection lost")
+    with pytest.raises(Exception):
+        await registry.execute(db, "touch_user", {"user_id": "1"})
+
+    stats = registry.stats()["touch_user"]
+    assert (stats["calls"], stats["errors"], stats["prepares"]) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_warm_prepares_every_statement_on_distinct_connections():
+    """
+    Tests that warming holds the requested number of pool connections at once, prepares
+    every statement on each of them, releases them all, and logs a failed prepare
+    instead of raising.
+    """
+    registry = StatementRegistry()
+    registry.register("get_user", "SELECT * FROM users WHERE id = :user_id")
+    registry.register("get_profile", "SELECT * FROM profiles WHERE user_id = :user_id")
+    connections = [MockConnection(), MockConnection(), MockConnection()]
+    connections[2].prepare = AsyncMock(side_effect=[connections[2].prepared, Exception("boom")])
+    db = MagicMock()
+    db._backend._pool.acquire = AsyncMock(side_effect=connections)
+    db._backend._pool.release = AsyncMock()
+
+    assert await registry.warm(db, 3) == 5
+
+    assert connections[0].prepare.await_count == 2
+    assert connections[1].prepare.await_count == 2
+    assert [call.args[0] for call in db._backend._pool.release.await_args_list] == connections
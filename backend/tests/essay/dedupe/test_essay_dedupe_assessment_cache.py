@@ -0,0 +1,143 @@
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+import pytest
+
+from app.essay import dedupe, worker
+from app.essay.dedupe import AssessmentCache, content_hash, normalize_content
+from app.essay.queue import ScoringQueue
+from app.essay.scoring import SCORE_COLUMNS, scorer
+from app.essay.worker import ScoringWorker
+
+QUESTION_ID = "44444444-4444-4444-4444-444444444444"
+SCORES = {column: "Feedback." if column.endswith("_feedback") else 6.5 for column in SCORE_COLUMNS}
+
+
+def mock_redis(cached: list | None = None) -> tuple[MagicMock, MagicMock]:
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    redis = MagicMock()
+    redis.mget = AsyncMock(return_value=cached or [])
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+    return redis, pipe
+
+
+@pytest.fixture
+def cache() -> AssessmentCache:
+    return AssessmentCache(ttl=60, lock_ttl_ms=1000, lock_wait=0.05, poll_interval=0.01)
+
+
+def test_content_hash_ignores_whitespace_but_not_paragraphs():
+    """
+    Tests that essays differing only by whitespace within paragraphs share a hash, and that
+    the paragraphs, the question and the scorer version are part of it.
+    """
+    content = "First  paragraph,\tone sentence.\n\nSecond paragraph."
+
+    assert normalize_content(f"  {content}\n") == "First paragraph, one sentence.\n\nSecond paragraph."
+    assert normalize_content("One.\r\n \r\n\n\nTwo.\nThree.") == "One.\n\nTwo.\n\nThree."
+    digest = content_hash("v1", QUESTION_ID, content)
+    assert content_hash("v1", QUESTION_ID, content.replace("  ", " ") + "\n\n\n") == digest
+    assert content_hash("v1", QUESTION_ID, content.replace("\n\n", " ")) != digest
+    assert content_hash("v1", None, content) != digest
+    assert content_hash("v2", QUESTION_ID, content) != digest
+
+
+@pytest.mark.asyncio
+async def test_get_many_falls_back_to_postgresql_and_fills_redis(cache, monkeypatch):
+    """
+    Tests that hashes missing from Redis are looked up in PostgreSQL in one statement, and
+    that those found there are copied to Redis with plain numbers.
+    """
+    redis, pipe = mock_redis([orjson.dumps({"assessment_id": "a", **SCORES}).decode(), None, None])
+    row = {"id": "b", "content_hash": "h2", **SCORES, "overall_score": Decimal("7.0")}
+    fetch_all = AsyncMock(return_value=[row])
+    monkeypatch.setattr(dedupe.statements, "fetch_all", fetch_all)
+
+    found = await cache.get_many(redis, MagicMock(), ["h1", "h2", "h3"])
+
+    assert found == {
+        "h1": {"assessment_id": "a", **SCORES},
+        "h2": {"assessment_id": "b", **SCORES, "overall_score": 7.0},
+    }
+    assert fetch_all.await_args.args[2] == {"content_hashes": ["h2", "h3"]}
+    pipe.set.assert_called_once_with("essay:assessment:h2", orjson.dumps(found["h2"]), ex=60)
+    assert cache.stats() == {"redis_hits": 1, "db_hits": 1, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_score_reuses_assessments_and_scores_each_locked_hash_once(cache, monkeypatch):
+    """
+    Tests that a batch scores each new hash once, under its lock, reuses the scores of a
+    hash assessed already and of a hash another worker published while it waited, and
+    publishes the scores it computed.
+    """
+    essays = {
+        "new": "A new essay. It was never scored.",
+        "new-again": "A new essay.  It was never scored.\n",
+        "known": "An essay scored yesterday.",
+        "busy": "An essay another worker is scoring.",
+    }
+    rows = [
+        SimpleNamespace(id=essay_id, created_at=None, client_id="c", owner_id="o", question_id=None, content=content)
+        for essay_id, content in essays.items()
+    ]
+    digests = {essay_id: content_hash(scorer.version, None, content) for essay_id, content in essays.items()}
+    created = []
+
+    async def fetch_all(db, name, values):
+        if name == "get_essays_to_score":
+            return rows
+        created.append(values)
+        return [SimpleNamespace(id=f"assessment-{essay_id}", essay_id=essay_id) for essay_id in values["essay_ids"]]
+
+    monkeypatch.setattr(worker.statements, "fetch_all", fetch_all)
+    cache.get_many = AsyncMock(return_value={digests["known"]: {"assessment_id": "old", **SCORES}})
+    cache.acquire = AsyncMock(side_effect=lambda redis, hashes, token: [h for h in hashes if h != digests["busy"]])
+    cache.release = AsyncMock()
+    cache.wait = AsyncMock(return_value={digests["busy"]: {"assessment_id": "other", **SCORES}})
+    cache.set_many = AsyncMock()
+    band_scorer = MagicMock(wraps=scorer, version=scorer.version)
+    scoring_worker = ScoringWorker(
+        queue=ScoringQueue(stream="essay:scoring", group="scorers", max_len=1000, job_ttl=60, max_attempts=3),
+        scorer=band_scorer,
+        cache=cache,
+        consumer="worker",
+        batch_size=10,
+        block_ms=100,
+        claim_idle_ms=5000,
+        claim_interval=1,
+    )
+    jobs = [{"essay_id": essay_id, "essay_created_at": "2026-10-17T12:00:00+00:00"} for essay_id in essays]
+
+    assessments = await scoring_worker.score(MagicMock(), MagicMock(), jobs)
+
+    assert assessments == {essay_id: f"assessment-{essay_id}" for essay_id in essays}
+    band_scorer.score.assert_called_once_with(["A new essay. It was never scored."])
+    assert [values["essay_ids"] for values in created] == [["new", "new-again", "known"], ["busy"]]
+    assert created[0]["content_hashes"] == [digests["new"], digests["new"], digests["known"]]
+    assert created[0]["overall_scores"][2] == 6.5 and created[1]["overall_scores"] == [6.5]
+    _, locked, token = cache.release.await_args.args
+    assert locked == [digests["new"]] and token.startswith("worker:")
+    cache.wait.assert_awaited_once_with(cache.wait.await_args.args[0], [digests["busy"]])
+    published = cache.set_many.await_args_list[0].args[1]
+    assert list(published) == [digests["new"]] and published[digests["new"]]["assessment_id"] == "assessment-new"
+    assert scoring_worker.reused == 2
+
+
+@pytest.mark.asyncio
+async def test_wait_returns_the_hashes_published_in_time(cache):
+    """
+    Tests that waiting for locked hashes returns those another worker published, and gives
+    up on the others after lock_wait.
+    """
+    published = orjson.dumps({"assessment_id": "a", **SCORES}).decode()
+    redis, _ = mock_redis()
+    redis.mget = AsyncMock(side_effect=[[None, None], [published, None], [None], [None], [None], [None], [None]] * 2)
+
+    found = await cache.wait(redis, ["h1", "h2"])
+
+    assert found == {"h1": {"assessment_id": "a", **SCORES}}
+    assert redis.mget.await_args.args[0] == ["essay:assessment:h2"]
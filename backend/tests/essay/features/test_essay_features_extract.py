@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from app.essay.features.extract import extract_features
+from app.essay.features.tokens import PARAGRAPH_BREAK, SENTENCE_END, WORD, tokenize
+
+ESSAY = "The cat sat on the mat. It was happy!\n\nThen it left... The end"
+
+
+def test_tokenize_splits_words_sentences_and_paragraphs():
+    """
+    Tests that words keep their inner apostrophes and hyphens, that runs of punctuation and
+    blank lines are single tokens, and that the same word gets the same hash in any case.
+    """
+    batch = tokenize(["Don't go.\n  \nWell-known... don't", "", "GO"])
+
+    assert batch.offsets.tolist() == [0, 7, 7, 8]
+    assert batch.kinds.tolist() == [WORD, WORD, SENTENCE_END, PARAGRAPH_BREAK, WORD, SENTENCE_END, WORD, WORD]
+    assert batch.lengths[batch.kinds == WORD].tolist() == [5, 2, 10, 5, 2]
+    assert batch.hashes[0] == batch.hashes[6]
+    assert batch.hashes[1] == batch.hashes[7]
+    assert len(set(batch.hashes[batch.kinds == WORD].tolist())) == 3
+
+
+def test_tokenize_breaks_paragraphs_on_a_single_newline():
+    """
+    Tests that a single newline separates two paragraphs like a blank line does, and that
+    the blank lines after a newline do not add paragraph breaks.
+    """
+    single = extract_features([ESSAY.replace("\n\n", "\n"), "One\nTwo\r\nThree \n \n\nFour"])
+
+    assert single["paragraph_count"].tolist() == [2, 4]
+    assert tokenize(["One\n \n\nTwo"]).kinds.tolist() == [WORD, PARAGRAPH_BREAK, WORD]
+    for name, values in extract_features([ESSAY]).items():
+        assert np.allclose(single[name][0], values[0]), name
+
+
+def test_tokenize_keeps_decimals_and_abbreviations_in_their_sentence():
+    """
+    Tests that a period between letters or digits is part of the word, and that the period
+    closing an abbreviation does not end the sentence, unlike the one after a number.
+    """
+    features = extract_features(["Don't stop. It's U.S.A. e.g. 3.5 percent! Really?", "It rose 3.5. Then fell."])
+
+    assert features["word_count"].tolist() == [8, 5]
+    assert features["sentence_count"].tolist() == [3, 2]
+    assert features["sentence_length_max"].tolist() == [5, 3]
+
+
+def test_extract_features_of_an_essay():
+    """
+    Tests the counts, distributions and ratios of an essay against values worked out by hand.
+    """
+    features = extract_features([ESSAY])
+
+    assert features["word_count"].tolist() == [14]
+    assert features["sentence_count"].tolist() == [4]
+    assert features["paragraph_count"].tolist() == [2]
+    assert features["sentence_length_mean"].tolist() == [3.5]
+    assert features["sentence_length_std"].tolist() == [1.5]
+    assert features["sentence_length_max"].tolist() == [6]
+    assert features["sentence_length_histogram"].tolist() == [[1.0, 0.0, 0.0, 0.0, 0.0]]
+    assert features["type_token_ratio"] == pytest.approx([11 / 14])
+    assert features["lexical_density"] == pytest.approx([6 / 14])
+    assert features["word_length_mean"] == pytest.approx([43 / 14])
+    assert features["paragraph_length_mean"].tolist() == [7.0]
+    assert features["paragraph_length_std"].tolist() == [2.0]
+    assert features["sentences_per_paragraph"].tolist() == [2.0]
+
+
+def test_extract_features_of_a_batch_matches_each_essay_alone():
+    """
+    Tests that essays of a batch do not affect each other, including empty ones, and that an
+    empty batch has empty features.
+    """
+    essays = [ESSAY, "", "   \n\n  ", "One sentence without an end", ESSAY.upper()]
+
+    batch = extract_features(essays)
+
+    for i, essay in enumerate(essays):
+        alone = extract_features([essay])
+        for name, values in batch.items():
+            assert np.allclose(values[i], alone[name][0]), (name, i)
+    assert batch["word_count"].tolist() == [14, 0, 0, 5, 14]
+    assert batch["type_token_ratio"][4] == batch["type_token_ratio"][0]
+    assert all(len(values) == 0 for values in extract_features([]).values())
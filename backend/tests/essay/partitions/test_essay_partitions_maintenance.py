@@ -0,0 +1,78 @@
+from datetime import date, datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.essay.partitions import LOCK_QUERY, PartitionMaintenance, add_months, create_partition_query
+
+NOW = datetime(2026, 11, 20, 23, 30, tzinfo=timezone.utc)
+
+
+def mock_db(partitions: dict[str, list[str]]) -> MagicMock:
+    db = MagicMock()
+    db.execute = AsyncMock()
+    db.fetch_all = AsyncMock(side_effect=lambda query, values: [{"name": name} for name in partitions[values["table"]]])
+    return db
+
+
+def executed(db: MagicMock) -> list[str]:
+    return [call.args[0] for call in db.execute.await_args_list]
+
+
+def test_partition_query_bounds_the_month_in_utc():
+    """
+    Tests that months roll over years and that a partition covers its month in UTC.
+    """
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert create_partition_query("essay_contents", date(2026, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS essay_contents_y2026m12 PARTITION OF essay_contents "
+        "FOR VALUES FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')"
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_partitions_adds_the_missing_months_ahead():
+    """
+    Tests that the partitions from the current month to months_ahead later are created
+    for both tables, except those that exist, under the advisory lock.
+    """
+    db = mock_db({"essay_assessments": [], "essay_contents": ["essay_contents_y2026m11", "essay_contents_y2026m12"]})
+    maintenance = PartitionMaintenance(months_ahead=2, retention_months=0, check_interval=60)
+
+    created = await maintenance.create_partitions(db, now=NOW)
+
+    assert created == [
+        "essay_assessments_y2026m11",
+        "essay_assessments_y2026m12",
+        "essay_assessments_y2027m01",
+        "essay_contents_y2027m01",
+    ]
+    assert executed(db)[0] == LOCK_QUERY
+    assert await maintenance.drop_expired_partitions(db, now=NOW) == []
+
+
+@pytest.mark.asyncio
+async def test_drop_expired_partitions_drops_referencing_months_first():
+    """
+    Tests that months before the retention window are detached and dropped, assessments
+    before the essays they reference, and that other tables of the parent are left alone.
+    """
+    db = mock_db(
+        {
+            "essay_assessments": ["essay_assessments_y2026m08", "essay_assessments_y2026m09"],
+            "essay_contents": ["essay_contents_y2026m09", "essay_contents_y2026m08", "essay_contents_archive"],
+        }
+    )
+    maintenance = PartitionMaintenance(months_ahead=2, retention_months=2, check_interval=60)
+
+    dropped = await maintenance.drop_expired_partitions(db, now=NOW)
+
+    assert dropped == ["essay_assessments_y2026m08", "essay_contents_y2026m08"]
+    assert executed(db) == [
+        LOCK_QUERY,
+        "ALTER TABLE essay_assessments DETACH PARTITION essay_assessments_y2026m08",
+        "DROP TABLE essay_assessments_y2026m08",
+        "ALTER TABLE essay_contents DETACH PARTITION essay_contents_y2026m08",
+        "DROP TABLE essay_contents_y2026m08",
+    ]
@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from redis.exceptions import ResponseError
+
+from app.essay.queue import ScoringQueue
+
+ESSAY = {
+    "id": "11111111-1111-1111-1111-111111111111",
+    "created_at": datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc),
+    "client_id": "22222222-2222-2222-2222-222222222222",
+    "owner_id": "33333333-3333-3333-3333-333333333333",
+}
+
+
+def mock_redis(results: list | None = None) -> tuple[MagicMock, MagicMock]:
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=results or [])
+    redis = MagicMock()
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+    return redis, pipe
+
+
+@pytest.fixture
+def queue() -> ScoringQueue:
+    return ScoringQueue(stream="essay:scoring", group="scorers", max_len=1000, job_ttl=60, max_attempts=3)
+
+
+@pytest.mark.asyncio
+async def test_enqueue_stores_the_status_and_adds_the_job_in_one_round_trip(queue):
+    """
+    Tests that enqueue sets the job status, its expiry and the stream entry in one pipeline.
+    """
+    redis, pipe = mock_redis()
+
+    job_id = await queue.enqueue(redis, ESSAY)
+
+    pipe.hset.assert_called_once_with(
+        queue.job_key(job_id), mapping={"status": "queued", "essay_id": ESSAY["id"], "owner_id": ESSAY["owner_id"]}
+    )
+    pipe.expire.assert_called_once_with(queue.job_key(job_id), 60)
+    pipe.xadd.assert_called_once_with(
+        "essay:scoring",
+        {
+            "job_id": job_id,
+            "essay_id": ESSAY["id"],
+            "essay_created_at": "2026-10-17T12:00:00+00:00",
+            "client_id": ESSAY["client_id"],
+            "owner_id": ESSAY["owner_id"],
+        },
+        maxlen=1000,
+        approximate=True,
+    )
+    pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_read_and_claim_skip_entries_trimmed_from_the_stream(queue):
+    """
+    Tests that the replies of XREADGROUP and XAUTOCLAIM are flattened to message ids and
+    jobs, without the entries deleted from the stream.
+    """
+    redis = MagicMock()
+    redis.xreadgroup = AsyncMock(return_value=[["essay:scoring", [("1-0", {"job_id": "a"}), ("2-0", {})]]])
+    redis.xautoclaim = AsyncMock(return_value=["0-0", [("3-0", {"job_id": "b"}), (None, None)], []])
+
+    assert await queue.read(redis, "worker", 10, 100) == [("1-0", {"job_id": "a"})]
+    assert await queue.claim_stalled(redis, "worker", 10, 5000) == [("3-0", {"job_id": "b"})]
+    redis.xreadgroup.assert_awaited_once_with("scorers", "worker", {"essay:scoring": ">"}, count=10, block=100)
+
+    redis.xreadgroup = AsyncMock(return_value=None)
+    assert await queue.read(redis, "worker", 10, 100) == []
+
+
+@pytest.mark.asyncio
+async def test_create_group_ignores_an_existing_group(queue):
+    """
+    Tests that creating the consumer group twice succeeds and that other errors are raised.
+    """
+    redis = MagicMock()
+    redis.xgroup_create = AsyncMock(side_effect=ResponseError("BUSYGROUP Consumer Group name already exists"))
+    await queue.create_group(redis)
+
+    redis.xgroup_create = AsyncMock(side_effect=ResponseError("WRONGTYPE"))
+    with pytest.raises(ResponseError):
+        await queue.create_group(redis)
+
+
+@pytest.mark.asyncio
+async def test_enqueue_many_queues_a_batch_in_one_round_trip(queue):
+    """
+    Tests that a batch of essays gets one job each, all sent in a single pipeline.
+    """
+    redis, pipe = mock_redis()
+    essays = [{**ESSAY, "id": f"essay-{i}"} for i in range(3)]
+
+    job_ids = await queue.enqueue_many(redis, essays)
+
+    assert len(set(job_ids)) == 3
+    assert [call.args[1]["essay_id"] for call in pipe.xadd.call_args_list] == ["essay-0", "essay-1", "essay-2"]
+    redis.pipeline.assert_called_once_with(transaction=False)
+    pipe.execute.assert_awaited_once()
@@ -0,0 +1,73 @@
+import numpy as np
+import orjson
+import pytest
+
+from app.essay.scoring import CRITERIA, BandScorer, load_band_model, round_criterion, round_overall, scorer
+
+ESSAY = """Some people believe that university education should be free for everyone, while others argue that \
+students should pay for their own studies. In this essay I will discuss both views and give my own opinion.
+
+On the one hand, free higher education gives talented students from poor families the opportunity to develop \
+their abilities. When tuition fees are removed, the decision to study depends on merit rather than on wealth, which \
+benefits society as a whole. Furthermore, a well-educated workforce attracts investment and raises productivity.
+
+On the other hand, universities are expensive to run, and public money is limited. Critics point out that \
+graduates usually earn more than other workers, so it seems fair that they contribute to the cost of their degrees.
+
+In conclusion, although there are strong arguments on both sides, I believe that education should be affordable \
+for all, and a mixed system of grants and loans can achieve this goal."""
+
+
+def test_rounding_follows_the_official_half_bands():
+    """
+    Tests that criteria round to whole bands, that overall means ending in .25 and .75 round
+    up, and that bands stay within 0-9.
+    """
+    assert round_criterion(np.array([6.49, 6.5, -1.0, 11.2])).tolist() == [6.0, 7.0, 0.0, 9.0]
+    assert round_overall(np.array([6.125, 6.25, 6.5, 6.75, 6.875, 9.4])).tolist() == [6.0, 6.5, 6.5, 7.0, 7.0, 9.0]
+
+
+def test_score_fills_every_assessment_column():
+    """
+    Tests that a batch gets bands within the check constraints and feedback for every
+    criterion, that the overall band is the rounded mean, and that scoring is deterministic.
+    """
+    scores = scorer.score([ESSAY, "Too short. Really.", ""])
+
+    for score in scores:
+        assert set(score) == {column for name in ("overall_score", *CRITERIA) for column in (name, f"{name}_feedback")}
+        assert all(0 <= score[name] <= 9 and score[name] * 2 == int(score[name] * 2) for name in CRITERIA)
+        assert score["overall_score"] == round_overall(np.array([np.mean([score[name] for name in CRITERIA])]))[0]
+    assert scores[0]["overall_score"] > scores[1]["overall_score"]
+    assert "under the 250 words required" in scores[1]["task_achievement_feedback"]
+    assert scores[2]["overall_score"] == 0.0
+    assert scores == scorer.score([ESSAY, "Too short. Really.", ""])
+
+
+def test_model_is_loaded_once_and_validated(tmp_path):
+    """
+    Tests that a scorer loads its model on first use only, that the placeholder model is
+    provisional, and that an artifact with a missing criterion or an unknown input is rejected.
+    """
+    artifact = orjson.loads(scorer.model_path.read_bytes())
+    path = tmp_path / "band_model.json"
+    path.write_bytes(orjson.dumps(artifact))
+    band_scorer = BandScorer(path)
+
+    assert band_scorer.version == artifact["version"]
+    assert band_scorer.provisional is True
+    path.write_bytes(b"{}")
+    band_scorer.score([ESSAY])
+
+    artifact["criteria"]["lexical_resource"]["weights"]["rhyme"] = 1.0
+    path.write_bytes(orjson.dumps(artifact))
+    with pytest.raises(ValueError, match="unknown inputs: rhyme"):
+        load_band_model(path)
+    del artifact["provisional"]
+    artifact["criteria"]["lexical_resource"]["weights"].pop("rhyme")
+    path.write_bytes(orjson.dumps(artifact))
+    assert load_band_model(path).provisional is False
+    del artifact["criteria"]["lexical_resource"]
+    path.write_bytes(orjson.dumps(artifact))
+    with pytest.raises(ValueError, match="exactly the criteria"):
+        load_band_model(path)
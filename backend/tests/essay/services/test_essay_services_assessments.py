@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.essay import services
+from app.essay.services import create_assessments
+
+
+@pytest.mark.asyncio
+async def test_create_assessments_reads_back_those_another_worker_wrote(monkeypatch):
+    """
+    Tests that essays whose insert conflicted with an existing assessment get that
+    assessment, read in a statement of its own, and that no read is made without conflicts.
+    """
+    fetch_all = AsyncMock(
+        side_effect=[
+            [SimpleNamespace(id="assessment-1", essay_id="essay-1")],
+            [SimpleNamespace(id="assessment-2", essay_id="essay-2")],
+            [SimpleNamespace(id="assessment-3", essay_id="essay-3")],
+        ]
+    )
+    monkeypatch.setattr(services.statements, "fetch_all", fetch_all)
+    values = {"essay_ids": ["essay-1", "essay-2"], "essay_created_ats": ["t1", "t2"]}
+
+    assert await create_assessments(MagicMock(), values) == {"essay-1": "assessment-1", "essay-2": "assessment-2"}
+    name, read_values = fetch_all.await_args_list[1].args[1:]
+    assert name == "get_assessments_of_essays"
+    assert read_values == {"essay_ids": ["essay-2"], "essay_created_ats": ["t2"]}
+
+    assert await create_assessments(MagicMock(), {"essay_ids": ["essay-3"], "essay_created_ats": ["t3"]}) == {
+        "essay-3": "assessment-3"
+    }
+    assert fetch_all.await_count == 3
@@ -0,0 +1,114 @@
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from uuid import UUID
+
+import pytest
+
+from app.essay import services
+from app.essay.exceptions import EssayBadRequest, EssayPayloadTooLarge
+from app.essay.schemas import EssaySubmit
+from app.essay.services import COPY_COLUMNS, EssayService, read_essays
+
+CLIENT_ID = "22222222-2222-2222-2222-222222222222"
+OWNER_ID = "33333333-3333-3333-3333-333333333333"
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_read_essays_validates_lines_split_across_chunks():
+    """
+    Tests that essays split across chunks are read whole, that blank lines are skipped,
+    and that the last line needs no newline.
+    """
+    essays = await read_essays(
+        stream(
+            b'{"question_id": null, "content": "First', b' essay"}\n\n{"question_id": null, ', b'"content": "Second"}'
+        ),
+        max_essays=10,
+        max_line_bytes=1024,
+        max_bytes=1 << 20,
+    )
+
+    assert [essay.content for essay in essays] == ["First essay", "Second"]
+
+
+@pytest.mark.asyncio
+async def test_read_essays_rejects_bad_lines_and_oversized_batches():
+    """
+    Tests that an invalid essay is reported by line, and that too many essays, a line too
+    large or an empty body are rejected.
+    """
+    essay = b'{"question_id": null, "content": "Essay"}\n'
+
+    with pytest.raises(EssayBadRequest) as exc_info:
+        await read_essays(
+            stream(essay, b'{"question_id": null, "content": " "}\n'),
+            max_essays=10,
+            max_line_bytes=1024,
+            max_bytes=1 << 20,
+        )
+    assert exc_info.value.detail == "Line 2: Value error, Essay must not be empty"
+
+    with pytest.raises(EssayPayloadTooLarge):
+        await read_essays(stream(essay * 3), max_essays=2, max_line_bytes=1024, max_bytes=1 << 20)
+    with pytest.raises(EssayPayloadTooLarge):
+        await read_essays(stream(essay, b"x" * 2048), max_essays=10, max_line_bytes=1024, max_bytes=1 << 20)
+    with pytest.raises(EssayBadRequest):
+        await read_essays(stream(b"\n"), max_essays=10, max_line_bytes=1024, max_bytes=1 << 20)
+
+
+@pytest.mark.asyncio
+async def test_read_essays_measures_every_line_and_the_body():
+    """
+    Tests that a line too large is rejected even when it ends within the chunk it arrived
+    in, that a body too large is rejected, and that an essay too long is invalid.
+    """
+    essay = b'{"question_id": null, "content": "Essay"}\n'
+    long_line = b'{"question_id": null, "content": "' + b"x" * 100_000 + b'"}\n'
+
+    with pytest.raises(EssayPayloadTooLarge) as exc_info:
+        await read_essays(stream(essay + long_line + essay), max_essays=10, max_line_bytes=1024, max_bytes=1 << 20)
+    assert exc_info.value.detail == "Line 2 is larger than 1024 bytes"
+    with pytest.raises(EssayPayloadTooLarge) as exc_info:
+        await read_essays(stream(essay * 10, essay * 10), max_essays=100, max_line_bytes=1024, max_bytes=500)
+    assert exc_info.value.detail == "A batch is at most 500 bytes"
+    with pytest.raises(EssayBadRequest) as exc_info:
+        await read_essays(stream(long_line), max_essays=10, max_line_bytes=1 << 20, max_bytes=1 << 20)
+    assert exc_info.value.detail == "Line 1: Value error, Essay must be at most 20000 characters"
+
+
+@pytest.mark.asyncio
+async def test_submit_essays_copies_the_batch_and_queues_it_at_once(monkeypatch):
+    """
+    Tests that a batch is written with one COPY and queued with one call, and that the
+    essay ids returned are those copied, in order.
+    """
+    raw_connection = MagicMock()
+    raw_connection.copy_records_to_table = AsyncMock()
+
+    @asynccontextmanager
+    async def connection(db):
+        yield MagicMock(raw_connection=raw_connection)
+
+    monkeypatch.setattr(services.postgresql_config, "connection", connection)
+    enqueue_many = AsyncMock(side_effect=lambda redis, essays: [f"job-{i}" for i, _ in enumerate(essays)])
+    monkeypatch.setattr(services.scoring_queue, "enqueue_many", enqueue_many)
+    essays = [EssaySubmit(question_id=None, content="First"), EssaySubmit(question_id=None, content="Second")]
+
+    submitted = await EssayService(MagicMock(), MagicMock()).submit_essays(CLIENT_ID, OWNER_ID, essays)
+
+    raw_connection.copy_records_to_table.assert_awaited_once()
+    table = raw_connection.copy_records_to_table.await_args.args[0]
+    kwargs = raw_connection.copy_records_to_table.await_args.kwargs
+    assert table == "essay_contents"
+    assert kwargs["columns"] == COPY_COLUMNS
+    assert [record[4] for record in kwargs["records"]] == ["First", "Second"]
+    enqueue_many.assert_awaited_once()
+    assert submitted == {
+        "essays": [{"essay_id": kwargs["records"][i][0], "job_id": f"job-{i}", "status": "queued"} for i in range(2)]
+    }
+    assert all(isinstance(essay["essay_id"], UUID) for essay in submitted["essays"])
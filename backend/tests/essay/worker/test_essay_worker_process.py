@@ -0,0 +1,103 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.essay.dedupe import AssessmentCache
+from app.essay.queue import ScoringQueue
+from app.essay.scoring import scorer
+from app.essay.worker import ScoringWorker
+
+
+def job(job_id: str, essay_id: str) -> dict:
+    return {"job_id": job_id, "essay_id": essay_id, "essay_created_at": "2026-10-17T12:00:00+00:00"}
+
+
+def mock_worker(attempts: list[int]) -> ScoringWorker:
+    queue = ScoringQueue(stream="essay:scoring", group="scorers", max_len=1000, job_ttl=60, max_attempts=3)
+    queue.start = AsyncMock(return_value=attempts)
+    queue.finish = AsyncMock()
+    return ScoringWorker(
+        queue=queue,
+        scorer=scorer,
+        cache=AssessmentCache(ttl=60, lock_ttl_ms=1000, lock_wait=0.1, poll_interval=0.01),
+        consumer="worker",
+        batch_size=10,
+        block_ms=100,
+        claim_idle_ms=5000,
+        claim_interval=1,
+    )
+
+
+@pytest.mark.asyncio
+async def test_process_records_assessments_and_acknowledges_jobs():
+    """
+    Tests that scored jobs are done with their assessment, that a job whose essay is gone
+    is failed, and that both are acknowledged.
+    """
+    worker = mock_worker(attempts=[1, 1])
+    worker.score = AsyncMock(return_value={"essay-1": "assessment-1"})
+
+    await worker.process(MagicMock(), MagicMock(), [("1-0", job("a", "essay-1")), ("2-0", job("b", "essay-2"))])
+
+    worker.queue.finish.assert_awaited_once()
+    _, message_ids, statuses = worker.queue.finish.await_args.args
+    assert message_ids == ["1-0", "2-0"]
+    assert statuses == {
+        "a": {"status": "done", "assessment_id": "assessment-1"},
+        "b": {"status": "failed", "error": "Essay not found"},
+    }
+    assert worker.stats() == {
+        "scored": 1,
+        "reused": 0,
+        "failed": 1,
+        "reclaimed": 0,
+        "cache": {"redis_hits": 0, "db_hits": 0, "misses": 0},
+    }
+
+
+@pytest.mark.asyncio
+async def test_process_leaves_failed_batches_pending_until_max_attempts():
+    """
+    Tests that a batch that fails to score is left unacknowledged to be reclaimed, and that
+    a job started more than max_attempts times is failed without being scored.
+    """
+    worker = mock_worker(attempts=[2, 4])
+    worker.score = AsyncMock(side_effect=ConnectionError("Connection refused"))
+
+    await worker.process(MagicMock(), MagicMock(), [("1-0", job("a", "essay-1")), ("2-0", job("b", "essay-2"))])
+
+    assert worker.score.await_args.args[2] == [job("a", "essay-1")]
+    _, message_ids, statuses = worker.queue.finish.await_args.args
+    assert message_ids == ["2-0"]
+    assert statuses == {
+        "a": {"status": "retrying", "error": "Connection refused"},
+        "b": {"status": "failed", "error": "Gave up after 3 attempts"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_process_scores_the_jobs_of_a_failed_batch_one_at_a_time():
+    """
+    Tests that when a batch fails, its jobs are scored on their own, so that only the job
+    that fails again is retried and the others are acknowledged.
+    """
+    worker = mock_worker(attempts=[1, 1, 1])
+
+    async def score(redis, db, jobs):
+        if any(job["essay_id"] == "essay-2" for job in jobs):
+            raise ValueError("Malformed essay")
+        return {job["essay_id"]: job["essay_id"].replace("essay", "assessment") for job in jobs}
+
+    worker.score = AsyncMock(side_effect=score)
+    messages = [("1-0", job("a", "essay-1")), ("2-0", job("b", "essay-2")), ("3-0", job("c", "essay-3"))]
+
+    await worker.process(MagicMock(), MagicMock(), messages)
+
+    assert worker.score.await_count == 4
+    _, message_ids, statuses = worker.queue.finish.await_args.args
+    assert message_ids == ["1-0", "3-0"]
+    assert statuses == {
+        "a": {"status": "done", "assessment_id": "assessment-1"},
+        "b": {"status": "retrying", "error": "Malformed essay"},
+        "c": {"status": "done", "assessment_id": "assessment-3"},
+    }
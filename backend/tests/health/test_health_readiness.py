@@ -0,0 +1,55 @@
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.health import Readiness, health_router
+from app.main import warm_up
+
+
+@pytest.mark.asyncio
+async def test_ready_turns_green_once_warmed_up():
+    """
+    Tests that readiness reports 503 until warm-up has finished, 200 afterwards and
+    503 again once shutdown starts, while liveness always reports 200.
+    """
+    app = FastAPI()
+    app.include_router(health_router)
+    readiness = Readiness()
+
+    with patch("app.health.readiness", readiness):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            cold = await client.get("/health/ready")
+            live = await client.get("/health/live")
+            readiness.mark_ready()
+            warm = await client.get("/health/ready")
+            readiness.mark_not_ready()
+            draining = await client.get("/health/ready")
+
+    assert cold.status_code == 503
+    assert live.status_code == 200
+    assert warm.status_code == 200
+    assert warm.json()["warm_up_seconds"] >= 0
+    assert draining.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_warm_up_becomes_ready_when_a_step_fails():
+    """
+    Tests that warm-up prepares statements on the primary pool and calibrates hashing
+    concurrently, and that the process still becomes ready if a step fails.
+    """
+    readiness = Readiness()
+
+    with (
+        patch("app.main.readiness", readiness),
+        patch("app.main.statements.warm", AsyncMock(side_effect=Exception("boom"))) as mock_warm,
+        patch("app.main.password_hasher.calibrate", AsyncMock(return_value=12)) as mock_calibrate,
+        patch("app.main.postgresql_config.replicas", []),
+    ):
+        await warm_up()
+
+    mock_warm.assert_awaited_once()
+    mock_calibrate.assert_awaited_once()
+    assert readiness.ready
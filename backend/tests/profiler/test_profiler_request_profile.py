@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from asyncpg.connection import LoggedQuery
+from fastapi import FastAPI
+
+from app.metrics import _current_scope
+from app.profiler import (
+    QueryProfilerMiddleware,
+    RequestProfile,
+    _current_profile,
+    log_query,
+    record_command,
+    record_query,
+    recording_statement,
+)
+
+
+def logged_query(query: str, elapsed: float) -> LoggedQuery:
+    return LoggedQuery(
+        query=query, args=(), timeout=None, elapsed=elapsed, exception=None, conn_addr=None, conn_params=None
+    )
+
+
+def test_repeated_statements_skip_transaction_control():
+    """
+    Tests that statements run at least threshold times are reported, except the
+    statements every transaction runs.
+    """
+    profile = RequestProfile()
+    for statement in ["BEGIN", "get_profile", "get_profile", "get_user", "COMMIT", "BEGIN", "COMMIT"]:
+        profile.queries.append((statement, 0.001))
+
+    assert profile.repeated(2) == {"get_profile": 2}
+    assert profile.repeated(3) == {}
+
+
+@pytest.mark.asyncio
+async def test_profiler_middleware_times_and_reports_requests(caplog):
+    """
+    Tests that statements and commands run for a request, including those asyncpg
+    logs through a callback, land in its profile, that the Server-Timing header is
+    set in local development, and that repeated statements and exceeded budgets are logged.
+    """
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        for _ in range(25):
+            record_query("get_item", 0.001)
+        record_command("GET", 0.002)
+        asyncio.get_running_loop().call_soon(log_query, logged_query("SELECT\n    1", 0.003))
+        await asyncio.sleep(0)
+        return {"item_id": item_id}
+
+    app.add_middleware(QueryProfilerMiddleware)
+
+    with caplog.at_level(logging.WARNING, logger="app.profiler"):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/items/1")
+
+    assert response.headers["server-timing"].startswith(
+        'db;dur=28.0;desc="26 queries", redis;dur=2.0;desc="1 commands"'
+    )
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("ran 26 queries in 28.0ms, over the budget" in message for message in messages)
+    assert any("GET /items/{item_id} ran get_item 25 times" in message for message in messages)
+    assert not any("SELECT 1" in message for message in messages)
+
+
+def test_slow_queries_are_labeled_background_work_outside_requests(caplog):
+    """
+    Tests that a slow statement is logged as background work when no request is being
+    profiled, and against its route when one is.
+    """
+    with caplog.at_level(logging.WARNING, logger="app.profiler"):
+        record_query("update_last_login", 0.5)
+        record_query("get_user", 0.001)
+        scope_token = _current_scope.set({"route": SimpleNamespace(path_format="/items/{item_id}")})
+        token = _current_profile.set(RequestProfile())
+        try:
+            record_query("get_profile", 0.5)
+        finally:
+            _current_profile.reset(token)
+            _current_scope.reset(scope_token)
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages == [
+        "Slow query in background work took 500.0ms: update_last_login",
+        "Slow query on /items/{item_id} took 500.0ms: get_profile",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_query_logger_skips_statements_recorded_by_name():
+    """
+    Tests that a statement asyncpg logs while the registry records it by name is not
+    recorded a second time, since the callback runs in the context it was scheduled from.
+    """
+    profile = RequestProfile()
+    token = _current_profile.set(profile)
+    try:
+        with recording_statement():
+            record_query("get_user", 0.001)
+            asyncio.get_running_loop().call_soon(log_query, logged_query("SELECT * FROM users", 0.001))
+        asyncio.get_running_loop().call_soon(log_query, logged_query("BEGIN", 0.001))
+        await asyncio.sleep(0)
+    finally:
+        _current_profile.reset(token)
+
+    assert [statement for statement, _ in profile.queries] == ["get_user", "BEGIN"]
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_do_shares_the_result_of_one_call():
+    """
+    Tests that concurrent calls with the same key run the work once and share its result.
+    """
+    flight = SingleFlight()
+    runs = 0
+
+    async def work():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        return "token"
+
+    assert await asyncio.gather(*(flight.do("key", work) for _ in range(3))) == ["token"] * 3
+    assert runs == 1
+    assert flight.stats() == {"calls": 1, "shared": 2, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_followers_survive_a_cancelled_leader():
+    """
+    Tests that when the call running the work is cancelled, a caller awaiting it runs the
+    work in its place and the others share that result, while a cancelled follower is
+    cancelled.
+    """
+    flight = SingleFlight()
+    started = asyncio.Event()
+    runs = 0
+
+    async def work():
+        nonlocal runs
+        runs += 1
+        started.set()
+        await asyncio.sleep(0.01)
+        return f"token-{runs}"
+
+    leader = asyncio.create_task(flight.do("key", work))
+    await started.wait()
+    followers = [asyncio.create_task(flight.do("key", work)) for _ in range(3)]
+    await asyncio.sleep(0)
+    leader.cancel()
+    followers[2].cancel()
+
+    results = await asyncio.gather(leader, *followers, return_exceptions=True)
+
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:3] == ["token-2", "token-2"]
+    assert isinstance(results[3], asyncio.CancelledError)
+    assert runs == 2
@@ -0,0 +1,190 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import orjson
+import pytest
+from redis.exceptions import ConnectionError
+
+from app.user.cache import (
+    PROFILE_GENERATION_PREFIX,
+    PROFILE_INVALIDATION_CHANNEL,
+    PROFILE_KEY_PREFIX,
+    ProfileCache,
+)
+
+
+@pytest.fixture
+def mock_redis():
+    """
+    A Redis client backed by a dict, which runs the generation check of the store script.
+    """
+    redis = AsyncMock()
+    store = {}
+
+    async def mget(keys):
+        return [store.get(key) for key in keys]
+
+    async def set_if_generation(keys, args):
+        if store.get(keys[1], "0") != args[2]:
+            return 0
+        store[keys[0]] = args[0]
+        return 1
+
+    def incr(key):
+        store[key] = str(int(store.get(key, "0")) + 1)
+
+    script = AsyncMock(side_effect=set_if_generation)
+    script.registered_client = redis
+    redis.register_script = MagicMock(return_value=script)
+    redis.mget.side_effect = mget
+
+    pipe = MagicMock()
+    pipe.incr.side_effect = incr
+    pipe.delete.side_effect = lambda key: store.pop(key, None)
+    pipe.execute = AsyncMock()
+    redis.pipeline = MagicMock()
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    redis.store = store
+    redis.script = script
+    redis.pipe = pipe
+    with patch("app.user.cache.redis_config") as mock_redis_config:
+        mock_redis_config.redis_client = redis
+        yield redis
+
+
+@pytest.fixture
+def profile_cache():
+    return ProfileCache(max_size=10, local_ttl=30, redis_ttl=600)
+
+
+@pytest.mark.asyncio
+async def test_profile_cache_loads_a_miss_and_serves_it_from_local_tier(mock_redis, profile_cache):
+    """
+    Tests that a loaded profile is written to Redis with its ttl and then served from
+    the local tier without another Redis round trip or database read.
+    """
+    client_id, user_id = str(uuid4()), str(uuid4())
+    key = f"{client_id}:{user_id}"
+    record = {"client_id": client_id, "user_id": user_id, "created_at": datetime.now(timezone.utc)}
+    load = AsyncMock(return_value=record)
+
+    stored = await profile_cache.get(client_id, user_id, load)
+    cached = await profile_cache.get(client_id, user_id, load)
+
+    assert cached == stored
+    assert cached["user_id"] == user_id
+    load.assert_awaited_once()
+    mock_redis.mget.assert_awaited_once_with([PROFILE_KEY_PREFIX + key, PROFILE_GENERATION_PREFIX + key])
+    mock_redis.script.assert_awaited_once_with(
+        keys=[PROFILE_KEY_PREFIX + key, PROFILE_GENERATION_PREFIX + key],
+        args=[orjson.dumps(record), 600, "0"],
+    )
+
+
+@pytest.mark.asyncio
+async def test_profile_cache_get_returns_none_for_missing_profiles(mock_redis, profile_cache):
+    """
+    Tests that a profile that does not exist is not cached.
+    """
+    load = AsyncMock(return_value=None)
+
+    assert await profile_cache.get("client_a", "user_a", load) is None
+    mock_redis.script.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_profile_cache_get_falls_back_to_redis(mock_redis, profile_cache):
+    """
+    Tests that a local miss is served from Redis and copied into the local tier.
+    """
+    client_id, user_id = str(uuid4()), str(uuid4())
+    mock_redis.store[PROFILE_KEY_PREFIX + f"{client_id}:{user_id}"] = orjson.dumps(
+        {"client_id": client_id, "user_id": user_id}
+    )
+    load = AsyncMock()
+
+    first = await profile_cache.get(client_id, user_id, load)
+    second = await profile_cache.get(client_id, user_id, load)
+
+    assert first == second == {"client_id": client_id, "user_id": user_id}
+    load.assert_not_called()
+    mock_redis.mget.assert_awaited_once()
+    assert profile_cache.stats()["redis"] == {"hits": 1, "misses": 0, "errors": 0, "stale_sets": 0}
+
+
+@pytest.mark.asyncio
+async def test_profile_cache_returns_copies(mock_redis, profile_cache):
+    """
+    Tests that changing a returned profile does not change the cached entry.
+    """
+    load = AsyncMock(return_value={"client_id": "client_a", "user_id": "user_a"})
+
+    profile = await profile_cache.get("client_a", "user_a", load)
+    profile["user_id"] = "user_b"
+
+    assert (await profile_cache.get("client_a", "user_a", load))["user_id"] == "user_a"
+
+
+@pytest.mark.asyncio
+async def test_profile_cache_does_not_store_a_row_read_before_an_invalidation(mock_redis, profile_cache):
+    """
+    Tests that a profile read from the database before an invalidation and stored after it
+    is rejected, so the stale row is neither cached in Redis nor in the local tier.
+    """
+    client_id, user_id = str(uuid4()), str(uuid4())
+    key = f"{client_id}:{user_id}"
+
+    async def load():
+        await profile_cache.invalidate(client_id, user_id)
+        return {"client_id": client_id, "user_id": user_id, "name": "old"}
+
+    profile = await profile_cache.get(client_id, user_id, load)
+
+    assert profile["name"] == "old"
+    assert PROFILE_KEY_PREFIX + key not in mock_redis.store
+    assert profile_cache.local.get(key) is None
+    assert profile_cache.stats()["redis"]["stale_sets"] == 1
+
+    fresh = AsyncMock(return_value={"client_id": client_id, "user_id": user_id, "name": "new"})
+    assert (await profile_cache.get(client_id, user_id, fresh))["name"] == "new"
+    assert PROFILE_KEY_PREFIX + key in mock_redis.store
+
+
+@pytest.mark.asyncio
+async def test_profile_cache_survives_redis_errors(mock_redis, profile_cache):
+    """
+    Tests that a Redis error is a miss of the Redis tier rather than an error, and that a
+    profile that cannot be written to Redis is still kept in the local tier.
+    """
+    client_id, user_id = str(uuid4()), str(uuid4())
+    mock_redis.mget.side_effect = ConnectionError("Connection refused")
+    mock_redis.script.side_effect = ConnectionError("Connection refused")
+    load = AsyncMock(return_value={"client_id": client_id, "user_id": user_id})
+
+    stored = await profile_cache.get(client_id, user_id, load)
+
+    assert await profile_cache.get(client_id, user_id, load) == stored
+    load.assert_awaited_once()
+    assert profile_cache.stats()["redis"] == {"hits": 0, "misses": 0, "errors": 2, "stale_sets": 0}
+
+
+@pytest.mark.asyncio
+async def test_profile_cache_invalidate_broadcasts(mock_redis, profile_cache):
+    """
+    Tests that invalidating a profile drops the local entry, bumps its generation, deletes
+    the Redis entry and publishes the key for the other workers.
+    """
+    client_id, user_id = str(uuid4()), str(uuid4())
+    key = f"{client_id}:{user_id}"
+    profile_cache.local.set(key, {"client_id": client_id})
+
+    await profile_cache.invalidate(client_id, user_id)
+
+    assert profile_cache.local.get(key) is None
+    mock_redis.pipe.incr.assert_called_once_with(PROFILE_GENERATION_PREFIX + key)
+    mock_redis.pipe.expire.assert_called_once_with(PROFILE_GENERATION_PREFIX + key, 600)
+    mock_redis.pipe.delete.assert_called_once_with(PROFILE_KEY_PREFIX + key)
+    mock_redis.pipe.publish.assert_called_once_with(PROFILE_INVALIDATION_CHANNEL, key)
+    mock_redis.pipe.execute.assert_awaited_once()
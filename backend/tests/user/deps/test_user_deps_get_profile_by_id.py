@@ -0,0 +1,31 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.user.deps import get_profile_by_id
+
+
+@pytest.mark.asyncio
+async def test_get_profile_by_id_reads_a_miss_from_the_request_pool():
+    """
+    Tests that a profile missing from the cache is read from the pool the reads of the
+    request use, which may be a replica.
+    """
+    db = MagicMock()
+    record = {"client_id": "client_a", "user_id": "user_a"}
+
+    async def get(client_id, user_id, load):
+        return await load()
+
+    with (
+        patch("app.user.deps.profile_cache") as mock_profile_cache,
+        patch("app.user.deps.statements") as mock_statements,
+    ):
+        mock_profile_cache.get = AsyncMock(side_effect=get)
+        mock_statements.fetch_one = AsyncMock(return_value=record)
+
+        assert await get_profile_by_id(db, "client_a", "user_a") == record
+
+    mock_statements.fetch_one.assert_awaited_once_with(
+        db, "get_profile", {"client_id": "client_a", "user_id": "user_a"}
+    )
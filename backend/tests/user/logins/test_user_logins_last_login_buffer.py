@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import ANY, AsyncMock, patch
+
+import pytest
+
+from app.user.logins import LastLoginBuffer
+
+
+@pytest.fixture
+def mock_statements():
+    with (
+        patch("app.user.logins.postgresql_config"),
+        patch("app.user.logins.statements") as mock_statements,
+    ):
+        mock_statements.execute = AsyncMock()
+        yield mock_statements
+
+
+@pytest.fixture(autouse=True)
+def mock_mark_written_many():
+    with patch("app.user.logins.mark_written_many", new_callable=AsyncMock) as mock_mark_written_many:
+        yield mock_mark_written_many
+
+
+@pytest.fixture
+def mock_profile_cache():
+    with patch("app.user.logins.profile_cache") as mock_profile_cache:
+        mock_profile_cache.invalidate_many = AsyncMock()
+        yield mock_profile_cache
+
+
+@pytest.mark.asyncio
+async def test_last_login_buffer_flushes_batches(mock_statements, mock_profile_cache, mock_mark_written_many):
+    """
+    Tests that pending logins are written as one UPDATE ... FROM unnest(...) per batch,
+    that only the latest login of a profile is kept, and that the flushed profiles are
+    invalidated in the profile cache after their users are marked as having written.
+    """
+    buffer = LastLoginBuffer(flush_interval_ms=1000, max_batch_size=2)
+    now = datetime.now(timezone.utc)
+    buffer.record("client_a", "user_a", now - timedelta(seconds=5))
+    buffer.record("client_a", "user_a", now)
+    buffer.record("client_a", "user_a", now - timedelta(seconds=10))
+    buffer.record("client_a", "user_b", now)
+    buffer.record("client_b", "user_c", now)
+
+    await buffer.flush()
+
+    assert mock_statements.execute.await_count == 2
+    _, name, values = mock_statements.execute.call_args_list[0].args
+    assert name == "update_last_login"
+    assert values == {
+        "client_ids": ["client_a", "client_a"],
+        "user_ids": ["user_a", "user_b"],
+        "last_login_ats": [now, now],
+    }
+    mock_mark_written_many.assert_any_await(ANY, ["user_a", "user_b"])
+    mock_profile_cache.invalidate_many.assert_any_await([("client_a", "user_a"), ("client_a", "user_b")])
+    assert buffer.stats() == {"pending": 0, "flushed": 3, "failed_flushes": 0}
+
+
+@pytest.mark.asyncio
+async def test_last_login_buffer_requeues_failed_batch(mock_statements, mock_profile_cache):
+    """
+    Tests that a batch that fails to flush is kept for the next flush.
+    """
+    buffer = LastLoginBuffer(flush_interval_ms=1000, max_batch_size=500)
+    now = datetime.now(timezone.utc)
+    buffer.record("client_a", "user_a", now)
+    mock_statements.execute.side_effect = [Exception("connection lost"), None]
+
+    await buffer.flush()
+    assert buffer.stats() == {"pending": 1, "flushed": 0, "failed_flushes": 1}
+
+    await buffer.flush()
+    assert buffer.stats() == {"pending": 0, "flushed": 1, "failed_flushes": 1}
+    mock_profile_cache.invalidate_many.assert_awaited_once_with([("client_a", "user_a")])
+
+
+@pytest.mark.asyncio
+async def test_last_login_buffer_stop_flushes_pending(mock_statements, mock_profile_cache):
+    """
+    Tests that stopping the buffer writes the logins still pending.
+    """
+    buffer = LastLoginBuffer(flush_interval_ms=60_000, max_batch_size=500)
+    buffer.start()
+    buffer.record("client_a", "user_a", datetime.now(timezone.utc))
+
+    await buffer.stop()
+
+    mock_statements.execute.assert_awaited_once()
+    assert buffer.stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_last_login_buffer_keeps_logins_of_an_interrupted_flush(mock_statements, mock_profile_cache):
+    """
+    Tests that stopping the buffer during a flush lets the flush complete, and that a flush
+    cancelled during its write puts back the batch in flight and those after it.
+    """
+    buffer = LastLoginBuffer(flush_interval_ms=10, max_batch_size=1)
+    now = datetime.now(timezone.utc)
+    writing = asyncio.Event()
+
+    async def slow_execute(*args):
+        writing.set()
+        await asyncio.sleep(0.05)
+
+    mock_statements.execute.side_effect = slow_execute
+    buffer.start()
+    buffer.record("client_a", "user_a", now)
+    buffer.record("client_a", "user_b", now)
+    await writing.wait()
+
+    await buffer.stop()
+    assert buffer.stats() == {"pending": 0, "flushed": 2, "failed_flushes": 0}
+
+    writing.clear()
+    buffer.record("client_a", "user_a", now)
+    buffer.record("client_a", "user_b", now)
+    flush = asyncio.create_task(buffer.flush())
+    await writing.wait()
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+    assert buffer.stats()["pending"] == 2
@@ -0,0 +1,112 @@
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+from asyncpg.exceptions import ForeignKeyViolationError
+from databases import Database
+
+from app.user.exceptions import UserBadRequest
+from app.user.services import UserService
+
+
+@pytest.fixture
+def mock_db():
+    return AsyncMock(spec=Database)
+
+
+@pytest.fixture(autouse=True)
+def mock_dependencies():
+    with (
+        patch("app.user.services.password_hasher") as mock_password_hasher,
+        patch("app.user.services.statements") as mock_statements,
+    ):
+        mock_password_hasher.hash = AsyncMock(return_value="hashed_password")
+        mock_statements.fetch_one = AsyncMock()
+        yield mock_statements
+
+
+@pytest.mark.asyncio
+async def test_create_user_with_profile(mock_db, mock_dependencies):
+    """
+    Tests that the user, client and profile are created with a single statement and
+    that the created profile is returned without the conflict flags.
+    """
+    mock_statements = mock_dependencies
+    client_id, user_id = uuid4(), uuid4()
+    mock_statements.fetch_one.return_value = {
+        "username_exists": False,
+        "email_exists": False,
+        "client_id": client_id,
+        "user_id": user_id,
+        "full_name": "testuser",
+    }
+
+    profile = await UserService(mock_db).create_user_with_profile(
+        username="testuser",
+        email="test@example.com",
+        password="testpassword",
+        client_name="Test Client",
+        client_id=None,
+    )
+
+    assert profile == {"client_id": client_id, "user_id": user_id, "full_name": "testuser"}
+    mock_statements.fetch_one.assert_awaited_once()
+    db, name, values = mock_statements.fetch_one.call_args.args
+    assert (db, name) == (mock_db, "create_user_with_profile")
+    assert values["hashed_password"] == "hashed_password"
+    assert values["client_id"] is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "username_exists, email_exists, expected",
+    [
+        (True, False, [{"username": "Username already exists."}]),
+        (False, True, [{"email": "Email already exists."}]),
+        (True, True, [{"username": "Username already exists."}, {"email": "Email already exists."}]),
+        (False, False, "Username or email already exists."),
+    ],
+)
+async def test_create_user_with_profile_conflict(mock_db, mock_dependencies, username_exists, email_exists, expected):
+    """
+    Tests that a user row skipped by ON CONFLICT is reported precisely from the
+    conflict flags returned by the same statement.
+    """
+    mock_statements = mock_dependencies
+    mock_statements.fetch_one.return_value = {
+        "username_exists": username_exists,
+        "email_exists": email_exists,
+        "client_id": None,
+        "user_id": None,
+    }
+
+    with pytest.raises(UserBadRequest) as exc_info:
+        await UserService(mock_db).create_user_with_profile(
+            username="testuser",
+            email="test@example.com",
+            password="testpassword",
+            client_name="Test Client",
+            client_id=None,
+        )
+
+    assert exc_info.value.detail == expected
+
+
+@pytest.mark.asyncio
+async def test_create_user_with_profile_unknown_client(mock_db, mock_dependencies):
+    """
+    Tests that joining a client that does not exist is reported on the client_id field.
+    """
+    mock_statements = mock_dependencies
+    mock_statements.fetch_one.side_effect = ForeignKeyViolationError("violates foreign key constraint")
+
+    with pytest.raises(UserBadRequest) as exc_info:
+        await UserService(mock_db).create_user_with_profile(
+            username="testuser",
+            email="test@example.com",
+            password="testpassword",
+            client_name=None,
+            client_id=uuid4(),
+        )
+
+    assert exc_info.value.detail == [{"client_id": "Client does not exist."}]
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from databases import Database
+
+from app.auth.hashing import PasswordHasher
+from app.auth.utils import get_password_hash
+from app.user.exceptions import UserNotAuthenticated
+from app.user.services import UserService
+from app.user.utils import authenticate_user
+
+
+@pytest.fixture
+def password_hasher():
+    hasher = PasswordHasher(executor_type="thread", max_workers=1, max_concurrency=1, rounds=5)
+    with patch("app.user.services.password_hasher", hasher):
+        yield hasher
+    hasher.shutdown()
+
+
+@pytest.fixture
+def mock_user_service():
+    with (
+        patch.object(UserService, "get_user", autospec=True) as mock_get_user,
+        patch.object(UserService, "update_user_password_hash", autospec=True) as mock_update_user_password_hash,
+    ):
+        yield SimpleNamespace(get_user=mock_get_user, update_user_password_hash=mock_update_user_password_hash)
+
+
+@pytest.mark.asyncio
+async def test_authenticate_user_rehashes_outdated_hash(password_hasher, mock_user_service):
+    """
+    Tests that a successful login with a hash created at another work factor writes
+    a new hash at the current work factor.
+    """
+    mock_user = MagicMock()
+    mock_user.id = uuid4()
+    mock_user.hashed_password = get_password_hash("testpassword", rounds=4)
+    mock_user_service.get_user.return_value = mock_user
+
+    result = await authenticate_user(AsyncMock(spec=Database), "testuser", "testpassword")
+
+    assert result == mock_user
+    mock_user_service.update_user_password_hash.assert_awaited_once()
+    _, user_id, hashed_password = mock_user_service.update_user_password_hash.call_args.args
+    assert user_id == mock_user.id
+    assert hashed_password.startswith("$2b$05$")
+    assert password_hasher.rehashed == 1
+
+
+@pytest.mark.asyncio
+async def test_authenticate_user_keeps_current_hash(password_hasher, mock_user_service):
+    """
+    Tests that a successful login with a hash at the current work factor writes nothing.
+    """
+    mock_user = MagicMock()
+    mock_user.hashed_password = get_password_hash("testpassword", rounds=5)
+    mock_user_service.get_user.return_value = mock_user
+
+    await authenticate_user(AsyncMock(spec=Database), "testuser", "testpassword")
+
+    mock_user_service.update_user_password_hash.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_authenticate_user_wrong_password(password_hasher, mock_user_service):
+    """
+    Tests that a wrong password raises UserNotAuthenticated without rehashing.
+    """
+    mock_user = MagicMock()
+    mock_user.hashed_password = get_password_hash("testpassword", rounds=4)
+    mock_user_service.get_user.return_value = mock_user
+
+    with pytest.raises(UserNotAuthenticated):
+        await authenticate_user(AsyncMock(spec=Database), "testuser", "wrongpassword")
+
+    mock_user_service.update_user_password_hash.assert_not_called()